@@ -0,0 +1,166 @@
+"""
+Binary asset store for uploaded images (tenant logos).
+
+Uploads are content-addressed: the SHA-256 of the original bytes names the
+asset, and each display-size variant is stored under
+``<digest>-<variant>.<ext>``, so a URL never changes meaning and can be
+cached forever. Bytes live in GridFS (``assets`` bucket) by default or on
+local disk with ``ASSET_STORAGE=disk``; metadata lives in the ``assets``
+collection. Resizing runs in a worker thread.
+
+Only raster formats decoded by Pillow are accepted, identified from the
+bytes rather than the client's content type, and every variant is
+re-encoded; SVG and anything else that can carry script is refused.
+"""
+import asyncio
+import hashlib
+import io
+import os
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+
+from database import db
+from timeutils import utcnow
+
+ASSET_STORAGE = os.environ.get('ASSET_STORAGE', 'gridfs')
+ASSET_DIR = Path(os.environ.get('ASSET_DIR', Path(__file__).parent / 'uploads' / 'assets'))
+ASSET_BASE_URL = os.environ.get('ASSET_BASE_URL') or os.environ.get('REACT_APP_BACKEND_URL', '')
+
+# Longest side in pixels of each stored variant
+DISPLAY_SIZES = {'sm': 64, 'md': 256, 'lg': 512}
+DEFAULT_VARIANT = 'md'
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Assets are served from the app origin: never sniff, never run script
+ASSET_SECURITY_HEADERS = {
+    'X-Content-Type-Options': 'nosniff',
+    'Content-Security-Policy': "default-src 'none'; sandbox",
+}
+
+# Pillow decoders accepted for uploads
+ALLOWED_IMAGE_FORMATS = ('PNG', 'JPEG', 'GIF', 'WEBP')
+
+_bucket = None
+
+
+def _gridfs() -> AsyncIOMotorGridFSBucket:
+    global _bucket
+    if _bucket is None:
+        _bucket = AsyncIOMotorGridFSBucket(db.unwrapped, bucket_name='assets')
+    return _bucket
+
+
+# ==================== STORAGE BACKENDS ====================
+
+async def _write(key: str, data: bytes, content_type: str):
+    if ASSET_STORAGE == 'disk':
+        path = ASSET_DIR / key
+        if not path.exists():
+            ASSET_DIR.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(path.write_bytes, data)
+        return
+    existing = await db['assets.files'].find_one({'filename': key}, {'_id': 1})
+    if not existing:
+        await _gridfs().upload_from_stream(key, data, metadata={'content_type': content_type})
+
+
+async def read_asset(key: str) -> Optional[bytes]:
+    if ASSET_STORAGE == 'disk':
+        path = ASSET_DIR / Path(key).name
+        if not path.is_file():
+            return None
+        return await asyncio.to_thread(path.read_bytes)
+    try:
+        stream = await _gridfs().open_download_stream_by_name(key)
+    except NoFile:
+        return None
+    return await stream.read()
+
+
+# ==================== IMAGE PROCESSING ====================
+
+def _render_variants(data: bytes) -> tuple:
+    """Decode ``data``; returns its detected content type and
+    ``{variant: (bytes, content_type, ext, w, h)}``."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(data), formats=ALLOWED_IMAGE_FORMATS)
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(400, 'File must be a PNG, JPEG, GIF or WebP image')
+    original_type = Image.MIME.get(image.format, 'application/octet-stream')
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'P')
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    variants = {}
+    for name, size in DISPLAY_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if has_alpha:
+            resized.save(buffer, format='PNG', optimize=True)
+            variants[name] = (buffer.getvalue(), 'image/png', 'png', *resized.size)
+        else:
+            resized.save(buffer, format='JPEG', quality=85, optimize=True, progressive=True)
+            variants[name] = (buffer.getvalue(), 'image/jpeg', 'jpg', *resized.size)
+    return original_type, variants
+
+
+# ==================== PUBLIC API ====================
+
+def asset_url(key: str, base_url: Optional[str] = None) -> str:
+    return f"{(base_url or ASSET_BASE_URL).rstrip('/')}/api/assets/{key}"
+
+
+def public_asset(asset: dict, base_url: Optional[str] = None) -> dict:
+    """Small reference stored on owning documents: id plus variant URLs."""
+    return {
+        'id': asset['id'],
+        'urls': {name: asset_url(v['key'], base_url) for name, v in asset['variants'].items()}
+    }
+
+
+async def store_image(data: bytes, tenant_id: Optional[str] = None) -> dict:
+    """Store an uploaded image and its display-size variants; returns the asset document."""
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    existing = await db.assets.find_one({'id': digest}, {'_id': 0})
+    if existing:
+        return existing
+
+    content_type, rendered = await asyncio.to_thread(_render_variants, data)
+    variants = {}
+    for name, (body, variant_type, ext, width, height) in rendered.items():
+        key = f'{digest}-{name}.{ext}'
+        await _write(key, body, variant_type)
+        variants[name] = {
+            'key': key, 'content_type': variant_type, 'size': len(body),
+            'width': width, 'height': height
+        }
+
+    asset = {
+        'id': digest,
+        'tenant_id': tenant_id,
+        'kind': 'image',
+        'original_content_type': content_type,
+        'original_size': len(data),
+        'variants': variants,
+        'created_at': utcnow()
+    }
+    await db.assets.update_one({'id': digest}, {'$setOnInsert': asset}, upsert=True)
+    return asset
+
+
+async def get_variant_content_type(key: str) -> Optional[str]:
+    digest = key.split('-', 1)[0]
+    asset = await db.assets.find_one({'id': digest}, {'_id': 0, 'variants': 1})
+    if not asset:
+        return None
+    for variant in asset['variants'].values():
+        if variant['key'] == key:
+            return variant['content_type']
+    return None
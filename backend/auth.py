@@ -1,35 +1,49 @@
 import jwt
-import bcrypt
 import os
 import uuid
 import hashlib
+import time
 from datetime import datetime, timezone, timedelta
 from fastapi import Request, HTTPException, Depends
+from starlette.requests import HTTPConnection
+
+from password_hasher import hash_password, verify_password, verify_and_rehash
 
 JWT_SECRET = os.environ.get('JWT_SECRET', 'default-jwt-secret')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRY_HOURS = 24
+# Stream tickets go in SSE/WebSocket URLs (and so into access logs): keep them short-lived
+STREAM_TICKET_SECONDS = int(os.environ.get('STREAM_TICKET_SECONDS', '60'))
 
+# Authenticated principal cache, keyed by (user id, jti). The cache is per
+# process and only invalidated by the worker that served the change; its TTL
+# bounds staleness elsewhere. Revocations are also written to the
+# ``token_revocations`` collection (TTL-indexed on ``expires_at``) and
+# reloaded every AUTH_REVOCATION_REFRESH_SECONDS, so other workers pick them
+# up within that interval and they survive restarts.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_PRINCIPAL_CACHE_TTL_SECONDS', '60'))
+PRINCIPAL_CACHE_MAX_ENTRIES = 10000
+REVOCATION_REFRESH_SECONDS = float(os.environ.get('AUTH_REVOCATION_REFRESH_SECONDS', '30'))
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+_principal_cache = {}
+_revoked_jtis = {}
+_user_revoked_before = {}
+_tenant_revoked_before = {}
 
 
 def hash_identifier(value: str) -> str:
     return hashlib.sha256(value.lower().strip().encode('utf-8')).hexdigest()
 
 
-def create_token(user_id: str, role: str, tenant_id: str = None) -> str:
+def create_token(user_id: str, role: str, tenant_id: str = None, tenant_status: str = None) -> str:
     payload = {
         'sub': user_id,
         'role': role,
         'tenant_id': tenant_id,
+        'tenant_status': tenant_status,
         'exp': datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRY_HOURS),
-        'iat': datetime.now(timezone.utc),
+        # Sub-second, so revocations reject tokens issued earlier in the same second
+        'iat': time.time(),
         'jti': str(uuid.uuid4())
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
@@ -44,23 +58,194 @@ def decode_token(token: str) -> dict:
         raise HTTPException(status_code=401, detail='Invalid token')
 
 
+def create_stream_ticket(payload: dict) -> str:
+    """Short-lived token that only opens event streams.
+
+    It carries the session token's ``jti`` and ``iat``, so revoking the
+    session (or its user or tenant) revokes streams opened with it.
+    """
+    ticket = {
+        'sub': payload['sub'],
+        'role': payload.get('role'),
+        'tenant_id': payload.get('tenant_id'),
+        'tenant_status': payload.get('tenant_status'),
+        'jti': payload.get('jti'),
+        'iat': payload.get('iat'),
+        'exp': datetime.now(timezone.utc) + timedelta(seconds=STREAM_TICKET_SECONDS),
+        'scope': 'stream'
+    }
+    return jwt.encode(ticket, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
 def generate_verification_token() -> str:
     return str(uuid.uuid4())
 
 
-async def get_current_user(request: Request) -> dict:
+# ==================== PRINCIPAL CACHE & REVOCATION ====================
+
+def _prune_revocations():
+    cutoff = time.time() - JWT_EXPIRY_HOURS * 3600
+    for jti, exp in list(_revoked_jtis.items()):
+        if exp < time.time():
+            del _revoked_jtis[jti]
+    for revoked in (_user_revoked_before, _tenant_revoked_before):
+        for key, revoked_at in list(revoked.items()):
+            if revoked_at < cutoff:
+                del revoked[key]
+
+
+def invalidate_user(user_id: str):
+    """Drop cached principals for a user so the next request reloads it.
+
+    Only this worker's cache is cleared: other workers may serve the cached
+    user for up to ``PRINCIPAL_CACHE_TTL_SECONDS``. Use ``revoke_user_tokens``
+    when old sessions must stop working everywhere at once.
+    """
+    for key in [k for k in _principal_cache if k[0] == user_id]:
+        _principal_cache.pop(key, None)
+
+
+def invalidate_tenant(tenant_id: str):
+    """Drop cached principals of every user belonging to a tenant.
+
+    Local to this worker like ``invalidate_user``; ``revoke_tenant_tokens``
+    is the cross-worker equivalent.
+    """
+    for key, (_, user) in list(_principal_cache.items()):
+        if user.get('tenant_id') == tenant_id:
+            _principal_cache.pop(key, None)
+
+
+async def _persist_revocation(kind: str, key: str, revoked_at: float, expires_at: float):
+    from database import db
+    await db.token_revocations.update_one(
+        {'kind': kind, 'key': key},
+        {
+            '$max': {'revoked_at': revoked_at},
+            '$set': {'expires_at': datetime.fromtimestamp(expires_at, timezone.utc)}
+        },
+        upsert=True
+    )
+
+
+async def load_revocations():
+    """Merge revocations recorded by any worker (or before a restart) into this process."""
+    from database import db
+    now = datetime.now(timezone.utc)
+    async for doc in db.token_revocations.find({'expires_at': {'$gt': now}}, {'_id': 0}):
+        if doc['kind'] == 'jti':
+            _revoked_jtis[doc['key']] = doc['expires_at'].replace(tzinfo=timezone.utc).timestamp()
+            continue
+        revoked = _user_revoked_before if doc['kind'] == 'user' else _tenant_revoked_before
+        revoked[doc['key']] = max(revoked.get(doc['key'], 0), doc['revoked_at'])
+    _prune_revocations()
+
+
+async def revoke_token(jti: str, expires_at: float):
+    """Reject a single token until it would have expired anyway."""
+    _revoked_jtis[jti] = expires_at
+    for key in [k for k in _principal_cache if k[1] == jti]:
+        _principal_cache.pop(key, None)
+    _prune_revocations()
+    await _persist_revocation('jti', jti, time.time(), expires_at)
+
+
+async def revoke_user_tokens(user_id: str):
+    """Reject every token issued to a user before now."""
+    revoked_at = time.time()
+    _user_revoked_before[user_id] = revoked_at
+    invalidate_user(user_id)
+    _prune_revocations()
+    await _persist_revocation('user', user_id, revoked_at, revoked_at + JWT_EXPIRY_HOURS * 3600)
+
+
+async def revoke_tenant_tokens(tenant_id: str):
+    """Reject every token issued to a tenant's users before now."""
+    revoked_at = time.time()
+    _tenant_revoked_before[tenant_id] = revoked_at
+    invalidate_tenant(tenant_id)
+    _prune_revocations()
+    await _persist_revocation('tenant', tenant_id, revoked_at, revoked_at + JWT_EXPIRY_HOURS * 3600)
+
+
+def _check_revocation(payload: dict):
+    issued_at = payload.get('iat', 0)
+    if payload.get('jti') in _revoked_jtis:
+        raise HTTPException(status_code=401, detail='Token revoked')
+    if issued_at < _user_revoked_before.get(payload.get('sub'), 0):
+        raise HTTPException(status_code=401, detail='Token revoked')
+    if payload.get('tenant_id') and issued_at < _tenant_revoked_before.get(payload['tenant_id'], 0):
+        raise HTTPException(status_code=401, detail='Token revoked')
+
+
+def is_revoked(payload: dict) -> bool:
+    """Whether a token accepted earlier (e.g. for a long-lived stream) has been revoked since."""
+    try:
+        _check_revocation(payload)
+    except HTTPException:
+        return True
+    return False
+
+
+def _cache_principal(key: tuple, user: dict):
+    now = time.monotonic()
+    if len(_principal_cache) >= PRINCIPAL_CACHE_MAX_ENTRIES:
+        for stale in [k for k, (exp, _) in _principal_cache.items() if exp <= now]:
+            del _principal_cache[stale]
+        if len(_principal_cache) >= PRINCIPAL_CACHE_MAX_ENTRIES:
+            _principal_cache.clear()
+    _principal_cache[key] = (now + PRINCIPAL_CACHE_TTL_SECONDS, user)
+
+
+def get_bearer_payload(request: HTTPConnection) -> dict:
     auth_header = request.headers.get('Authorization', '')
     if not auth_header.startswith('Bearer '):
         raise HTTPException(status_code=401, detail='Not authenticated')
-    token = auth_header[7:]
-    payload = decode_token(token)
+    payload = decode_token(auth_header[7:])
+    if payload.get('scope') == 'stream':
+        raise HTTPException(status_code=401, detail='Invalid token')
+    return payload
+
+
+async def get_current_user(request: Request) -> dict:
+    return await _principal_from_payload(get_bearer_payload(request))
+
+
+async def get_stream_user(connection: HTTPConnection) -> tuple:
+    """Authenticate an SSE/WebSocket connection; returns ``(user, token payload)``.
+
+    Browsers cannot set headers on EventSource or WebSocket, so a stream
+    ticket from ``POST /api/events/ticket`` may be passed as the ``ticket``
+    query parameter instead. Session tokens are never accepted in the URL.
+    """
+    ticket = connection.query_params.get('ticket')
+    if ticket and not connection.headers.get('Authorization'):
+        payload = decode_token(ticket)
+        if payload.get('scope') != 'stream':
+            raise HTTPException(status_code=401, detail='Invalid stream ticket')
+    else:
+        payload = get_bearer_payload(connection)
+    return await _principal_from_payload(payload), payload
+
+
+async def _principal_from_payload(payload: dict) -> dict:
+    _check_revocation(payload)
+    if payload.get('tenant_status') == 'suspended':
+        raise HTTPException(status_code=403, detail='Your account has been suspended')
+
+    key = (payload['sub'], payload.get('jti'))
+    cached = _principal_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return dict(cached[1])
+
     from database import db
     user = await db.users.find_one({'id': payload['sub']}, {'_id': 0})
     if not user:
         raise HTTPException(status_code=401, detail='User not found')
     if not user.get('email_verified') and user.get('role') != 'super_admin':
         raise HTTPException(status_code=403, detail='Email not verified')
-    return user
+    _cache_principal(key, user)
+    return dict(user)
 
 
 async def require_super_admin(user: dict = Depends(get_current_user)) -> dict:
@@ -0,0 +1,54 @@
+"""
+Background task registry.
+Maintenance loops (reconcilers, sweepers, workers) are started from the
+application startup hook and cancelled together on shutdown.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_tasks = []
+
+
+def start_task(name: str, coro) -> asyncio.Task:
+    """Schedule a coroutine on the running loop and keep track of it."""
+    task = asyncio.create_task(coro, name=name)
+    _tasks.append(task)
+    return task
+
+
+def run_periodic(name: str, func, interval_seconds: float, initial_delay: float = 0,
+                 single_worker: bool = False) -> asyncio.Task:
+    """Run ``await func()`` every ``interval_seconds`` until shutdown.
+
+    Errors are logged and the loop keeps going, so one failed run never
+    stops the job for the lifetime of the process. With ``single_worker``
+    each run first takes a lease named after the job, so only one worker
+    runs it; the lease outlives a missed run and then passes to another
+    worker.
+    """
+    async def _loop():
+        from campaign_lifecycle import acquire_lease
+
+        if initial_delay:
+            await asyncio.sleep(initial_delay)
+        while True:
+            try:
+                if not single_worker or await acquire_lease(name, ttl_seconds=int(interval_seconds * 2)):
+                    await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Background job {name} failed")
+            await asyncio.sleep(interval_seconds)
+
+    return start_task(name, _loop())
+
+
+async def shutdown():
+    """Cancel every registered task and wait for them to finish."""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
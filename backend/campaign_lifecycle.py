@@ -0,0 +1,311 @@
+"""
+Campaign lifecycle scheduler.
+
+Campaign windows (``starts_at``/``ends_at`` from the builder,
+``start_date``/``end_date`` from tenant routes) are enforced by flipping the
+campaign status at the boundary instead of parsing dates on every spin:
+``test`` campaigns go live at their start, and ``test``/``active``/``paused``
+campaigns end at their end. Only campaigns put in test mode before their
+start (``test_since``) go live by themselves, and only if they pass the same
+publish checks as the status routes; failing ones stay in test with an
+audit entry.
+
+Upcoming transitions sit in a min-heap and the scheduler sleeps until the
+earliest one. Heap entries are only hints: when one fires, the campaign is
+re-read and the transition re-derived, so stale entries are harmless. Route
+handlers call ``notify`` after changing a campaign's status or dates, and the
+heap is rebuilt from the database every ``LIFECYCLE_RESCAN_SECONDS`` to pick
+up changes made through other workers.
+
+Only one worker runs the scheduler: leadership is a lease document in
+``scheduler_leases`` that the leader renews and others take over once it
+lapses. Transition listeners (``on_transition``) let each module drop its
+own public caches.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+from game_engine import publish_errors
+from timeutils import utcnow, parse_datetime
+import metrics
+import prize_repository
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'campaign-lifecycle'
+LEASE_TTL_SECONDS = int(os.environ.get('LIFECYCLE_LEASE_TTL_SECONDS', '30'))
+RESCAN_SECONDS = int(os.environ.get('LIFECYCLE_RESCAN_SECONDS', '300'))
+MAX_BACKOFF_SECONDS = 300
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+SCHEDULED_STATUSES = ['test', 'active', 'paused']
+WINDOW_PROJECTION = {'_id': 0, 'id': 1, 'tenant_id': 1, 'slug': 1, 'title': 1, 'name': 1, 'status': 1,
+                     'starts_at': 1, 'ends_at': 1, 'start_date': 1, 'end_date': 1, 'test_since': 1}
+
+_listeners = []
+
+
+# ==================== WINDOW RULES ====================
+
+def _bound(value, end: bool) -> Optional[datetime]:
+    moment = parse_datetime(value)
+    # A bare date as end bound covers that whole day
+    if moment and end and isinstance(value, str) and len(value) == 10:
+        moment += timedelta(days=1)
+    return moment
+
+
+def campaign_window(campaign: dict) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """``(start, end)`` of a campaign from builder or tenant date fields."""
+    return (
+        _bound(campaign.get('starts_at') or campaign.get('start_date'), end=False),
+        _bound(campaign.get('ends_at') or campaign.get('end_date'), end=True)
+    )
+
+
+def _auto_starts(campaign: dict, start: Optional[datetime]) -> bool:
+    # Test mode entered after the start date is for testing, not a publish request
+    test_since = parse_datetime(campaign.get('test_since'))
+    return bool(start and test_since and test_since < start and campaign.get('status') == 'test')
+
+
+def scheduled_status(campaign: dict, now: datetime) -> Optional[str]:
+    """Status the schedule calls for at ``now``, or None if no change is due."""
+    start, end = campaign_window(campaign)
+    status = campaign.get('status')
+    if end and now >= end and status in SCHEDULED_STATUSES:
+        return 'ended'
+    if _auto_starts(campaign, start) and now >= start:
+        return 'active'
+    return None
+
+
+def next_transition(campaign: dict, now: datetime) -> Optional[datetime]:
+    """When the campaign's next scheduled transition is due (possibly already)."""
+    status = campaign.get('status')
+    if status not in SCHEDULED_STATUSES:
+        return None
+    start, end = campaign_window(campaign)
+    if scheduled_status(campaign, now):
+        return now
+    if _auto_starts(campaign, start):
+        return start
+    return end
+
+
+# ==================== TRANSITIONS ====================
+
+def on_transition(callback):
+    """Register ``callback(campaign, new_status)`` to run after each transition."""
+    _listeners.append(callback)
+    return callback
+
+
+async def _block_auto_publish(campaign: dict, errors: list, now: datetime):
+    """Keep a failing campaign in test and stop retrying until it re-enters test mode."""
+    result = await db.campaigns.update_one(
+        {'id': campaign['id'], 'status': 'test'},
+        {'$unset': {'test_since': ''}, '$set': {'auto_publish_errors': errors, 'updated_at': now.isoformat()}}
+    )
+    campaign.pop('test_since', None)
+    if not result.modified_count:
+        return
+    await db.audit_logs.insert_one({
+        'id': str(uuid.uuid4()),
+        'tenant_id': campaign.get('tenant_id'),
+        'user_id': 'system',
+        'action': 'campaign_auto_publish_blocked',
+        'category': 'campaign',
+        'details': f'Campaign "{campaign.get("title") or campaign.get("name", "")}" not started: '
+                   f'{", ".join(errors)}',
+        'ip_address': 'system',
+        'created_at': datetime.now(timezone.utc).isoformat()
+    })
+    metrics.increment('campaign_auto_publish_blocked')
+
+
+async def apply_transition(campaign: dict, target: str, now: datetime) -> bool:
+    """Apply a schedule transition unless someone changed the status meanwhile.
+
+    Going live runs the publish checks first; failures are recorded instead.
+    """
+    if target == 'active':
+        full = await prize_repository.get_campaign_with_prizes({'id': campaign['id']})
+        errors = publish_errors(full) if full else ['Campaign not found']
+        if errors:
+            await _block_auto_publish(campaign, errors, now)
+            return False
+
+    stamp = now.isoformat()
+    update = {'status': target, 'updated_at': stamp}
+    if target == 'active':
+        update.update({'activated_at': stamp, 'activated_by': 'system'})
+    else:
+        update.update({'ended_at': stamp, 'ended_by': 'system'})
+
+    result = await db.campaigns.update_one(
+        {'id': campaign['id'], 'status': campaign['status']},
+        {'$set': update, '$unset': {'auto_publish_errors': ''}}
+    )
+    if not result.modified_count:
+        return False
+
+    await db.audit_logs.insert_one({
+        'id': str(uuid.uuid4()),
+        'tenant_id': campaign.get('tenant_id'),
+        'user_id': 'system',
+        'action': 'campaign_scheduled_status',
+        'category': 'campaign',
+        'details': f'Campaign "{campaign.get("title") or campaign.get("name", "")}" status: '
+                   f'{campaign["status"]} -> {target} (schedule)',
+        'ip_address': 'system',
+        'created_at': datetime.now(timezone.utc).isoformat()
+    })
+    metrics.increment('campaign_scheduled_transitions', to=target)
+    for callback in _listeners:
+        try:
+            callback(campaign, target)
+        except Exception:
+            logger.exception("Campaign transition listener failed")
+    return True
+
+
+# ==================== LEADER LEASE ====================
+
+async def acquire_lease(name: str = LEASE_NAME, owner: str = WORKER_ID,
+                        ttl_seconds: int = LEASE_TTL_SECONDS) -> bool:
+    """Take or renew the lease; False while another live worker holds it."""
+    now = utcnow()
+    try:
+        await db.scheduler_leases.update_one(
+            {'_id': name, '$or': [{'owner': owner}, {'expires_at': {'$lte': now}}]},
+            {'$set': {'owner': owner, 'expires_at': now + timedelta(seconds=ttl_seconds), 'renewed_at': now}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The lease exists and belongs to someone else
+        return False
+    return True
+
+
+async def release_lease(name: str = LEASE_NAME, owner: str = WORKER_ID):
+    await db.scheduler_leases.delete_one({'_id': name, 'owner': owner})
+
+
+# ==================== SCHEDULER ====================
+
+class LifecycleScheduler:
+    def __init__(self):
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self.is_leader = False
+
+    def push(self, campaign: dict, now: Optional[datetime] = None):
+        due = next_transition(campaign, now or utcnow())
+        if due:
+            heapq.heappush(self._heap, (due, campaign['id']))
+            self._wakeup.set()
+
+    def next_due(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    async def load(self):
+        """Rebuild the heap from every campaign that can still transition."""
+        self._heap = []
+        now = utcnow()
+        async for campaign in db.campaigns.find({'status': {'$in': SCHEDULED_STATUSES}}, WINDOW_PROJECTION):
+            self.push(campaign, now)
+        logger.info(f"Lifecycle scheduler tracking {len(self._heap)} upcoming campaign transitions")
+
+    async def fire_due(self, now: Optional[datetime] = None) -> int:
+        """Apply every transition that is due; returns how many were applied."""
+        now = now or utcnow()
+        due_ids = set()
+        while self._heap and self._heap[0][0] <= now:
+            due_ids.add(heapq.heappop(self._heap)[1])
+        if not due_ids:
+            return 0
+
+        applied = 0
+        async for campaign in db.campaigns.find({'id': {'$in': list(due_ids)}}, WINDOW_PROJECTION):
+            target = scheduled_status(campaign, now)
+            if target and await apply_transition(campaign, target, now):
+                applied += 1
+                campaign['status'] = target
+            # Queue whatever comes next (e.g. the end of a campaign that just started)
+            self.push(campaign, now)
+        return applied
+
+    async def _sleep_until(self, deadline: datetime):
+        self._wakeup.clear()
+        timeout = max(0.0, (deadline - utcnow()).total_seconds())
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _step(self, renew_every: float, next_rescan: datetime) -> datetime:
+        """One pass of the leader loop; returns when the heap should next be rebuilt."""
+        now = utcnow()
+        leader = await acquire_lease()
+        if leader != self.is_leader:
+            logger.info(f"Lifecycle scheduler {'acquired' if leader else 'lost'} leadership ({WORKER_ID})")
+            self.is_leader = leader
+            next_rescan = now
+        if not leader:
+            await asyncio.sleep(renew_every)
+            return next_rescan
+
+        if now >= next_rescan:
+            await self.load()
+            next_rescan = now + timedelta(seconds=RESCAN_SECONDS)
+        await self.fire_due()
+
+        deadline = now + timedelta(seconds=renew_every)
+        if self.next_due():
+            deadline = min(deadline, self.next_due())
+        await self._sleep_until(deadline)
+        return next_rescan
+
+    async def run(self):
+        """Leader loop: hold the lease, sleep until the next transition, apply it.
+
+        Errors (e.g. Mongo unreachable) drop leadership and back off; the
+        heap is rebuilt once the lease is held again.
+        """
+        renew_every = LEASE_TTL_SECONDS / 3
+        next_rescan = utcnow()
+        failures = 0
+        try:
+            while True:
+                try:
+                    next_rescan = await self._step(renew_every, next_rescan)
+                    failures = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    failures += 1
+                    logger.exception("Lifecycle scheduler iteration failed")
+                    self.is_leader = False
+                    await asyncio.sleep(min(renew_every * 2 ** (failures - 1), MAX_BACKOFF_SECONDS))
+        finally:
+            if self.is_leader:
+                await release_lease()
+
+
+scheduler = LifecycleScheduler()
+
+
+def notify(campaign: dict):
+    """Tell the scheduler that a campaign's status or dates changed."""
+    if scheduler.is_leader:
+        scheduler.push(campaign)
@@ -0,0 +1,127 @@
+"""
+Response compression middleware.
+
+Pure ASGI middleware compressing JSON/text responses with brotli (when the
+``brotli`` package is installed) or gzip, negotiated from Accept-Encoding.
+Single-body responses under ``minimum_size`` are sent as-is. Streaming
+responses (CSV exports) are compressed chunk by chunk with a flush after
+each chunk, so nothing is buffered. Responses that already carry a
+Content-Encoding (precompressed translation bundles and game configs) pass
+through untouched, as do server-sent event streams, which must reach the
+client unbuffered. Compression CPU time is recorded in ``metrics``.
+"""
+import os
+import time
+import zlib
+
+import metrics
+from precompressed import brotli, parse_accept_encoding
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'text/', 'application/javascript', 'image/svg+xml', 'application/xml'
+)
+
+
+class _GzipStream:
+    def __init__(self):
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._z.compress(data)
+        return out + self._z.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+
+def _choose_encoding(scope) -> str:
+    for name, value in scope.get('headers', []):
+        if name == b'accept-encoding':
+            accepted = parse_accept_encoding(value.decode('latin-1'))
+            if brotli is not None and 'br' in accepted:
+                return 'br'
+            if 'gzip' in accepted:
+                return 'gzip'
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = _choose_encoding(scope)
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        stream = None
+        passthrough = False
+        cpu_ms = 0.0
+
+        async def send_compressed(message):
+            nonlocal start_message, stream, passthrough, cpu_ms
+            if message['type'] == 'http.response.start':
+                headers = {k.lower(): v for k, v in message.get('headers', [])}
+                content_type = headers.get(b'content-type', b'').decode('latin-1')
+                if (b'content-encoding' in headers
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)
+                        or content_type.startswith('text/event-stream')):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+            if stream is None:
+                if not more_body and len(body) < self.minimum_size:
+                    await send(start_message)
+                    await send(message)
+                    passthrough = True
+                    return
+                stream = _BrotliStream() if encoding == 'br' else _GzipStream()
+                headers = [
+                    (k, v) for k, v in start_message.get('headers', [])
+                    if k.lower() not in (b'content-length', b'etag')
+                ]
+                headers.append((b'content-encoding', encoding.encode()))
+                headers.append((b'vary', b'Accept-Encoding'))
+                started = time.thread_time()
+                compressed = stream.compress(body, final=not more_body)
+                cpu_ms += (time.thread_time() - started) * 1000
+                if not more_body:
+                    headers.append((b'content-length', str(len(compressed)).encode()))
+                await send({**start_message, 'headers': headers})
+            else:
+                started = time.thread_time()
+                compressed = stream.compress(body, final=not more_body)
+                cpu_ms += (time.thread_time() - started) * 1000
+
+            await send({'type': 'http.response.body', 'body': compressed, 'more_body': more_body})
+            metrics.increment('compression_bytes_in', len(body), encoding=encoding)
+            metrics.increment('compression_bytes_out', len(compressed), encoding=encoding)
+            if not more_body:
+                metrics.observe('compression_cpu_ms', cpu_ms, encoding=encoding)
+
+        await self.app(scope, receive, send_compressed)
@@ -1,27 +1,58 @@
 """
 Encryption utilities for secure storage of sensitive data like API keys.
-Uses Fernet symmetric encryption with keys derived from environment secret.
+Uses Fernet symmetric encryption with keys derived from environment secrets.
+
+``ENCRYPTION_SECRETS`` may hold a comma-separated list of secrets: the first
+one encrypts, all of them (plus the legacy JWT_SECRET-derived key) decrypt,
+so keys can be rotated without breaking existing ciphertexts. The cipher is
+built once per process.
 """
 import os
 import base64
 import hashlib
-from cryptography.fernet import Fernet
+from functools import lru_cache
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 
 
-def get_encryption_key() -> bytes:
-    """Derive a Fernet-compatible key from JWT_SECRET."""
-    secret = os.environ.get('JWT_SECRET', 'default-jwt-secret')
+def _derive_key(secret: str) -> bytes:
     # Derive 32 bytes using SHA256, then base64 encode for Fernet
     key_bytes = hashlib.sha256(secret.encode()).digest()
     return base64.urlsafe_b64encode(key_bytes)
 
 
+def get_encryption_key() -> bytes:
+    """Derive a Fernet-compatible key from JWT_SECRET."""
+    return _derive_key(os.environ.get('JWT_SECRET', 'default-jwt-secret'))
+
+
+@lru_cache(maxsize=1)
+def _get_fernets() -> tuple:
+    """Primary key first, then older keys, then the legacy JWT_SECRET key."""
+    secrets = [s.strip() for s in os.environ.get('ENCRYPTION_SECRETS', '').split(',') if s.strip()]
+    keys = [_derive_key(s) for s in secrets]
+    legacy = get_encryption_key()
+    if legacy not in keys:
+        keys.append(legacy)
+    return tuple(Fernet(k) for k in keys)
+
+
+@lru_cache(maxsize=1)
+def get_cipher() -> MultiFernet:
+    """The cached MultiFernet used for all encryption and decryption."""
+    return MultiFernet(list(_get_fernets()))
+
+
+def reset_cipher():
+    """Forget the cached cipher (e.g. after the key environment changed)."""
+    _get_fernets.cache_clear()
+    get_cipher.cache_clear()
+
+
 def encrypt_value(value: str) -> str:
     """Encrypt a string value and return base64-encoded ciphertext."""
     if not value:
         return ""
-    f = Fernet(get_encryption_key())
-    encrypted = f.encrypt(value.encode())
+    encrypted = get_cipher().encrypt(value.encode())
     return encrypted.decode()
 
 
@@ -30,13 +61,28 @@ def decrypt_value(encrypted_value: str) -> str:
     if not encrypted_value:
         return ""
     try:
-        f = Fernet(get_encryption_key())
-        decrypted = f.decrypt(encrypted_value.encode())
+        decrypted = get_cipher().decrypt(encrypted_value.encode())
         return decrypted.decode()
     except Exception:
         return ""
 
 
+def rotate_value(encrypted_value: str) -> str:
+    """Re-encrypt a ciphertext under the primary key (unchanged if unreadable)."""
+    if not encrypted_value:
+        return encrypted_value
+    token = encrypted_value.encode()
+    try:
+        _get_fernets()[0].decrypt(token)
+        return encrypted_value
+    except InvalidToken:
+        pass
+    try:
+        return get_cipher().rotate(token).decode()
+    except InvalidToken:
+        return encrypted_value
+
+
 def mask_key(key: str, visible_chars: int = 8) -> str:
     """Mask an API key showing only the last N characters."""
     if not key or len(key) <= visible_chars:
@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 from pathlib import Path
 import os
 
+from query_stats import InstrumentedDatabase
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -36,5 +38,6 @@ def _resolve_db_name(mongo_url: str) -> str:
 mongo_url = _resolve_mongo_url()
 db_name = _resolve_db_name(mongo_url)
 
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+# Every collection access goes through the query instrumentation layer
+db = InstrumentedDatabase(client[db_name])
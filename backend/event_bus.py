@@ -0,0 +1,140 @@
+"""
+Live activity event bus.
+
+Play and redemption write paths publish small events that are fanned out
+to SSE/WebSocket subscribers, so dashboards get new plays, wins and
+redemptions pushed instead of polling. Subscribers listen on
+``tenant:<id>`` channels or on ``admin`` (every tenant).
+
+With the default ``EVENT_BUS_BACKEND=memory`` events only reach clients
+connected to the worker that handled the write. ``changestream`` instead
+feeds every worker from MongoDB change streams on ``plays`` and
+``reward_codes`` (replica set required), and local publishing is skipped.
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from database import db
+from timeutils import utcnow
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUS_BACKEND = os.environ.get('EVENT_BUS_BACKEND', 'memory')
+SUBSCRIBER_QUEUE_SIZE = 100
+ADMIN_CHANNEL = 'admin'
+
+_subscribers = {}
+
+
+def tenant_channel(tenant_id: str) -> str:
+    return f'tenant:{tenant_id}'
+
+
+def _deliver(event: dict):
+    channels = (tenant_channel(event['tenant_id']), ADMIN_CHANNEL)
+    for channel in channels:
+        for queue in _subscribers.get(channel, ()):
+            if queue.full():
+                # Slow consumer: drop its oldest event rather than block writers
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+@asynccontextmanager
+async def subscribe(channels: list):
+    """Yield a queue receiving every event published on ``channels``."""
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    for channel in channels:
+        _subscribers.setdefault(channel, set()).add(queue)
+    try:
+        yield queue
+    finally:
+        for channel in channels:
+            subscribers = _subscribers.get(channel)
+            if subscribers:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del _subscribers[channel]
+
+
+def subscriber_count() -> int:
+    return sum(len(s) for s in _subscribers.values())
+
+
+# ==================== EVENT BUILDERS ====================
+
+def _play_event(play: dict) -> dict:
+    won = play.get('prize_id') is not None
+    return {
+        'type': 'win' if won else 'play',
+        'tenant_id': play['tenant_id'],
+        'at': play.get('played_at') or utcnow(),
+        'data': {
+            'id': play.get('play_id') or play.get('id'),
+            'campaign_id': play.get('campaign_id'),
+            'email': play.get('email'),
+            'won': won,
+            'prize_label': play.get('prize_label'),
+            'is_test': play.get('is_test', False),
+            'played_at': play.get('played_at')
+        }
+    }
+
+
+def _redemption_event(reward: dict) -> dict:
+    return {
+        'type': 'redemption',
+        'tenant_id': reward['tenant_id'],
+        'at': reward.get('redeemed_at') or utcnow(),
+        'data': {
+            'code': reward.get('code'),
+            'campaign_id': reward.get('campaign_id'),
+            'prize_id': reward.get('prize_id'),
+            'redeemed_at': reward.get('redeemed_at'),
+            'redeemed_by': reward.get('redeemed_by')
+        }
+    }
+
+
+# ==================== WRITE PATH HOOKS ====================
+
+def publish_play(play: dict):
+    if subscriber_count() and EVENT_BUS_BACKEND == 'memory':
+        _deliver(_play_event(play))
+
+
+def publish_redemption(reward: dict):
+    if subscriber_count() and EVENT_BUS_BACKEND == 'memory':
+        _deliver(_redemption_event(reward))
+
+
+# ==================== CHANGE STREAM ADAPTER ====================
+
+async def _watch(collection, pipeline: list, build_event, **kwargs):
+    while True:
+        try:
+            async with collection.watch(pipeline, **kwargs) as stream:
+                async for change in stream:
+                    doc = change.get('fullDocument')
+                    if doc and doc.get('tenant_id') and subscriber_count():
+                        _deliver(build_event(doc))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"Change stream on {collection.name} failed, retrying")
+            await asyncio.sleep(5)
+
+
+async def run_change_stream_adapter():
+    """Feed the local bus from MongoDB change streams (multi-worker setups)."""
+    await asyncio.gather(
+        _watch(db.plays, [{'$match': {'operationType': 'insert'}}], _play_event),
+        _watch(
+            db.reward_codes,
+            [{'$match': {'operationType': 'update', 'updateDescription.updatedFields.status': 'redeemed'}}],
+            _redemption_event,
+            full_document='updateLookup'
+        )
+    )
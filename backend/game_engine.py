@@ -48,3 +48,23 @@ def validate_campaign_for_publish(campaign: dict, prizes: list) -> list:
     if not campaign.get('legal_text'):
         errors.append('Legal text is required')
     return errors
+
+
+def validate_builder_campaign_for_publish(campaign: dict) -> list:
+    """Validate a builder (admin-created) campaign before going live. Returns list of errors."""
+    prizes = campaign.get('prizes') or []
+    if not prizes:
+        return ['No prizes configured']
+    errors = []
+    if sum(p.get('stock_remaining', 0) for p in prizes) <= 0:
+        errors.append('No stock available')
+    if not campaign.get('terms_text'):
+        errors.append('Terms text is required')
+    return errors
+
+
+def publish_errors(campaign: dict) -> list:
+    """Errors blocking ``campaign`` (with its prizes) from going live, by the rules of its editor."""
+    if campaign.get('created_by_admin'):
+        return validate_builder_campaign_for_publish(campaign)
+    return validate_campaign_for_publish(campaign, campaign.get('prizes') or [])
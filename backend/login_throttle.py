@@ -0,0 +1,127 @@
+"""
+Login brute-force throttle.
+
+Every login attempt pours one drop into a per-IP and a per-email leaky
+bucket before any database or bcrypt work happens; a full bucket rejects
+the attempt with a 429 until enough drops have leaked out. Buckets live in
+memory by default. Set ``LOGIN_THROTTLE_BACKEND=mongo`` to share them
+between workers through the ``login_throttle`` collection, whose documents
+expire through a TTL index once drained.
+"""
+import math
+import os
+import time
+from datetime import timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+import metrics
+from auth import hash_identifier
+from database import db
+from timeutils import utcnow
+
+THROTTLE_BACKEND = os.environ.get('LOGIN_THROTTLE_BACKEND', 'memory')
+
+# (capacity, drops leaked per second) for each bucket scope
+BUCKETS = {
+    'email': (
+        int(os.environ.get('LOGIN_THROTTLE_EMAIL_CAPACITY', '5')),
+        float(os.environ.get('LOGIN_THROTTLE_EMAIL_PER_MINUTE', '1')) / 60
+    ),
+    'ip': (
+        int(os.environ.get('LOGIN_THROTTLE_IP_CAPACITY', '30')),
+        float(os.environ.get('LOGIN_THROTTLE_IP_PER_MINUTE', '10')) / 60
+    ),
+}
+
+MEMORY_MAX_BUCKETS = 100000
+
+_buckets = {}
+
+
+def _bucket_key(scope: str, value: str) -> str:
+    return f'{scope}:{hash_identifier(value)}'
+
+
+# ==================== MEMORY BACKEND ====================
+
+def _prune_memory(now: float):
+    for key, (level, updated, rate) in list(_buckets.items()):
+        if level - (now - updated) * rate <= 0:
+            del _buckets[key]
+    if len(_buckets) >= MEMORY_MAX_BUCKETS:
+        _buckets.clear()
+
+
+def _pour_memory(key: str, capacity: int, rate: float) -> Optional[float]:
+    now = time.monotonic()
+    level, updated, _ = _buckets.get(key, (0.0, now, rate))
+    level = max(0.0, level - (now - updated) * rate)
+    if level + 1 > capacity:
+        _buckets[key] = (level, now, rate)
+        return (level + 1 - capacity) / rate
+    if key not in _buckets and len(_buckets) >= MEMORY_MAX_BUCKETS:
+        _prune_memory(now)
+    _buckets[key] = (level + 1, now, rate)
+    return None
+
+
+# ==================== MONGO BACKEND ====================
+
+async def _pour_mongo(key: str, capacity: int, rate: float) -> Optional[float]:
+    now = utcnow()
+    elapsed_seconds = {'$divide': [{'$subtract': [now, {'$ifNull': ['$updated_at', now]}]}, 1000]}
+    doc = await db.login_throttle.find_one_and_update(
+        {'key': key},
+        [
+            {'$set': {'level': {'$max': [0, {'$subtract': [
+                {'$ifNull': ['$level', 0]}, {'$multiply': [elapsed_seconds, rate]}
+            ]}]}}},
+            {'$set': {'allowed': {'$lte': [{'$add': ['$level', 1]}, capacity]}}},
+            {'$set': {
+                'level': {'$cond': ['$allowed', {'$add': ['$level', 1]}, '$level']},
+                'updated_at': now,
+                'expires_at': now + timedelta(seconds=capacity / rate)
+            }}
+        ],
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        projection={'_id': 0, 'level': 1, 'allowed': 1}
+    )
+    if doc['allowed']:
+        return None
+    return (doc['level'] + 1 - capacity) / rate
+
+
+# ==================== PUBLIC API ====================
+
+async def _pour(key: str, capacity: int, rate: float) -> Optional[float]:
+    if THROTTLE_BACKEND == 'mongo':
+        return await _pour_mongo(key, capacity, rate)
+    return _pour_memory(key, capacity, rate)
+
+
+async def check_login_attempt(email: str, ip_address: str):
+    """Account for one login attempt; raise a 429 if a bucket is full."""
+    metrics.increment('login_attempts')
+    for scope, value in (('ip', ip_address), ('email', email)):
+        capacity, rate = BUCKETS[scope]
+        retry_after = await _pour(_bucket_key(scope, value), capacity, rate)
+        if retry_after is not None:
+            metrics.increment('login_throttle_rejected', scope=scope)
+            raise HTTPException(
+                429,
+                'Too many login attempts, please try again later',
+                headers={'Retry-After': str(math.ceil(retry_after))}
+            )
+
+
+async def clear_email(email: str):
+    """Empty the email bucket after a successful login."""
+    key = _bucket_key('email', email)
+    if THROTTLE_BACKEND == 'mongo':
+        await db.login_throttle.delete_one({'key': key})
+    else:
+        _buckets.pop(key, None)
@@ -0,0 +1,151 @@
+"""
+Tenant inbox for admin messages.
+
+A tenant sees every unexpired broadcast plus the unexpired messages that
+target it. The active broadcast set is shared by all tenants, so it is
+cached in memory for ``BROADCAST_CACHE_TTL_SECONDS`` and dropped whenever
+an admin creates or deletes a message. Read state for a page of messages is
+resolved with a single ``$in`` query on ``tenant_message_reads``.
+
+Each message also carries ``read_count`` and ``total_recipients`` counters,
+maintained on read receipts and tenant creation and repaired by
+``reconcile_message_counters``, so the admin listing is a single query.
+"""
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_CACHE_TTL_SECONDS = float(os.environ.get('BROADCAST_CACHE_TTL_SECONDS', '60'))
+INBOX_LIMIT = 50
+
+_broadcasts = None
+
+
+def _not_expired(now: str) -> dict:
+    return {'$or': [{'expires_at': None}, {'expires_at': {'$gt': now}}]}
+
+
+def _visible_to(tenant_id: str) -> dict:
+    return {'$or': [{'target_type': 'broadcast'}, {'target_tenant_ids': tenant_id}]}
+
+
+def _is_active(message: dict, now: str) -> bool:
+    expires_at = message.get('expires_at')
+    return not expires_at or expires_at > now
+
+
+def invalidate_broadcasts():
+    global _broadcasts
+    _broadcasts = None
+
+
+async def _active_broadcasts(now: str) -> list:
+    global _broadcasts
+    if _broadcasts is None or _broadcasts[0] <= time.monotonic():
+        messages = await db.admin_messages.find(
+            {'$and': [{'target_type': 'broadcast'}, _not_expired(now)]}, {'_id': 0}
+        ).sort('created_at', -1).to_list(INBOX_LIMIT)
+        _broadcasts = (time.monotonic() + BROADCAST_CACHE_TTL_SECONDS, messages)
+    # Entries may expire while cached
+    return [m for m in _broadcasts[1] if _is_active(m, now)]
+
+
+async def active_messages(tenant_id: str, projection: dict = None) -> list:
+    """Newest visible messages for a tenant (at most ``INBOX_LIMIT``)."""
+    now = datetime.now(timezone.utc).isoformat()
+    targeted = await db.admin_messages.find(
+        {'$and': [{'target_type': 'targeted', 'target_tenant_ids': tenant_id}, _not_expired(now)]},
+        projection or {'_id': 0}
+    ).sort('created_at', -1).to_list(INBOX_LIMIT)
+    broadcasts = await _active_broadcasts(now)
+    if projection:
+        broadcasts = [{k: m.get(k) for k in projection if k != '_id'} for m in broadcasts]
+    messages = sorted(broadcasts + targeted, key=lambda m: m.get('created_at') or '', reverse=True)
+    return messages[:INBOX_LIMIT]
+
+
+async def read_message_ids(tenant_id: str, message_ids: list) -> set:
+    reads = await db.tenant_message_reads.find(
+        {'tenant_id': tenant_id, 'message_id': {'$in': message_ids}},
+        {'_id': 0, 'message_id': 1}
+    ).to_list(len(message_ids) or 1)
+    return {r['message_id'] for r in reads}
+
+
+async def list_inbox(tenant_id: str) -> list:
+    messages = await active_messages(tenant_id)
+    read_ids = await read_message_ids(tenant_id, [m['id'] for m in messages])
+    for m in messages:
+        m['is_read'] = m['id'] in read_ids
+    return messages
+
+
+async def unread_count(tenant_id: str) -> int:
+    """Unread visible messages, without loading message bodies."""
+    ids = [m['id'] for m in await active_messages(tenant_id, {'_id': 0, 'id': 1, 'created_at': 1})]
+    return len(ids) - len(await read_message_ids(tenant_id, ids))
+
+
+async def mark_read(tenant_id: str, message_id: str) -> bool:
+    """Record a read receipt; returns False if the message was already read
+    or is not addressed to the tenant."""
+    visible = {'id': message_id, **_visible_to(tenant_id)}
+    if not await db.admin_messages.find_one(visible, {'_id': 1}):
+        return False
+    try:
+        await db.tenant_message_reads.insert_one({
+            'tenant_id': tenant_id,
+            'message_id': message_id,
+            'read_at': datetime.now(timezone.utc).isoformat()
+        })
+    except DuplicateKeyError:
+        return False
+    await db.admin_messages.update_one(visible, {'$inc': {'read_count': 1}})
+    return True
+
+
+# ==================== ADMIN COUNTERS ====================
+
+async def initial_recipients(target_type: str, target_tenant_ids: list) -> int:
+    if target_type == 'broadcast':
+        return await db.tenants.count_documents({})
+    return len(target_tenant_ids or [])
+
+
+async def record_tenant_created():
+    """A new tenant is one more recipient of every broadcast."""
+    await db.admin_messages.update_many({'target_type': 'broadcast'}, {'$inc': {'total_recipients': 1}})
+
+
+async def reconcile_message_counters() -> int:
+    """Recompute read/recipient counters from the source collections.
+
+    Returns the number of messages corrected.
+    """
+    tenant_count = await db.tenants.count_documents({})
+    reads = {
+        row['_id']: row['count']
+        for row in await db.tenant_message_reads.aggregate([
+            {'$group': {'_id': '$message_id', 'count': {'$sum': 1}}}
+        ]).to_list(None)
+    }
+    corrected = 0
+    async for m in db.admin_messages.find({}, {'_id': 0, 'id': 1, 'target_type': 1, 'target_tenant_ids': 1,
+                                               'read_count': 1, 'total_recipients': 1}):
+        expected = {
+            'read_count': reads.get(m['id'], 0),
+            'total_recipients': tenant_count if m.get('target_type') == 'broadcast' else len(m.get('target_tenant_ids') or [])
+        }
+        if any(m.get(k) != v for k, v in expected.items()):
+            await db.admin_messages.update_one({'id': m['id']}, {'$set': expected})
+            corrected += 1
+    if corrected:
+        logger.warning(f"Message counter reconciler corrected {corrected} messages")
+    return corrected
@@ -0,0 +1,68 @@
+"""
+In-process metrics registry.
+
+Counters and timing summaries are kept per worker process and exposed to
+super admins through ``GET /api/admin/metrics``. Label values are folded
+into the metric key, e.g. ``login_throttle_rejected{scope=ip}``. Histograms
+are timing summaries that also count samples per bucket, keyed by upper bound.
+"""
+from collections import defaultdict
+
+# Upper bounds (milliseconds) of histogram buckets; larger samples land in "+Inf"
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_counters = defaultdict(int)
+_timings = {}
+
+
+def _key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}={v}' for k, v in sorted(labels.items())) + '}'
+
+
+def increment(name: str, value: int = 1, **labels):
+    _counters[_key(name, labels)] += value
+
+
+def observe(name: str, value: float, **labels):
+    """Record one sample (e.g. a duration in milliseconds)."""
+    key = _key(name, labels)
+    summary = _timings.get(key)
+    if summary is None:
+        summary = _timings[key] = {'count': 0, 'sum': 0.0, 'max': 0.0}
+    summary['count'] += 1
+    summary['sum'] += value
+    summary['max'] = max(summary['max'], value)
+    return summary
+
+
+def histogram(name: str, value: float, buckets: tuple = LATENCY_BUCKETS_MS, **labels):
+    """Record one sample in a summary with per-bucket counts."""
+    summary = observe(name, value, **labels)
+    counts = summary.get('buckets')
+    if counts is None:
+        counts = summary['buckets'] = {str(b): 0 for b in buckets}
+        counts['+Inf'] = 0
+    for bound in buckets:
+        if value <= bound:
+            counts[str(bound)] += 1
+            break
+    else:
+        counts['+Inf'] += 1
+
+
+def snapshot() -> dict:
+    timings = {
+        key: {**summary, 'avg': summary['sum'] / summary['count'] if summary['count'] else 0.0}
+        for key, summary in _timings.items()
+    }
+    for summary in timings.values():
+        if 'buckets' in summary:
+            summary['buckets'] = dict(summary['buckets'])
+    return {'counters': dict(_counters), 'timings': timings}
+
+
+def reset():
+    _counters.clear()
+    _timings.clear()
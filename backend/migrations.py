@@ -0,0 +1,245 @@
+"""
+Data migrations run in the background after startup.
+Each migration is idempotent and works in batches so it can run against a
+live database without long-held locks or unbounded memory use. Progress is
+checkpointed in the ``migrations`` collection, so a restart resumes from the
+last processed ``_id`` instead of starting over.
+"""
+import base64
+import binascii
+import inspect
+import logging
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from database import db
+from timeutils import utcnow, parse_datetime, mark_timestamps_converted
+from player_search import build_search_tokens
+from asset_store import store_image, public_asset, ASSET_BASE_URL, DEFAULT_VARIANT
+import prize_repository
+from repositories import Plays
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# Timestamp fields stored as BSON datetimes on each event collection, in
+# conversion order: reward expiry drives redemption, so it goes first
+EVENT_TIMESTAMP_FIELDS = {
+    'reward_codes': ('created_at', 'expires_at', 'redeemed_at'),
+    'plays': ('created_at', 'played_at'),
+    'players': ('created_at',),
+    'consents': ('created_at',),
+    'fraud_flags': ('created_at',),
+}
+
+
+async def run_batched_migration(
+    name: str,
+    collection_name: str,
+    query: dict,
+    build_update,
+    projection: dict = None,
+    batch_size: int = BATCH_SIZE
+) -> int:
+    """Apply ``build_update(doc)`` to every matching document, batch by batch.
+
+    Documents are walked in ``_id`` order and the last processed ``_id`` is
+    checkpointed after every batch. ``build_update`` returns (or, when it is
+    a coroutine function, resolves to) an update document, or None to leave
+    the document untouched. Returns the number of documents updated by this
+    run.
+    """
+    state = await db.migrations.find_one({'name': name}) or {}
+    if state.get('completed_at'):
+        return 0
+
+    collection = db[collection_name]
+    last_id = state.get('last_id')
+    updated = 0
+
+    while True:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query['_id'] = {'$gt': last_id}
+        docs = await collection.find(batch_query, projection).sort('_id', 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+
+        ops = []
+        for doc in docs:
+            update = build_update(doc)
+            if inspect.isawaitable(update):
+                update = await update
+            if update:
+                ops.append(UpdateOne({'_id': doc['_id']}, update))
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+
+        last_id = docs[-1]['_id']
+        await db.migrations.update_one(
+            {'name': name},
+            {'$set': {'last_id': last_id, 'updated_at': utcnow()}, '$inc': {'processed': len(ops)}},
+            upsert=True
+        )
+
+    await db.migrations.update_one(
+        {'name': name},
+        {'$set': {'completed_at': utcnow(), 'updated_at': utcnow()}},
+        upsert=True
+    )
+    if updated:
+        logger.info(f"Migration {name}: updated {updated} documents")
+    return updated
+
+
+def _timestamp_update(fields: tuple):
+    def build(doc):
+        update = {}
+        for field in fields:
+            value = doc.get(field)
+            if isinstance(value, str):
+                parsed = parse_datetime(value)
+                update[field] = parsed
+                if parsed is None and value:
+                    update[f'{field}_raw'] = value
+        return {'$set': update} if update else None
+    return build
+
+
+async def convert_string_timestamps(collection_name: str, fields: tuple) -> int:
+    """Convert ISO-string timestamps to BSON datetimes with bulk writes.
+
+    Unparseable values are kept in ``<field>_raw``. Once done, queries on
+    the collection stop matching legacy strings (``timeutils.time_clauses``).
+    """
+    converted = await run_batched_migration(
+        f'event_timestamps:{collection_name}',
+        collection_name,
+        {'$or': [{f: {'$type': 'string'}} for f in fields]},
+        _timestamp_update(fields),
+        projection={f: 1 for f in fields}
+    )
+    mark_timestamps_converted(collection_name)
+    return converted
+
+
+def _played_at_update(doc):
+    played_at = parse_datetime(doc.get('created_at'))
+    if played_at is None:
+        played_at = getattr(doc['_id'], 'generation_time', None) or utcnow()
+    return {'$set': {'played_at': played_at}}
+
+
+async def backfill_played_at() -> int:
+    """Guarantee a datetime ``played_at`` on every play.
+
+    Legacy plays only carried ``created_at``; falls back to the ObjectId
+    creation time when that is missing too. Play counts match ``created_at``
+    on plays without ``played_at`` until this has run.
+    """
+    backfilled = await run_batched_migration(
+        'plays_played_at',
+        'plays',
+        {'$or': [{'played_at': {'$exists': False}}, {'played_at': None}]},
+        _played_at_update,
+        projection={'created_at': 1}
+    )
+    Plays.mark_played_at_backfilled()
+    return backfilled
+
+
+def _search_tokens_update(doc):
+    tokens = build_search_tokens(doc.get('email'), doc.get('phone'), doc.get('first_name'))
+    return {'$set': {'search_tokens': tokens}}
+
+
+async def backfill_search_tokens() -> int:
+    """Index email/phone/first name prefixes on plays recorded before search tokens existed."""
+    return await run_batched_migration(
+        'plays_search_tokens',
+        'plays',
+        {'search_tokens': {'$exists': False}},
+        _search_tokens_update,
+        projection={'email': 1, 'phone': 1, 'first_name': 1}
+    )
+
+
+def _decode_data_url(value: str) -> bytes:
+    # The declared media type is ignored: the asset store detects it from the bytes
+    _, _, payload = value.partition(',')
+    return base64.b64decode(payload, validate=True)
+
+
+async def _inline_logo_update(doc):
+    branding = doc.get('branding') or {}
+    profile = doc.get('profile') or {}
+    data_url = next(
+        (v for v in (branding.get('logo_url'), profile.get('logo_url')) if isinstance(v, str) and v.startswith('data:')),
+        None
+    )
+    if not data_url:
+        return None
+    try:
+        asset = await store_image(_decode_data_url(data_url), tenant_id=doc.get('id'))
+    except (binascii.Error, ValueError, HTTPException):
+        # Includes SVG logos, which are not accepted as assets: keep them inline
+        logger.warning(f"Tenant {doc.get('id')}: inline logo is not a supported raster image, left in place")
+        return None
+    logo = public_asset(asset, ASSET_BASE_URL)
+    return {'$set': {
+        'branding.logo_url': logo['urls'][DEFAULT_VARIANT],
+        'profile.logo_url': logo['urls'][DEFAULT_VARIANT],
+        'branding.logo_asset': logo
+    }}
+
+
+async def migrate_inline_logos() -> int:
+    """Move base64 data-URL logos out of tenant documents into the asset store.
+
+    Logos the asset store refuses (SVG, corrupt data) stay inline. Stored
+    logo URLs must be absolute like uploaded ones, so nothing runs until
+    ``ASSET_BASE_URL`` (or ``REACT_APP_BACKEND_URL``) is an absolute URL.
+    """
+    if not ASSET_BASE_URL.startswith(('http://', 'https://')):
+        logger.warning("Inline logo migration skipped: set ASSET_BASE_URL to the absolute URL assets are served from")
+        return 0
+    return await run_batched_migration(
+        'tenant_logos_to_assets',
+        'tenants',
+        {'$or': [{'branding.logo_url': {'$regex': '^data:'}}, {'profile.logo_url': {'$regex': '^data:'}}]},
+        _inline_logo_update,
+        projection={'id': 1, 'branding.logo_url': 1, 'profile.logo_url': 1},
+        batch_size=50
+    )
+
+
+async def migrate_event_timestamps():
+    """Convert historical string timestamps, then backfill ``played_at``."""
+    for collection_name, fields in EVENT_TIMESTAMP_FIELDS.items():
+        await convert_string_timestamps(collection_name, fields)
+    await backfill_played_at()
+
+
+async def _embed_prize_update(doc):
+    await prize_repository.push_legacy_prize(doc)
+    return {'$set': {'migrated_at': utcnow()}}
+
+
+async def migrate_prize_collection() -> int:
+    """Embed ``prizes`` collection documents into their campaigns' ``prizes`` array.
+
+    Migrated documents are only marked, not deleted, so the move can be
+    audited or reverted.
+    """
+    moved = await run_batched_migration(
+        'prizes_embedded_in_campaigns',
+        'prizes',
+        {'migrated_at': {'$exists': False}},
+        _embed_prize_update,
+        batch_size=200
+    )
+    prize_repository.mark_legacy_migrated()
+    return moved
@@ -0,0 +1,123 @@
+"""
+Keyset (cursor-based) pagination helpers.
+
+Pages are addressed with an opaque ``after`` token encoding the sort key
+value and the ``id`` of the last row returned, so the next page is an
+index range scan instead of an O(offset) ``skip``.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+from timeutils import parse_datetime
+
+
+def encode_cursor(sort_value, doc_id: str) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = {'$date': sort_value.isoformat()}
+    raw = json.dumps([sort_value, doc_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Tuple[object, str]]:
+    """Decode an ``after`` token; raises a 400 for malformed tokens."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(400, 'Invalid pagination cursor')
+    if isinstance(sort_value, dict) and '$date' in sort_value:
+        sort_value = parse_datetime(sort_value['$date'])
+    return sort_value, doc_id
+
+
+def keyset_filter(sort_key: str, cursor: Tuple[object, str], direction: int = -1, id_key: str = 'id') -> dict:
+    """Match rows strictly after ``cursor`` in ``(sort_key, id_key)`` order.
+
+    Mongo sorts null and missing keys before any value, i.e. at the end of
+    descending pages and at the start of ascending ones; range operators
+    never match them, so they get a branch of their own.
+    """
+    sort_value, doc_id = cursor
+    op = '$lt' if direction < 0 else '$gt'
+    clauses = [{sort_key: sort_value, id_key: {op: doc_id}}]
+    if sort_value is None:
+        if direction > 0:
+            clauses.insert(0, {sort_key: {'$ne': None}})
+    else:
+        clauses.insert(0, {sort_key: {op: sort_value}})
+        if direction < 0:
+            clauses.append({sort_key: None})
+    return {'$or': clauses}
+
+
+def apply_keyset(query: dict, sort_key: str, cursor, direction: int = -1, id_key: str = 'id') -> dict:
+    if not cursor:
+        return query
+    return {'$and': [query, keyset_filter(sort_key, cursor, direction, id_key)]}
+
+
+# Filtered "estimate" counts stop scanning after this many matches
+ESTIMATE_CAP = 10000
+
+TOTAL_MODE_PATTERN = '^(exact|estimate|none)$'
+
+
+async def count_total(collection, query: dict, mode: str = 'exact') -> Optional[int]:
+    """Count matching documents according to ``mode``.
+
+    ``exact`` runs ``count_documents``; ``estimate`` uses collection metadata
+    for unfiltered queries and a count capped at ``ESTIMATE_CAP`` otherwise
+    (so the value is a lower bound past the cap); ``none`` skips counting.
+    """
+    if mode == 'none':
+        return None
+    if mode == 'estimate':
+        if not query:
+            return await collection.estimated_document_count()
+        return await collection.count_documents(query, limit=ESTIMATE_CAP)
+    return await collection.count_documents(query)
+
+
+async def paginate(
+    collection,
+    query: dict,
+    sort_key: str = 'created_at',
+    direction: int = -1,
+    limit: int = 50,
+    after: Optional[str] = None,
+    skip: int = 0,
+    projection: dict = None,
+    total_mode: str = 'exact',
+    id_key: str = 'id'
+) -> dict:
+    """Fetch one page ordered by ``(sort_key, id_key)``.
+
+    With an ``after`` token the page starts right after the encoded row;
+    without one, the legacy ``skip`` offset is applied so existing clients
+    keep working during the transition. Returns ``items``, ``total`` and
+    ``next_cursor`` (None on the last page).
+    """
+    cursor = decode_cursor(after)
+    find = collection.find(
+        apply_keyset(query, sort_key, cursor, direction, id_key),
+        projection or {'_id': 0}
+    ).sort([(sort_key, direction), (id_key, direction)])
+    if not cursor and skip:
+        find = find.skip(skip)
+    items = await find.limit(limit).to_list(limit)
+
+    next_cursor = None
+    if limit and len(items) == limit:
+        next_cursor = encode_cursor(items[-1].get(sort_key), items[-1].get(id_key))
+
+    return {
+        'items': items,
+        'total': await count_total(collection, query, total_mode),
+        'next_cursor': next_cursor
+    }
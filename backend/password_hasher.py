@@ -0,0 +1,86 @@
+"""
+Password hashing service.
+
+bcrypt is deliberately slow (~250ms per hash at cost 12), so hashing and
+verification run in a bounded thread pool instead of on the event loop;
+bcrypt releases the GIL while it works. The number of pending jobs is capped
+so a login storm is shed with 503s instead of queueing unbounded work.
+"""
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+from fastapi import HTTPException
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '64'))
+
+_BCRYPT_COST = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='bcrypt')
+_pending = 0
+
+
+def _hash_sync(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify_sync(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:
+        return False
+
+
+async def _submit(func, *args):
+    global _pending
+    if _pending >= HASH_MAX_QUEUE:
+        raise HTTPException(503, 'Server busy, please retry', headers={'Retry-After': '1'})
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _pending -= 1
+
+
+def hash_cost(hashed: Optional[str]) -> Optional[int]:
+    match = _BCRYPT_COST.match(hashed or '')
+    return int(match.group(1)) if match else None
+
+
+def needs_rehash(hashed: Optional[str]) -> bool:
+    """True when ``hashed`` was produced with a different cost than configured."""
+    return hash_cost(hashed) != BCRYPT_ROUNDS
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(_hash_sync, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _submit(_verify_sync, password, hashed)
+
+
+async def verify_and_rehash(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Verify ``password``; on success also return a fresh hash if the cost changed.
+
+    Returns ``(ok, new_hash)`` where ``new_hash`` is None when the stored hash
+    is already at the configured cost.
+    """
+    if not await verify_password(password, hashed):
+        return False, None
+    if needs_rehash(hashed):
+        return True, await hash_password(password)
+    return True, None
+
+
+def queue_depth() -> int:
+    return _pending
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
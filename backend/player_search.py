@@ -0,0 +1,74 @@
+"""
+Player search index.
+
+Each play stores ``search_tokens``: normalized lowercase edge n-grams
+(prefixes) of the player's email, email local part, first name and phone
+digits. Searches become an equality match on that multikey field, served by
+the ``(tenant_id, search_tokens, played_at, id)`` index, instead of an
+unanchored case-insensitive ``$regex`` over the tenant's full play history.
+Raw user input is never compiled into a regex unescaped.
+"""
+import re
+import unicodedata
+from typing import Optional
+
+MIN_PREFIX = 2
+MAX_PREFIX = 32
+
+_PHONE_LIKE = re.compile(r'^[\d\s+().-]+$')
+
+
+def normalize(value: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse whitespace."""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return ' '.join(value.casefold().split())
+
+
+def phone_digits(value: Optional[str]) -> str:
+    return re.sub(r'\D', '', value or '')
+
+
+def edge_ngrams(term: str) -> list:
+    """Prefixes of ``term`` from ``MIN_PREFIX`` to ``MAX_PREFIX`` characters."""
+    return [term[:i] for i in range(MIN_PREFIX, min(len(term), MAX_PREFIX) + 1)]
+
+
+def build_search_tokens(email: Optional[str], phone: Optional[str], first_name: Optional[str]) -> list:
+    terms = []
+    email = normalize(email)
+    if email:
+        terms.append(email)
+        local, _, domain = email.partition('@')
+        terms.extend([local, domain])
+    name = normalize(first_name)
+    if name:
+        terms.append(name)
+        terms.extend(name.split(' '))
+    digits = phone_digits(phone)
+    if digits:
+        terms.append(digits)
+
+    tokens = set()
+    for term in terms:
+        tokens.update(edge_ngrams(term))
+    return sorted(tokens)
+
+
+def search_query(raw: Optional[str]) -> Optional[dict]:
+    """Translate a search box value into an index-friendly filter.
+
+    Returns None for blank input. Phone-looking input is reduced to its
+    digits. Terms shorter than ``MIN_PREFIX`` fall back to an anchored,
+    escaped prefix regex on the token field, which still uses index bounds.
+    """
+    term = normalize(raw)
+    if not term:
+        return None
+    if _PHONE_LIKE.match(term) and phone_digits(term):
+        term = phone_digits(term)
+    if len(term) < MIN_PREFIX:
+        return {'search_tokens': {'$regex': f'^{re.escape(term)}'}}
+    return {'search_tokens': term[:MAX_PREFIX]}
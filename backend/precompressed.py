@@ -0,0 +1,67 @@
+"""
+Pre-encoded, pre-compressed response payloads.
+
+Static JSON (translation bundles, published campaign configs) is serialized
+and compressed once, then served as raw bytes with a content-hash ETag.
+Conditional requests get a 304 and clients that accept brotli or gzip get
+the matching precompressed body, so serving costs no encoding work at all.
+Brotli is optional: without the ``brotli`` package only gzip is offered.
+"""
+import gzip
+import hashlib
+
+from fastapi import Request, Response
+
+from json_response import dumps
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def parse_accept_encoding(header: str) -> set:
+    """Encodings the client accepts (``q=0`` entries excluded)."""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class PrecompressedPayload:
+    def __init__(
+        self,
+        body: bytes,
+        media_type: str = 'application/json',
+        gzip_level: int = 9,
+        brotli_quality: int = 11
+    ):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.encoded = {'gzip': gzip.compress(body, compresslevel=gzip_level, mtime=0)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(body, quality=brotli_quality)
+
+    @classmethod
+    def from_json(cls, data, **kwargs) -> 'PrecompressedPayload':
+        return cls(dumps(data), **kwargs)
+
+    def response(self, request: Request, cache_control: str = 'no-cache') -> Response:
+        headers = {'ETag': self.etag, 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+        if_none_match = request.headers.get('if-none-match', '')
+        if if_none_match == '*' or self.etag in [t.strip().removeprefix('W/') for t in if_none_match.split(',')]:
+            return Response(status_code=304, headers=headers)
+
+        accepted = parse_accept_encoding(request.headers.get('accept-encoding', ''))
+        for encoding in ('br', 'gzip'):
+            if encoding in accepted and encoding in self.encoded:
+                headers['Content-Encoding'] = encoding
+                return Response(self.encoded[encoding], media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
@@ -0,0 +1,140 @@
+"""
+Prize storage.
+
+Prizes live embedded in their campaign document (``campaign.prizes``), so a
+campaign and its prizes load in one round trip and stock is decremented with
+a positional update on the same document. Tenant and admin game routes used
+to keep prizes in a separate ``prizes`` collection;
+``migrations.migrate_prize_collection`` moves those into their campaigns in
+batches. Until it has finished, every read or write first pulls leftover
+legacy prizes of the campaign it touches into the embedded array.
+"""
+import uuid
+from typing import Optional
+
+from database import db
+from timeutils import utcnow
+
+PRIZE_LIMIT = 200
+
+# Implied by the enclosing campaign, never stored on embedded prizes
+_OWNER_FIELDS = ('_id', 'campaign_id', 'tenant_id', 'migrated_at')
+
+_legacy_pending = True
+
+
+def mark_legacy_migrated():
+    """The ``prizes`` collection is fully migrated; stop consulting it."""
+    global _legacy_pending
+    _legacy_pending = False
+
+
+# ==================== LEGACY COLLECTION ====================
+
+async def push_legacy_prize(doc: dict) -> bool:
+    """Copy one ``prizes`` collection document into its campaign (idempotent)."""
+    prize = {k: v for k, v in doc.items() if k not in _OWNER_FIELDS}
+    result = await db.campaigns.update_one(
+        {'id': doc['campaign_id'], 'prizes.id': {'$ne': doc['id']}},
+        {'$push': {'prizes': prize}}
+    )
+    return bool(result.modified_count)
+
+
+async def _embed_legacy_prizes(campaign_id: str) -> int:
+    if not _legacy_pending:
+        return 0
+    docs = await db.prizes.find(
+        {'campaign_id': campaign_id, 'migrated_at': {'$exists': False}}
+    ).to_list(PRIZE_LIMIT)
+    moved = 0
+    for doc in docs:
+        if await push_legacy_prize(doc):
+            moved += 1
+        await db.prizes.update_one({'_id': doc['_id']}, {'$set': {'migrated_at': utcnow()}})
+    return moved
+
+
+# ==================== READS ====================
+
+async def get_campaign_with_prizes(query: dict, projection: dict = None) -> Optional[dict]:
+    """One campaign (``find_one`` semantics) with its ``prizes`` list."""
+    projection = projection or {'_id': 0}
+    campaign = await db.campaigns.find_one(query, projection)
+    if campaign and _legacy_pending and await _embed_legacy_prizes(campaign['id']):
+        campaign = await db.campaigns.find_one({'id': campaign['id']}, projection)
+    if campaign is not None:
+        campaign.setdefault('prizes', [])
+    return campaign
+
+
+async def find_prize(prize_id: str, tenant_id: Optional[str] = None) -> Optional[dict]:
+    """A prize by id, with ``campaign_id`` and ``tenant_id`` of its campaign."""
+    query = {'prizes.id': prize_id}
+    if tenant_id:
+        query['tenant_id'] = tenant_id
+    projection = {'_id': 0, 'id': 1, 'tenant_id': 1, 'prizes.$': 1}
+    campaign = await db.campaigns.find_one(query, projection)
+    if not campaign and _legacy_pending:
+        legacy = await db.prizes.find_one({'id': prize_id}, {'campaign_id': 1})
+        if legacy and await _embed_legacy_prizes(legacy['campaign_id']):
+            campaign = await db.campaigns.find_one(query, projection)
+    if not campaign:
+        return None
+    return {**campaign['prizes'][0], 'campaign_id': campaign['id'], 'tenant_id': campaign.get('tenant_id')}
+
+
+# ==================== WRITES ====================
+
+async def add_prize(campaign_id: str, prize: dict):
+    await _embed_legacy_prizes(campaign_id)
+    prize = {k: v for k, v in prize.items() if k not in _OWNER_FIELDS}
+    await db.campaigns.update_one({'id': campaign_id}, {'$push': {'prizes': prize}})
+
+
+async def update_prize(prize_id: str, update: dict) -> Optional[dict]:
+    """Set fields on one prize; returns the updated prize."""
+    if update:
+        await db.campaigns.update_one(
+            {'prizes.id': prize_id},
+            {'$set': {f'prizes.$.{field}': value for field, value in update.items()}}
+        )
+    return await find_prize(prize_id)
+
+
+async def delete_prize(prize_id: str):
+    await db.campaigns.update_one({'prizes.id': prize_id}, {'$pull': {'prizes': {'id': prize_id}}})
+
+
+async def decrement_stock(campaign_id: str, prize_id: str) -> bool:
+    """Take one unit of stock; False if the prize is out of stock."""
+    result = await db.campaigns.update_one(
+        {'id': campaign_id, 'prizes': {'$elemMatch': {'id': prize_id, 'stock_remaining': {'$gt': 0}}}},
+        {'$inc': {'prizes.$.stock_remaining': -1}}
+    )
+    return bool(result.modified_count)
+
+
+def restock(prize: dict, total: int) -> dict:
+    """Fields to ``$set`` for a new stock total, shifting ``stock_remaining`` by the difference.
+
+    Tenant/admin game prizes store the total as ``stock``, builder prizes as
+    ``stock_total``; the field the prize already uses is kept.
+    """
+    field = 'stock_total' if 'stock_total' in prize and 'stock' not in prize else 'stock'
+    diff = total - prize.get(field, 0)
+    return {field: total, 'stock_remaining': max(0, prize.get('stock_remaining', 0) + diff)}
+
+
+def clone_prizes(prizes: list) -> list:
+    """Fresh copies of ``prizes`` for another campaign, with full stock."""
+    now = utcnow().isoformat()
+    return [
+        {
+            **{k: v for k, v in prize.items() if k not in _OWNER_FIELDS},
+            'id': str(uuid.uuid4()),
+            'stock_remaining': prize.get('stock', prize.get('stock_total', 0)),
+            'created_at': now
+        }
+        for prize in prizes
+    ]
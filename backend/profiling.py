@@ -0,0 +1,271 @@
+"""
+Opt-in request profiling.
+
+``ProfilingMiddleware`` profiles a request when it carries
+``X-Profile: <PROFILING_TOKEN>`` or is picked by ``PROFILING_SAMPLE_RATE``
+(0 by default, so nothing is profiled unless asked). With ``pyinstrument``
+installed profiles are async-aware (time spent awaiting Mongo is attributed
+to the awaiting frame) and stored as HTML and speedscope flamegraphs;
+otherwise ``cProfile`` is used and stored as pstats plus a text report.
+Only one request is profiled at a time per worker, for at most
+``PROFILING_MAX_SECONDS``; event streams are never profiled.
+
+Profiles go to a ring in ``PROFILE_DIR`` that keeps the newest
+``PROFILE_RING_SIZE`` entries. Each carries the route, status, wall time and
+the DB time/query count from ``query_stats``, so Mongo time can be told apart
+from serialization and Python work. Profiled responses get an
+``X-Profile-Id`` header; super admins fetch profiles via
+``/api/admin/profiles``.
+"""
+import asyncio
+import cProfile
+import html
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import metrics
+from query_stats import current_stats
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL_SECONDS', '0.001'))
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', Path(__file__).parent / 'profiles'))
+PROFILE_RING_SIZE = int(os.environ.get('PROFILE_RING_SIZE', '50'))
+# Profiling stops after this long (``truncated``); ``duration_ms`` still covers the whole request
+PROFILING_MAX_SECONDS = float(os.environ.get('PROFILING_MAX_SECONDS', '30'))
+# Long-lived streams (SSE/WebSocket feeds) are never profiled
+PROFILING_EXCLUDED_PREFIXES = ('/api/events/',)
+
+ENGINE = 'pyinstrument' if Profiler is not None else 'cprofile'
+# Stored artefacts per engine: format name -> (file suffix, media type)
+FORMATS = {
+    'pyinstrument': {
+        'html': ('.html', 'text/html'),
+        'speedscope': ('.speedscope.json', 'application/json'),
+    },
+    'cprofile': {
+        'html': ('.html', 'text/html'),
+        'pstats': ('.prof', 'application/octet-stream'),
+    },
+}
+
+_PROFILE_ID = re.compile(r'^[0-9]{13}-[0-9a-f]{8}$')
+
+_active = False
+
+
+def is_profile_id(value: str) -> bool:
+    return bool(_PROFILE_ID.match(value))
+
+
+def _requested(scope) -> bool:
+    if PROFILING_TOKEN:
+        for name, value in scope.get('headers', []):
+            if name == b'x-profile':
+                return value.decode('latin-1') == PROFILING_TOKEN
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+# ==================== ENGINES ====================
+
+class _PyinstrumentSession:
+    def __init__(self):
+        self._profiler = Profiler(interval=PROFILING_INTERVAL, async_mode='enabled')
+
+    def start(self):
+        self._profiler.start()
+
+    def stop(self):
+        self._profiler.stop()
+
+    def render(self) -> dict:
+        return {
+            'html': self._profiler.output_html().encode(),
+            'speedscope': self._profiler.output(renderer=SpeedscopeRenderer()).encode(),
+        }
+
+
+class _CProfileSession:
+    def __init__(self):
+        self._profiler = cProfile.Profile()
+
+    def start(self):
+        self._profiler.enable()
+
+    def stop(self):
+        self._profiler.disable()
+
+    def render(self) -> dict:
+        report = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=report)
+        stats.sort_stats('cumulative').print_stats(60)
+        page = f'<html><body><pre>{html.escape(report.getvalue())}</pre></body></html>'
+        # Same layout as ``cProfile.Profile.dump_stats``, loadable by pstats/snakeviz
+        self._profiler.create_stats()
+        return {'html': page.encode(), 'pstats': marshal.dumps(self._profiler.stats)}
+
+
+def _new_session():
+    return _PyinstrumentSession() if Profiler is not None else _CProfileSession()
+
+
+# ==================== RING STORAGE ====================
+
+def _write_profile(profile_id: str, session, meta: dict):
+    """Render ``session`` and store it, dropping the oldest profiles beyond the ring size."""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    for fmt, data in session.render().items():
+        suffix = FORMATS[meta['engine']][fmt][0]
+        (PROFILE_DIR / f'{profile_id}{suffix}').write_bytes(data)
+    (PROFILE_DIR / f'{profile_id}.meta.json').write_text(json.dumps(meta))
+
+    # Ids start with a millisecond timestamp, so name order is age order
+    metas = sorted(PROFILE_DIR.glob('*.meta.json'))
+    for stale in metas[:-PROFILE_RING_SIZE] if len(metas) > PROFILE_RING_SIZE else []:
+        stale_id = stale.name[:-len('.meta.json')]
+        for path in PROFILE_DIR.glob(f'{stale_id}.*'):
+            path.unlink(missing_ok=True)
+
+
+def list_profiles() -> list:
+    """Stored profile metadata, newest first."""
+    if not PROFILE_DIR.exists():
+        return []
+    profiles = []
+    for path in sorted(PROFILE_DIR.glob('*.meta.json'), reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def read_profile(profile_id: str, fmt: str) -> Optional[tuple]:
+    """``(bytes, media_type, filename)`` of one stored artefact, or None."""
+    meta_path = PROFILE_DIR / f'{profile_id}.meta.json'
+    if not is_profile_id(profile_id) or not meta_path.exists():
+        return None
+    engine = json.loads(meta_path.read_text())['engine']
+    if fmt not in FORMATS[engine]:
+        return None
+    suffix, media_type = FORMATS[engine][fmt]
+    path = PROFILE_DIR / f'{profile_id}{suffix}'
+    if not path.exists():
+        return None
+    return path.read_bytes(), media_type, f'profile-{profile_id}{suffix}'
+
+
+# ==================== MIDDLEWARE ====================
+
+class _Capture:
+    """One running profile; stops at most once (response end, stream start or time cap)."""
+
+    def __init__(self):
+        global _active
+        self.session = _new_session()
+        self.started = time.perf_counter()
+        self.profiled_ms = None
+        self.truncated = False
+        self.discarded = False
+        _active = True
+        self.session.start()
+
+    def stop(self, truncated: bool = False):
+        global _active
+        if self.profiled_ms is not None:
+            return
+        self.session.stop()
+        _active = False
+        self.profiled_ms = (time.perf_counter() - self.started) * 1000
+        self.truncated = truncated
+
+
+def _is_event_stream(headers) -> bool:
+    return any(name == b'content-type' and value.startswith(b'text/event-stream') for name, value in headers)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope['type'] != 'http' or scope.get('path', '').startswith(PROFILING_EXCLUDED_PREFIXES)
+                or not _requested(scope)):
+            await self.app(scope, receive, send)
+            return
+        if _active:
+            # Profilers are per thread; never nest two request profiles
+            metrics.increment('profiles_skipped', reason='busy')
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}'
+        status = None
+        capture = _Capture()
+        # Long requests release the profiler (and the one-at-a-time slot) after the cap
+        cap = asyncio.get_running_loop().call_later(PROFILING_MAX_SECONDS, capture.stop, True)
+
+        async def send_with_id(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if _is_event_stream(message.get('headers', [])):
+                    # Streams stay open for as long as the client listens: not a request profile
+                    capture.stop()
+                    capture.discarded = True
+                else:
+                    message['headers'] = list(message.get('headers', [])) + [(b'x-profile-id', profile_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            cap.cancel()
+            capture.stop()
+            duration_ms = (time.perf_counter() - capture.started) * 1000
+            if capture.discarded:
+                metrics.increment('profiles_skipped', reason='stream')
+            else:
+                await self._store(profile_id, scope, status, duration_ms, capture)
+
+    async def _store(self, profile_id: str, scope, status: Optional[int], duration_ms: float, capture: _Capture):
+        db_stats = current_stats()
+        meta = {
+            'id': profile_id,
+            'engine': ENGINE,
+            'method': scope.get('method'),
+            'path': scope.get('path'),
+            'route': getattr(scope.get('route'), 'path', None),
+            'status': status,
+            'duration_ms': round(duration_ms, 2),
+            'profiled_ms': round(capture.profiled_ms, 2),
+            'truncated': capture.truncated,
+            'db_ms': round(db_stats.time_ms, 2) if db_stats else None,
+            'db_queries': db_stats.queries if db_stats else None,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'formats': list(FORMATS[ENGINE]),
+        }
+        try:
+            await asyncio.to_thread(_write_profile, profile_id, capture.session, meta)
+            metrics.increment('profiles_recorded', engine=ENGINE)
+        except Exception:
+            logger.exception(f"Failed to store profile {profile_id}")
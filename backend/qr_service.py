@@ -0,0 +1,115 @@
+"""
+QR code rendering service.
+
+Campaign QR codes depend only on the game URL (base URL + slug), the output
+size and the format, so rendered bytes are cached under that key: changing
+the slug or the base URL changes the key, and nothing else ever needs to
+invalidate an entry. Rendering is CPU work and runs in a worker thread.
+SVG output is tiny and resolution independent; PNG and PDF come in screen
+and print sizes, exactly ``size`` pixels wide: modules stay whole pixels and
+the remainder widens the white quiet zone.
+"""
+import asyncio
+import io
+import os
+import zipfile
+from collections import OrderedDict
+
+import qrcode
+import qrcode.image.svg
+from fastapi import HTTPException
+from PIL import Image
+
+QR_CACHE_MAX_ENTRIES = int(os.environ.get('QR_CACHE_MAX_ENTRIES', '512'))
+
+# Edge length in pixels; "print" is ~10cm and "poster" ~20cm at 300 dpi
+SIZES = {'screen': 300, 'print': 1200, 'poster': 2400}
+PRINT_DPI = 300
+MIN_SIZE, MAX_SIZE = 64, 4096
+
+FORMATS = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+    'pdf': 'application/pdf',
+}
+
+_cache = OrderedDict()
+
+
+def game_url(slug: str) -> str:
+    base_url = os.environ.get('REACT_APP_BACKEND_URL', 'https://wheel-fortune-12.preview.emergentagent.com')
+    return f"{base_url}/play/{slug}"
+
+
+def resolve_size(size) -> int:
+    """Named size (``screen``/``print``/``poster``) or pixel count."""
+    if size in SIZES:
+        return SIZES[size]
+    try:
+        pixels = int(size)
+    except (TypeError, ValueError):
+        raise HTTPException(400, f'Invalid size (use {", ".join(SIZES)} or {MIN_SIZE}-{MAX_SIZE} pixels)')
+    if not MIN_SIZE <= pixels <= MAX_SIZE:
+        raise HTTPException(400, f'Size must be between {MIN_SIZE} and {MAX_SIZE} pixels')
+    return pixels
+
+
+def _fit(img: Image.Image, pixels: int) -> Image.Image:
+    """Center ``img`` on a white ``pixels`` square; codes too dense for it are scaled down."""
+    if img.width > pixels:
+        return img.resize((pixels, pixels), Image.NEAREST)
+    canvas = Image.new('RGB', (pixels, pixels), 'white')
+    offset = (pixels - img.width) // 2
+    canvas.paste(img, (offset, offset))
+    return canvas
+
+
+def _render(url: str, pixels: int, fmt: str) -> bytes:
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=4)
+    qr.add_data(url)
+    qr.make(fit=True)
+    qr.box_size = max(1, pixels // (qr.modules_count + 2 * qr.border))
+
+    if fmt == 'svg':
+        return qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).to_string()
+
+    img = _fit(qr.make_image(fill_color="black", back_color="white").get_image().convert('RGB'), pixels)
+    buffer = io.BytesIO()
+    if fmt == 'pdf':
+        img.save(buffer, format='PDF', resolution=PRINT_DPI)
+    else:
+        img.save(buffer, format='PNG', optimize=True, dpi=(PRINT_DPI, PRINT_DPI))
+    return buffer.getvalue()
+
+
+async def render_qr(url: str, size='screen', fmt: str = 'png') -> bytes:
+    if fmt not in FORMATS:
+        raise HTTPException(400, f'Invalid format (use {", ".join(FORMATS)})')
+    key = (url, resolve_size(size), fmt)
+    cached = _cache.get(key)
+    if cached is not None:
+        _cache.move_to_end(key)
+        return cached
+
+    data = await asyncio.to_thread(_render, *key)
+    _cache[key] = data
+    if len(_cache) > QR_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+    return data
+
+
+async def render_campaigns_zip(campaigns: list, size='print', fmt: str = 'png') -> bytes:
+    """Zip one QR code per campaign, named after the campaign slug."""
+    files = [
+        (f"{c['slug']}.{fmt}", await render_qr(game_url(c['slug']), size, fmt))
+        for c in campaigns
+    ]
+
+    def build():
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, data in files:
+                archive.writestr(name, data)
+        return buffer.getvalue()
+
+    return await asyncio.to_thread(build)
@@ -0,0 +1,267 @@
+"""
+MongoDB query instrumentation.
+
+``database.db`` is an ``InstrumentedDatabase``: every collection operation
+(and every ``to_list``/iteration of a ``find`` or ``aggregate`` cursor) is
+timed and recorded in ``metrics`` per collection and operation, together
+with the number of documents returned. Queries slower than
+``DB_SLOW_QUERY_MS`` are logged with the route that issued them and the
+shape (keys only, never values) of their filter; with
+``DB_SLOW_QUERY_EXPLAIN=1`` slow ``find``/``find_one`` calls are also
+explained in the background to log how many documents the server examined.
+
+``QueryStatsMiddleware`` collects the queries of each request, records
+per-route DB time and query counts, and with ``DB_TIMING_HEADER=1`` reports
+them on the response (``Server-Timing: db;dur=...``, ``X-DB-Time-Ms``,
+``X-DB-Queries``).
+"""
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', '100'))
+SLOW_QUERY_EXPLAIN = os.environ.get('DB_SLOW_QUERY_EXPLAIN', '0') == '1'
+TIMING_HEADER = os.environ.get('DB_TIMING_HEADER', '0') == '1'
+
+# Operations awaited directly on a collection
+TIMED_OPERATIONS = frozenset({
+    'find_one', 'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one',
+    'delete_one', 'delete_many', 'count_documents', 'estimated_document_count', 'distinct',
+    'find_one_and_update', 'find_one_and_delete', 'find_one_and_replace', 'bulk_write',
+})
+CURSOR_OPERATIONS = frozenset({'find', 'aggregate'})
+
+
+class RequestQueryStats:
+    """Queries issued while handling one request."""
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.time_ms = 0.0
+        self.documents = 0
+
+    @property
+    def route(self) -> Optional[str]:
+        """Path template of the matched route (set by the router on the shared scope)."""
+        return getattr(self.scope.get('route'), 'path', None)
+
+    @property
+    def label(self) -> str:
+        return self.route or self.scope.get('path', '-')
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar('request_query_stats', default=None)
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+    return _current.get()
+
+
+def current_route() -> Optional[str]:
+    stats = _current.get()
+    return stats.label if stats else None
+
+
+def _shape(spec) -> str:
+    if isinstance(spec, dict):
+        return '{' + ', '.join(f'{k}: {_shape(v)}' if isinstance(v, dict) else str(k) for k, v in spec.items()) + '}'
+    if isinstance(spec, list):
+        return '[' + ', '.join(next(iter(stage), '?') if isinstance(stage, dict) else '?' for stage in spec) + ']'
+    return '?'
+
+
+def _record(collection: str, operation: str, elapsed_ms: float, documents: int, spec=None):
+    metrics.increment('db_queries', collection=collection, op=operation)
+    metrics.histogram('db_query_ms', elapsed_ms, collection=collection, op=operation)
+    if documents:
+        metrics.increment('db_documents_returned', documents, collection=collection, op=operation)
+
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.time_ms += elapsed_ms
+        stats.documents += documents
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        metrics.increment('db_slow_queries', collection=collection, op=operation)
+        logger.warning(
+            f"Slow query {collection}.{operation} {elapsed_ms:.1f}ms "
+            f"route={stats.label if stats else '-'} docs={documents} spec={_shape(spec)}"
+        )
+        return True
+    return False
+
+
+async def _explain_slow(collection, spec: dict, route: Optional[str]):
+    try:
+        plan = await collection.find(spec).explain()
+    except Exception:
+        logger.debug("Slow query explain failed", exc_info=True)
+        return
+    execution = plan.get('executionStats', {})
+    logger.warning(
+        f"Slow query plan {collection.name} route={route or '-'} "
+        f"docsExamined={execution.get('totalDocsExamined')} keysExamined={execution.get('totalKeysExamined')} "
+        f"returned={execution.get('nReturned')}"
+    )
+
+
+class InstrumentedCursor:
+    """Proxy for a Motor cursor that times how long its results take to arrive."""
+
+    def __init__(self, cursor, collection, operation: str, spec):
+        self._cursor = cursor
+        self._collection = collection
+        self._operation = operation
+        self._spec = spec
+        self._iter_ms = 0.0
+        self._iter_docs = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # Keep the proxy in fluent chains (sort/skip/limit/...)
+            return self if result is self._cursor else result
+        return call
+
+    def _finish(self, elapsed_ms: float, documents: int):
+        slow = _record(self._collection.name, self._operation, elapsed_ms, documents, self._spec)
+        if slow and SLOW_QUERY_EXPLAIN and self._operation == 'find':
+            asyncio.create_task(_explain_slow(self._collection, self._spec or {}, current_route()))
+
+    async def to_list(self, length=None):
+        started = time.perf_counter()
+        docs = await self._cursor.to_list(length)
+        self._finish((time.perf_counter() - started) * 1000, len(docs))
+        return docs
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        started = time.perf_counter()
+        try:
+            doc = await self._cursor.__anext__()
+        except StopAsyncIteration:
+            self._iter_ms += (time.perf_counter() - started) * 1000
+            self._finish(self._iter_ms, self._iter_docs)
+            raise
+        self._iter_ms += (time.perf_counter() - started) * 1000
+        self._iter_docs += 1
+        return doc
+
+
+class InstrumentedCollection:
+    """Proxy for a Motor collection recording every operation in ``metrics``."""
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in TIMED_OPERATIONS:
+            wrapped = self._timed(name, attr)
+        elif name in CURSOR_OPERATIONS:
+            wrapped = self._cursor(name, attr)
+        else:
+            return attr
+        setattr(self, name, wrapped)
+        return wrapped
+
+    def _timed(self, name: str, method):
+        collection = self._collection
+
+        async def call(*args, **kwargs):
+            started = time.perf_counter()
+            result = await method(*args, **kwargs)
+            documents = 1 if name.startswith('find_one') and result is not None else 0
+            slow = _record(collection.name, name, (time.perf_counter() - started) * 1000, documents,
+                           args[0] if args else kwargs.get('filter'))
+            if slow and SLOW_QUERY_EXPLAIN and name == 'find_one' and args:
+                asyncio.create_task(_explain_slow(collection, args[0], current_route()))
+            return result
+        return call
+
+    def _cursor(self, name: str, method):
+        collection = self._collection
+
+        def call(*args, **kwargs):
+            spec = args[0] if args else kwargs.get('filter', kwargs.get('pipeline'))
+            return InstrumentedCursor(method(*args, **kwargs), collection, name, spec)
+        return call
+
+
+class InstrumentedDatabase:
+    """Proxy for a Motor database handing out instrumented collections."""
+
+    def __init__(self, database):
+        self._database = database
+        self._collections = {}
+
+    def _collection(self, name: str) -> InstrumentedCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = InstrumentedCollection(self._database[name])
+        return collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._database, name)
+        if isinstance(attr, AsyncIOMotorCollection):
+            return self._collection(name)
+        return attr
+
+    def __getitem__(self, name: str) -> InstrumentedCollection:
+        return self._collection(name)
+
+    @property
+    def unwrapped(self):
+        """The plain Motor database (for APIs such as GridFS that require one)."""
+        return self._database
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app, timing_header: bool = TIMING_HEADER):
+        self.app = app
+        self.timing_header = timing_header
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope)
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start' and self.timing_header:
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'server-timing', f'db;dur={stats.time_ms:.1f};desc="{stats.queries} queries"'.encode()),
+                    (b'x-db-time-ms', f'{stats.time_ms:.1f}'.encode()),
+                    (b'x-db-queries', str(stats.queries).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if stats.queries:
+                # Unmatched paths are folded together to bound label cardinality
+                route = stats.route or 'unmatched'
+                metrics.histogram('db_request_ms', stats.time_ms, route=route)
+                metrics.observe('db_request_queries', stats.queries, route=route)
+                metrics.observe('db_request_documents', stats.documents, route=route)
@@ -0,0 +1,173 @@
+"""
+Reward code redemption engine.
+
+A code is redeemed with a single ``find_one_and_update`` whose filter only
+matches an active, unexpired code of the caller's tenant, so two staff
+members scanning the same code at once can never both succeed. The slower
+diagnostic lookup (not found / already redeemed / expired) only runs on the
+failure path.
+
+``verify_code`` resolves the reward, its prize (embedded in the campaign)
+and its player in one aggregation, and ``redeem_codes`` redeems a
+batch of scanned codes concurrently for event staff.
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from event_bus import publish_redemption
+from repositories import audit_logs, reward_codes
+from stats_store import record_redeem
+from timeutils import utcnow, time_clauses
+
+BULK_REDEEM_LIMIT = 200
+
+# Failure reasons, also used as bulk result statuses
+NOT_FOUND = 'not_found'
+ALREADY_REDEEMED = 'already_redeemed'
+EXPIRED = 'expired'
+TEST_CODE = 'test_code'
+
+_ERRORS = {
+    NOT_FOUND: (404, 'Reward code not found'),
+    ALREADY_REDEEMED: (400, 'Code already redeemed'),
+    EXPIRED: (400, 'Code has expired'),
+    TEST_CODE: (400, 'Test codes cannot be redeemed'),
+}
+
+
+def _redeemable(tenant_id: str, codes, now: datetime) -> dict:
+    return {
+        'code': codes if isinstance(codes, str) else {'$in': codes},
+        'tenant_id': tenant_id,
+        'status': 'active',
+        '$or': [{'expires_at': None}, *time_clauses('reward_codes', 'expires_at', gt=now)]
+    }
+
+
+async def _failure_reasons(tenant_id: str, codes: list, now: datetime) -> dict:
+    """Explain why ``codes`` could not be redeemed; lapsed codes are marked expired."""
+    found = {
+        r['code']: r for r in await reward_codes.find(
+            {'code': {'$in': codes}, 'tenant_id': tenant_id},
+            {'_id': 0, 'code': 1, 'status': 1, 'expires_at': 1}
+        ).to_list(len(codes))
+    }
+    reasons, lapsed = {}, []
+    for code in codes:
+        reward = found.get(code)
+        if not reward:
+            reasons[code] = NOT_FOUND
+        elif reward['status'] == 'redeemed':
+            reasons[code] = ALREADY_REDEEMED
+        else:
+            reasons[code] = EXPIRED
+            if reward['status'] == 'active':
+                lapsed.append(code)
+    if lapsed:
+        await reward_codes.update_many(
+            {'code': {'$in': lapsed}, 'status': 'active', '$or': time_clauses('reward_codes', 'expires_at', lte=now)},
+            {'$set': {'status': 'expired'}}
+        )
+    return reasons
+
+
+async def _claim(tenant_id: str, code: str, user: dict, now: datetime):
+    return await reward_codes.find_one_and_update(
+        _redeemable(tenant_id, code, now),
+        {'$set': {'status': 'redeemed', 'redeemed_at': now, 'redeemed_by': user['id']}},
+        projection={'_id': 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _audit_entry(tenant_id: str, user: dict, code: str, ip_address: str) -> dict:
+    return audit_logs.entry(tenant_id, user['id'], 'redeem_code', f'Code {code} redeemed by {user["email"]}', ip_address)
+
+
+async def _after_redeem(tenant_id: str, rewards: list):
+    for campaign_id, count in Counter(r['campaign_id'] for r in rewards).items():
+        await record_redeem(tenant_id, campaign_id, count)
+    for reward in rewards:
+        publish_redemption(reward)
+
+
+async def redeem_code(tenant_id: str, code: str, user: dict, ip_address: str = 'unknown') -> dict:
+    """Redeem one code exactly once; raises ``HTTPException`` explaining any refusal."""
+    if code.startswith('TEST-'):
+        raise HTTPException(*_ERRORS[TEST_CODE])
+    now = utcnow()
+    reward = await _claim(tenant_id, code, user, now)
+    if not reward:
+        reason = (await _failure_reasons(tenant_id, [code], now))[code]
+        raise HTTPException(*_ERRORS[reason])
+
+    await _after_redeem(tenant_id, [reward])
+    await audit_logs.insert_one(_audit_entry(tenant_id, user, code, ip_address))
+    return reward
+
+
+async def redeem_codes(tenant_id: str, codes: list, user: dict, ip_address: str = 'unknown') -> list:
+    """Redeem a batch of codes; returns one ``{code, status, reward}`` result per distinct code."""
+    codes = list(dict.fromkeys(c.strip() for c in codes if c and c.strip()))
+    if len(codes) > BULK_REDEEM_LIMIT:
+        raise HTTPException(400, f'At most {BULK_REDEEM_LIMIT} codes per request')
+
+    now = utcnow()
+    candidates = [c for c in codes if not c.startswith('TEST-')]
+    claimed = await asyncio.gather(*(_claim(tenant_id, c, user, now) for c in candidates))
+    redeemed = {r['code']: r for r in claimed if r}
+
+    reasons = {c: TEST_CODE for c in codes if c.startswith('TEST-')}
+    failed = [c for c in candidates if c not in redeemed]
+    if failed:
+        reasons.update(await _failure_reasons(tenant_id, failed, now))
+
+    if redeemed:
+        await _after_redeem(tenant_id, list(redeemed.values()))
+        await audit_logs.insert_many([_audit_entry(tenant_id, user, c, ip_address) for c in redeemed])
+
+    return [
+        {'code': c, 'status': 'redeemed', 'reward': redeemed[c]} if c in redeemed
+        else {'code': c, 'status': reasons[c], 'reward': None}
+        for c in codes
+    ]
+
+
+async def verify_code(tenant_id: str, code: str) -> dict:
+    """Reward with its prize and player, resolved in one aggregation."""
+    pipeline = [
+        {'$match': {'code': code, 'tenant_id': tenant_id}},
+        {'$limit': 1},
+        {'$lookup': {'from': 'players', 'localField': 'player_id', 'foreignField': 'id', 'as': 'player'}},
+        {'$lookup': {
+            'from': 'campaigns',
+            'let': {'campaign_id': '$campaign_id', 'prize_id': '$prize_id'},
+            'pipeline': [
+                {'$match': {'$expr': {'$eq': ['$id', '$$campaign_id']}}},
+                {'$project': {'_id': 0, 'prizes': {'$filter': {
+                    'input': {'$ifNull': ['$prizes', []]},
+                    'cond': {'$eq': ['$$this.id', '$$prize_id']}
+                }}}}
+            ],
+            'as': 'campaign'
+        }},
+        {'$project': {'_id': 0}}
+    ]
+    result = await reward_codes.aggregate(pipeline).to_list(1)
+    if not result:
+        raise HTTPException(*_ERRORS[NOT_FOUND])
+
+    reward = result[0]
+    prizes = [p for c in reward.pop('campaign') for p in c['prizes']]
+    players = reward.pop('player')
+    for doc in players[:1]:
+        doc.pop('_id', None)
+    return {
+        'reward': reward,
+        'prize': prizes[0] if prizes else None,
+        'player': players[0] if players else None
+    }
@@ -0,0 +1,128 @@
+"""
+Typed data-access repositories.
+
+Each repository wraps one collection of ``database.db`` (so every call is
+timed by ``query_stats``) and names the queries that route handlers share
+instead of repeating inline filter dicts. Collection methods without a
+named query stay reachable through the repository itself, e.g.
+``plays.count_documents(...)``.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from database import db
+from timeutils import time_clauses
+import prize_repository
+
+PLAYABLE_STATUSES = ['active', 'test']
+
+
+class Repository:
+    collection_name: str = None
+
+    def __init__(self):
+        self.collection = db[self.collection_name]
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+class Campaigns(Repository):
+    collection_name = 'campaigns'
+
+    async def by_id(self, campaign_id: str, tenant_id: Optional[str] = None, projection: dict = None):
+        query = {'id': campaign_id}
+        if tenant_id:
+            query['tenant_id'] = tenant_id
+        return await self.collection.find_one(query, projection or {'_id': 0})
+
+    async def playable(self, slug: str) -> Optional[dict]:
+        """Active or test campaign by slug, with its prizes."""
+        return await prize_repository.get_campaign_with_prizes({'slug': slug, 'status': {'$in': PLAYABLE_STATUSES}})
+
+
+class Tenants(Repository):
+    collection_name = 'tenants'
+
+    async def by_id(self, tenant_id: str, projection: dict = None):
+        return await self.collection.find_one({'id': tenant_id}, projection or {'_id': 0})
+
+
+class Players(Repository):
+    collection_name = 'players'
+
+    async def for_campaign(self, campaign_id: str, email_hash: str):
+        return await self.collection.find_one({'campaign_id': campaign_id, 'email_hash': email_hash}, {'_id': 0})
+
+    async def increment_plays(self, player_id: str):
+        await self.collection.update_one({'id': player_id}, {'$inc': {'plays_count': 1}})
+
+
+class Plays(Repository):
+    collection_name = 'plays'
+
+    # Legacy plays only carry ``created_at`` until ``migrations.backfill_played_at`` has run
+    played_at_backfilled = False
+
+    @classmethod
+    def mark_played_at_backfilled(cls):
+        cls.played_at_backfilled = True
+
+    def _played_since(self, since: datetime) -> dict:
+        if self.played_at_backfilled:
+            return {'played_at': {'$gte': since}}
+        return {'$or': [
+            {'played_at': {'$gte': since}},
+            {'played_at': None, '$or': time_clauses('plays', 'created_at', gte=since)}
+        ]}
+
+    async def count_live_since(self, tenant_id: str, since: datetime) -> int:
+        return await self.collection.count_documents({
+            'tenant_id': tenant_id, 'is_test': False, **self._played_since(since)
+        })
+
+    async def count_live_by(self, campaign_id: str, field: str, value: str, since: Optional[datetime] = None) -> int:
+        """Live plays of a campaign sharing ``field`` (email_hash, phone_hash, ip_address)."""
+        query = {'campaign_id': campaign_id, field: value, 'is_test': False}
+        if since:
+            query.update(self._played_since(since))
+        return await self.collection.count_documents(query)
+
+
+class RewardCodes(Repository):
+    collection_name = 'reward_codes'
+
+    async def by_code(self, code: str, tenant_id: str, projection: dict = None):
+        return await self.collection.find_one({'code': code, 'tenant_id': tenant_id}, projection or {'_id': 0})
+
+
+class AuditLogs(Repository):
+    collection_name = 'audit_logs'
+
+    @staticmethod
+    def entry(tenant_id: Optional[str], user_id: str, action: str, details: str,
+              ip_address: str = 'unknown', category: Optional[str] = None) -> dict:
+        entry = {
+            'id': str(uuid.uuid4()),
+            'tenant_id': tenant_id,
+            'user_id': user_id,
+            'action': action,
+            'details': details,
+            'ip_address': ip_address,
+            'created_at': datetime.now(timezone.utc).isoformat()
+        }
+        if category:
+            entry['category'] = category
+        return entry
+
+    async def record(self, *args, **kwargs):
+        await self.collection.insert_one(self.entry(*args, **kwargs))
+
+
+campaigns = Campaigns()
+tenants = Tenants()
+players = Players()
+plays = Plays()
+reward_codes = RewardCodes()
+audit_logs = AuditLogs()
@@ -5,6 +5,9 @@ from fastapi import APIRouter, HTTPException, Request, Depends
 from pydantic import BaseModel, Field
 from database import db
 from auth import require_super_admin
+from stats_store import get_campaign_stats, drop_campaign, record_prize_change
+from campaign_lifecycle import notify as notify_lifecycle
+from game_engine import validate_builder_campaign_for_publish
 import uuid
 from datetime import datetime, timezone
 from typing import Optional, List
@@ -125,11 +128,12 @@ async def list_tenant_campaigns(
     total = await db.campaigns.count_documents(query)
     
     # Enrich with stats
+    campaign_stats = await get_campaign_stats([c['id'] for c in campaigns])
     for c in campaigns:
-        c['play_count'] = await db.plays.count_documents({'campaign_id': c['id'], 'is_test': {'$ne': True}})
-        c['test_play_count'] = await db.plays.count_documents({'campaign_id': c['id'], 'is_test': True})
+        c['play_count'] = campaign_stats[c['id']]['plays']
+        c['test_play_count'] = campaign_stats[c['id']]['test_plays']
         c['prize_count'] = len(c.get('prizes', []))
-        c['total_stock'] = sum(p.get('stock_total', 0) for p in c.get('prizes', []))
+        c['total_stock'] = sum(p.get('stock_total', p.get('stock', 0)) for p in c.get('prizes', []))
         c['stock_remaining'] = sum(p.get('stock_remaining', p.get('stock_total', 0)) for p in c.get('prizes', []))
         c['created_by_admin'] = c.get('created_by_admin', False)
     
@@ -229,6 +233,8 @@ async def create_tenant_campaign(
     }
     
     await db.campaigns.insert_one(campaign)
+    if prizes:
+        await record_prize_change(campaign['id'], tenant_id, len(prizes))
     
     # Audit log
     await db.audit_logs.insert_one({
@@ -262,11 +268,12 @@ async def get_tenant_campaign(
         raise HTTPException(404, 'Campaign not found')
     
     # Enrich with stats
-    campaign['play_count'] = await db.plays.count_documents({'campaign_id': campaign_id, 'is_test': {'$ne': True}})
-    campaign['test_play_count'] = await db.plays.count_documents({'campaign_id': campaign_id, 'is_test': True})
-    campaign['player_count'] = await db.players.count_documents({'campaign_id': campaign_id})
-    campaign['codes_issued'] = await db.reward_codes.count_documents({'campaign_id': campaign_id, 'is_test': {'$ne': True}})
-    campaign['codes_redeemed'] = await db.reward_codes.count_documents({'campaign_id': campaign_id, 'status': 'redeemed'})
+    stats = (await get_campaign_stats([campaign_id]))[campaign_id]
+    campaign['play_count'] = stats['plays']
+    campaign['test_play_count'] = stats['test_plays']
+    campaign['player_count'] = stats['players']
+    campaign['codes_issued'] = stats['live_rewards_issued']
+    campaign['codes_redeemed'] = stats['rewards_redeemed']
     
     return campaign
 
@@ -314,8 +321,15 @@ async def update_tenant_campaign(
         update_data['prizes'] = prizes
     
     update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+    if update_data.get('status') == 'test' and campaign.get('status') != 'test':
+        update_data['test_since'] = update_data['updated_at']
     
     await db.campaigns.update_one({'id': campaign_id}, {'$set': update_data})
+    notify_lifecycle({**campaign, **update_data})
+    if 'prizes' in update_data:
+        delta = len(update_data['prizes']) - len(campaign.get('prizes', []))
+        if delta:
+            await record_prize_change(campaign_id, campaign['tenant_id'], delta)
     
     # Audit log
     await db.audit_logs.insert_one({
@@ -359,22 +373,19 @@ async def change_campaign_status(
     
     # Validation before going active
     if new_status == 'active':
-        prizes = campaign.get('prizes', [])
-        if not prizes:
-            raise HTTPException(400, 'Cannot activate: No prizes configured')
-        
-        total_stock = sum(p.get('stock_remaining', 0) for p in prizes)
-        if total_stock <= 0:
-            raise HTTPException(400, 'Cannot activate: No stock available')
-        
-        if not campaign.get('terms_text'):
-            raise HTTPException(400, 'Cannot activate: Terms text is required')
+        errors = validate_builder_campaign_for_publish(campaign)
+        if errors:
+            raise HTTPException(400, f'Cannot activate: {errors[0]}')
     
     update = {
         'status': new_status,
         'updated_at': datetime.now(timezone.utc).isoformat()
     }
     
+    # Marks the campaign for auto-start if its start date is still ahead
+    if new_status == 'test' and old_status != 'test':
+        update['test_since'] = update['updated_at']
+    
     if new_status == 'active' and old_status != 'active':
         update['activated_at'] = datetime.now(timezone.utc).isoformat()
         update['activated_by'] = user['id']
@@ -384,6 +395,7 @@ async def change_campaign_status(
         update['ended_by'] = user['id']
     
     await db.campaigns.update_one({'id': campaign_id}, {'$set': update})
+    notify_lifecycle({**campaign, **update})
     
     # Audit log
     await db.audit_logs.insert_one({
@@ -532,6 +544,7 @@ async def delete_campaign(
         # Hard delete if no plays
         await db.campaigns.delete_one({'id': campaign_id})
         await db.plays.delete_many({'campaign_id': campaign_id})  # Delete test plays
+        await drop_campaign(campaign_id)
     
     # Audit log
     await db.audit_logs.insert_one({
@@ -5,8 +5,22 @@ Includes: Plans CRUD, Platform Settings, Tenant Details, Messaging, Exports, Fra
 from fastapi import APIRouter, HTTPException, Request, Depends, Query, Response
 from pydantic import BaseModel, Field
 from database import db
-from auth import require_super_admin, get_current_user
-from crypto_utils import encrypt_value, decrypt_value, mask_key
+from auth import require_super_admin, get_current_user, invalidate_tenant
+from crypto_utils import encrypt_value, mask_key
+from secrets_manager import get_stripe_settings, invalidate_platform_settings
+from timeutils import parse_datetime, day_start, month_start
+from pagination import paginate, TOTAL_MODE_PATTERN
+import metrics
+import prize_repository
+import profiling
+from json_response import FastJSONResponse
+from stripe_webhooks import replay_events
+from message_inbox import invalidate_broadcasts, initial_recipients
+from stats_store import (
+    get_tenant_stats, get_tenant_stats_many, get_campaign_stats,
+    record_prize_change, drop_campaign, reconcile_stats
+)
+import asyncio
 import uuid
 import csv
 import io
@@ -238,9 +252,9 @@ async def delete_plan(plan_id: str, request: Request, user: dict = Depends(requi
 @router.get("/settings/billing")
 async def get_billing_settings(user: dict = Depends(require_super_admin)):
     """Get Stripe configuration (keys are masked for security)."""
-    settings = await db.platform_settings.find_one({'setting_type': 'stripe'}, {'_id': 0})
+    settings = await get_stripe_settings()
     
-    if not settings:
+    if not settings['configured']:
         return {
             'mode': 'test',
             'test_secret_key': '',
@@ -252,9 +266,9 @@ async def get_billing_settings(user: dict = Depends(require_super_admin)):
             'live_secret_key_masked': ''
         }
     
-    # Decrypt and mask keys for display
-    test_sk = decrypt_value(settings.get('test_secret_key_encrypted', ''))
-    live_sk = decrypt_value(settings.get('live_secret_key_encrypted', ''))
+    # Mask keys for display
+    test_sk = settings['test_secret_key']
+    live_sk = settings['live_secret_key']
     
     return {
         'mode': settings.get('mode', 'test'),
@@ -294,10 +308,12 @@ async def update_billing_settings(req: StripeSettingsUpdate, request: Request, u
         update['mode'] = req.mode
     
     if settings:
-        await db.platform_settings.update_one({'setting_type': 'stripe'}, {'$set': update})
+        await db.platform_settings.update_one({'setting_type': 'stripe'}, {'$set': update, '$inc': {'version': 1}})
     else:
         update['created_at'] = datetime.now(timezone.utc).isoformat()
+        update['version'] = 1
         await db.platform_settings.insert_one(update)
+    invalidate_platform_settings('stripe')
     
     # Log sensitive action
     await db.audit_logs.insert_one({
@@ -314,6 +330,61 @@ async def update_billing_settings(req: StripeSettingsUpdate, request: Request, u
     return {'message': 'Billing settings updated'}
 
 
+# ==================== STRIPE WEBHOOK EVENTS ====================
+
+class WebhookReplayRequest(BaseModel):
+    event_ids: Optional[List[str]] = None
+    tenant_id: Optional[str] = None
+    since: Optional[str] = None
+
+
+@router.get("/billing/webhook-events")
+async def list_webhook_events(
+    user: dict = Depends(require_super_admin),
+    status: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+    limit: int = Query(50, le=200),
+    after: Optional[str] = None,
+    total_mode: str = Query('exact', pattern=TOTAL_MODE_PATTERN)
+):
+    """Stored Stripe webhook events, newest first."""
+    query = {}
+    if status:
+        query['status'] = status
+    if tenant_id:
+        query['tenant_id'] = tenant_id
+    page = await paginate(
+        db.stripe_events, query, sort_key='received_at', limit=limit, after=after,
+        projection={'_id': 0, 'payload': 0}, total_mode=total_mode
+    )
+    return {'events': page['items'], 'total': page['total'], 'next_cursor': page['next_cursor']}
+
+
+@router.post("/billing/webhook-events/replay")
+async def replay_webhook_events(req: WebhookReplayRequest, request: Request, user: dict = Depends(require_super_admin)):
+    """Re-apply stored Stripe events (by id, tenant and/or date) for reconciliation."""
+    if not (req.event_ids or req.tenant_id or req.since):
+        raise HTTPException(400, 'Provide event_ids, tenant_id or since')
+    since = None
+    if req.since:
+        since = parse_datetime(req.since)
+        if since is None:
+            raise HTTPException(400, 'Invalid since date')
+    queued = await replay_events(req.event_ids, req.tenant_id, since)
+
+    await db.audit_logs.insert_one({
+        'id': str(uuid.uuid4()),
+        'tenant_id': req.tenant_id,
+        'user_id': user['id'],
+        'action': 'admin_replay_stripe_events',
+        'category': 'billing',
+        'details': f'Replayed {queued} Stripe events',
+        'ip_address': request.client.host if request.client else 'unknown',
+        'created_at': datetime.now(timezone.utc).isoformat()
+    })
+    return {'queued': queued}
+
+
 # ==================== ENHANCED TENANTS ====================
 
 @router.get("/tenants/list")
@@ -321,6 +392,8 @@ async def list_tenants_enhanced(
     user: dict = Depends(require_super_admin),
     skip: int = 0,
     limit: int = 50,
+    after: Optional[str] = None,
+    total_mode: str = Query('exact', pattern=TOTAL_MODE_PATTERN),
     search: Optional[str] = None,
     status: Optional[str] = None,
     plan: Optional[str] = None,
@@ -342,16 +415,20 @@ async def list_tenants_enhanced(
     
     sort_dir = -1 if sort_order == "desc" else 1
     
-    tenants = await db.tenants.find(query, {'_id': 0}).sort(sort_by, sort_dir).skip(skip).limit(limit).to_list(limit)
-    total = await db.tenants.count_documents(query)
+    page = await paginate(
+        db.tenants, query, sort_key=sort_by, direction=sort_dir,
+        limit=limit, after=after, skip=skip, total_mode=total_mode
+    )
+    tenants = page['items']
     
     # Enrich with stats
+    tenant_stats = await get_tenant_stats_many([t['id'] for t in tenants])
     for t in tenants:
         tid = t['id']
         t['campaign_count'] = await db.campaigns.count_documents({'tenant_id': tid})
         t['active_campaign_count'] = await db.campaigns.count_documents({'tenant_id': tid, 'status': 'active'})
-        t['play_count'] = await db.plays.count_documents({'tenant_id': tid, 'is_test': {'$ne': True}})
-        t['player_count'] = await db.players.count_documents({'tenant_id': tid})
+        t['play_count'] = tenant_stats[tid]['plays']
+        t['player_count'] = tenant_stats[tid]['players']
         
         # Get owner info
         owner = await db.users.find_one({'id': t.get('owner_id')}, {'_id': 0, 'email': 1, 'name': 1})
@@ -362,14 +439,13 @@ async def list_tenants_enhanced(
         t['subscription'] = sub
         
         # Monthly plays this month
-        month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0).isoformat()
         t['plays_this_month'] = await db.plays.count_documents({
             'tenant_id': tid, 
             'is_test': {'$ne': True},
-            'created_at': {'$gte': month_start}
+            'played_at': {'$gte': month_start()}
         })
     
-    return {'tenants': tenants, 'total': total}
+    return FastJSONResponse({'tenants': tenants, 'total': page['total'], 'next_cursor': page['next_cursor']})
 
 
 @router.get("/tenants/{tenant_id}")
@@ -390,38 +466,45 @@ async def get_tenant_detail(tenant_id: str, user: dict = Depends(require_super_a
     
     # Campaigns
     campaigns = await db.campaigns.find({'tenant_id': tenant_id}, {'_id': 0}).sort('created_at', -1).to_list(100)
+    campaign_stats = await get_campaign_stats([c['id'] for c in campaigns])
     for c in campaigns:
-        c['play_count'] = await db.plays.count_documents({'campaign_id': c['id'], 'is_test': {'$ne': True}})
-        c['prize_count'] = await db.prizes.count_documents({'campaign_id': c['id']})
+        c['play_count'] = campaign_stats[c['id']]['plays']
+        c['prize_count'] = campaign_stats[c['id']]['prizes']
     
     # Stats
-    month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0).isoformat()
+    tenant_stats = await get_tenant_stats(tenant_id)
     stats = {
         'total_campaigns': await db.campaigns.count_documents({'tenant_id': tenant_id}),
         'active_campaigns': await db.campaigns.count_documents({'tenant_id': tenant_id, 'status': 'active'}),
-        'total_plays': await db.plays.count_documents({'tenant_id': tenant_id, 'is_test': {'$ne': True}}),
+        'total_plays': tenant_stats['plays'],
         'plays_this_month': await db.plays.count_documents({
             'tenant_id': tenant_id,
             'is_test': {'$ne': True},
-            'created_at': {'$gte': month_start}
+            'played_at': {'$gte': month_start()}
         }),
-        'total_players': await db.players.count_documents({'tenant_id': tenant_id}),
-        'rewards_issued': await db.reward_codes.count_documents({'tenant_id': tenant_id}),
-        'rewards_redeemed': await db.reward_codes.count_documents({'tenant_id': tenant_id, 'status': 'redeemed'})
+        'total_players': tenant_stats['players'],
+        'rewards_issued': tenant_stats['rewards_issued'],
+        'rewards_redeemed': tenant_stats['rewards_redeemed']
     }
     
-    # Recent plays (last 7 days)
-    week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-    daily_plays = []
-    for i in range(7):
-        day = datetime.now(timezone.utc) - timedelta(days=6-i)
-        day_str = day.strftime('%Y-%m-%d')
-        count = await db.plays.count_documents({
+    # Recent plays (last 7 days), one grouped range query
+    week_start = day_start() - timedelta(days=6)
+    daily_rows = await db.plays.aggregate([
+        {'$match': {
             'tenant_id': tenant_id,
             'is_test': {'$ne': True},
-            'created_at': {'$regex': f'^{day_str}'}
-        })
-        daily_plays.append({'date': day_str, 'plays': count})
+            'played_at': {'$gte': week_start}
+        }},
+        {'$group': {
+            '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$played_at'}},
+            'plays': {'$sum': 1}
+        }}
+    ]).to_list(None)
+    daily_counts = {row['_id']: row['plays'] for row in daily_rows}
+    daily_plays = []
+    for i in range(7):
+        day_str = (week_start + timedelta(days=i)).strftime('%Y-%m-%d')
+        daily_plays.append({'date': day_str, 'plays': daily_counts.get(day_str, 0)})
     stats['daily_plays'] = daily_plays
     
     # Billing info
@@ -440,7 +523,7 @@ async def get_tenant_detail(tenant_id: str, user: dict = Depends(require_super_a
     # Plan limits
     plan_data = await db.plans.find_one({'id': tenant.get('plan', 'free')}, {'_id': 0})
     
-    return {
+    return FastJSONResponse({
         'tenant': tenant,
         'owner': owner,
         'staff': staff,
@@ -452,7 +535,7 @@ async def get_tenant_detail(tenant_id: str, user: dict = Depends(require_super_a
             'plan': plan_data
         },
         'notes': notes
-    }
+    })
 
 
 @router.put("/tenants/{tenant_id}/plan")
@@ -475,8 +558,13 @@ async def change_tenant_plan(
     
     await db.tenants.update_one(
         {'id': tenant_id},
-        {'$set': {'plan': req.plan_id, 'updated_at': datetime.now(timezone.utc).isoformat()}}
+        {'$set': {
+            'plan': req.plan_id,
+            'plan_changed_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }}
     )
+    invalidate_tenant(tenant_id)
     
     await db.subscriptions.update_one(
         {'tenant_id': tenant_id},
@@ -519,8 +607,13 @@ async def cancel_tenant_subscription(
     
     await db.tenants.update_one(
         {'id': tenant_id},
-        {'$set': {'plan': 'free', 'updated_at': datetime.now(timezone.utc).isoformat()}}
+        {'$set': {
+            'plan': 'free',
+            'plan_changed_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }}
     )
+    invalidate_tenant(tenant_id)
     
     await db.subscriptions.update_one(
         {'tenant_id': tenant_id},
@@ -761,22 +854,13 @@ async def list_admin_messages(
     skip: int = 0,
     limit: int = 50
 ):
-    """List all admin messages."""
+    """List all admin messages with their precomputed read stats."""
     messages = await db.admin_messages.find({}, {'_id': 0}).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
     total = await db.admin_messages.count_documents({})
     
-    # Enrich with read stats
     for m in messages:
-        if m.get('target_type') == 'broadcast':
-            total_tenants = await db.tenants.count_documents({})
-            read_count = await db.tenant_message_reads.count_documents({'message_id': m['id']})
-            m['read_count'] = read_count
-            m['total_recipients'] = total_tenants
-        else:
-            target_count = len(m.get('target_tenant_ids', []))
-            read_count = await db.tenant_message_reads.count_documents({'message_id': m['id']})
-            m['read_count'] = read_count
-            m['total_recipients'] = target_count
+        m.setdefault('read_count', 0)
+        m.setdefault('total_recipients', 0)
     
     return {'messages': messages, 'total': total}
 
@@ -792,11 +876,14 @@ async def create_admin_message(req: AdminMessageCreate, request: Request, user:
         'target_type': req.target_type,
         'target_tenant_ids': req.target_tenant_ids if req.target_type == 'targeted' else [],
         'expires_at': req.expires_at,
+        'read_count': 0,
+        'total_recipients': await initial_recipients(req.target_type, req.target_tenant_ids),
         'created_by': user['id'],
         'created_at': datetime.now(timezone.utc).isoformat()
     }
     
     await db.admin_messages.insert_one(message)
+    invalidate_broadcasts()
     
     await db.audit_logs.insert_one({
         'id': str(uuid.uuid4()),
@@ -822,6 +909,7 @@ async def delete_admin_message(message_id: str, user: dict = Depends(require_sup
     
     # Also delete read receipts
     await db.tenant_message_reads.delete_many({'message_id': message_id})
+    invalidate_broadcasts()
     
     return {'message': 'Message deleted'}
 
@@ -833,6 +921,8 @@ async def get_audit_logs_enhanced(
     user: dict = Depends(require_super_admin),
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
+    total_mode: str = Query('exact', pattern=TOTAL_MODE_PATTERN),
     tenant_id: Optional[str] = None,
     action: Optional[str] = None,
     category: Optional[str] = None,
@@ -859,16 +949,18 @@ async def get_audit_logs_enhanced(
         else:
             query['created_at'] = {'$lte': date_to}
     
-    logs = await db.audit_logs.find(query, {'_id': 0}).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.audit_logs.count_documents(query)
+    page = await paginate(
+        db.audit_logs, query, limit=limit, after=after, skip=skip, total_mode=total_mode
+    )
     
     # Get unique categories and actions for filters
     categories = await db.audit_logs.distinct('category')
     actions = await db.audit_logs.distinct('action')
     
     return {
-        'logs': logs,
-        'total': total,
+        'logs': page['items'],
+        'total': page['total'],
+        'next_cursor': page['next_cursor'],
         'filters': {
             'categories': [c for c in categories if c],
             'actions': [a for a in actions if a]
@@ -993,6 +1085,8 @@ async def get_fraud_flags_enhanced(
     user: dict = Depends(require_super_admin),
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
+    total_mode: str = Query('exact', pattern=TOTAL_MODE_PATTERN),
     flag_type: Optional[str] = None,
     tenant_id: Optional[str] = None,
     date_from: Optional[str] = None
@@ -1005,17 +1099,21 @@ async def get_fraud_flags_enhanced(
     if tenant_id:
         query['tenant_id'] = tenant_id
     if date_from:
-        query['created_at'] = {'$gte': date_from}
+        from_date = parse_datetime(date_from)
+        if from_date:
+            query['created_at'] = {'$gte': from_date}
     
-    flags = await db.fraud_flags.find(query, {'_id': 0}).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.fraud_flags.count_documents(query)
+    page = await paginate(
+        db.fraud_flags, query, limit=limit, after=after, skip=skip, total_mode=total_mode
+    )
     
     # Get flag types for filter
     flag_types = await db.fraud_flags.distinct('type')
     
     return {
-        'flags': flags,
-        'total': total,
+        'flags': page['items'],
+        'total': page['total'],
+        'next_cursor': page['next_cursor'],
         'flag_types': flag_types
     }
 
@@ -1029,7 +1127,9 @@ async def list_games(
     status: Optional[str] = None,
     search: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    after: Optional[str] = None,
+    total_mode: str = Query('exact', pattern=TOTAL_MODE_PATTERN)
 ):
     query = {}
     if tenant_id:
@@ -1039,15 +1139,24 @@ async def list_games(
     if search:
         query['title'] = {'$regex': search, '$options': 'i'}
 
-    games = await db.campaigns.find(query, {'_id': 0}).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.campaigns.count_documents(query)
+    page = await paginate(
+        db.campaigns, query, limit=limit, after=after, skip=skip, total_mode=total_mode
+    )
+    games = page['items']
+
+    campaign_stats = await get_campaign_stats([g['id'] for g in games])
+    tenant_ids = list({g['tenant_id'] for g in games})
+    tenants = await db.tenants.find(
+        {'id': {'$in': tenant_ids}}, {'_id': 0, 'id': 1, 'name': 1, 'slug': 1}
+    ).to_list(len(tenant_ids) or 1)
+    tenants_by_id = {t['id']: t for t in tenants}
 
     for game in games:
-        game['prize_count'] = await db.prizes.count_documents({'campaign_id': game['id']})
-        game['play_count'] = await db.plays.count_documents({'campaign_id': game['id'], 'is_test': {'$ne': True}})
-        game['tenant'] = await db.tenants.find_one({'id': game['tenant_id']}, {'_id': 0, 'id': 1, 'name': 1, 'slug': 1})
+        game['prize_count'] = campaign_stats[game['id']]['prizes']
+        game['play_count'] = campaign_stats[game['id']]['plays']
+        game['tenant'] = tenants_by_id.get(game['tenant_id'])
 
-    return {'games': games, 'total': total}
+    return {'games': games, 'total': page['total'], 'next_cursor': page['next_cursor']}
 
 
 @router.post("/games")
@@ -1070,6 +1179,7 @@ async def create_game(req: AdminGameCreate, request: Request, user: dict = Depen
         'description': req.description,
         'description_fr': req.description_fr,
         'status': 'draft',
+        'prizes': [],
         'start_date': req.start_date,
         'end_date': req.end_date,
         'legal_text': req.legal_text,
@@ -1153,7 +1263,7 @@ async def update_game_status(game_id: str, req: AdminGameStatusUpdate, request:
 
 @router.post("/games/{game_id}/duplicate")
 async def duplicate_game(game_id: str, req: DuplicateGameRequest, request: Request, user: dict = Depends(require_super_admin)):
-    source = await db.campaigns.find_one({'id': game_id}, {'_id': 0})
+    source = await prize_repository.get_campaign_with_prizes({'id': game_id})
     if not source:
         raise HTTPException(404, 'Source game not found')
 
@@ -1176,25 +1286,14 @@ async def duplicate_game(game_id: str, req: DuplicateGameRequest, request: Reque
         'title': base_title,
         'slug': slug,
         'status': 'draft',
+        'prizes': prize_repository.clone_prizes(source['prizes']),
         'created_at': datetime.now(timezone.utc).isoformat(),
         'updated_at': datetime.now(timezone.utc).isoformat()
     }
     await db.campaigns.insert_one(cloned)
 
-    source_prizes = await db.prizes.find({'campaign_id': game_id}, {'_id': 0}).to_list(500)
-    if source_prizes:
-        cloned_prizes = []
-        now = datetime.now(timezone.utc).isoformat()
-        for prize in source_prizes:
-            cloned_prizes.append({
-                **prize,
-                'id': str(uuid.uuid4()),
-                'campaign_id': new_id,
-                'tenant_id': target_tenant_id,
-                'stock_remaining': prize.get('stock', 0),
-                'created_at': now
-            })
-        await db.prizes.insert_many(cloned_prizes)
+    if cloned['prizes']:
+        await record_prize_change(new_id, target_tenant_id, len(cloned['prizes']))
 
     await db.audit_logs.insert_one({
         'id': str(uuid.uuid4()),
@@ -1217,7 +1316,7 @@ async def delete_game(game_id: str, request: Request, user: dict = Depends(requi
     if not game:
         raise HTTPException(404, 'Game not found')
     await db.campaigns.delete_one({'id': game_id})
-    await db.prizes.delete_many({'campaign_id': game_id})
+    await drop_campaign(game_id)
 
     await db.audit_logs.insert_one({
         'id': str(uuid.uuid4()),
@@ -1234,11 +1333,10 @@ async def delete_game(game_id: str, request: Request, user: dict = Depends(requi
 
 @router.get("/games/{game_id}/prizes")
 async def list_game_prizes(game_id: str, user: dict = Depends(require_super_admin)):
-    game = await db.campaigns.find_one({'id': game_id}, {'_id': 0})
+    game = await prize_repository.get_campaign_with_prizes({'id': game_id}, {'_id': 0, 'id': 1, 'prizes': 1})
     if not game:
         raise HTTPException(404, 'Game not found')
-    prizes = await db.prizes.find({'campaign_id': game_id}, {'_id': 0}).to_list(200)
-    return {'prizes': prizes}
+    return {'prizes': game['prizes']}
 
 
 @router.post("/games/{game_id}/prizes")
@@ -1261,37 +1359,72 @@ async def create_game_prize(game_id: str, req: AdminPrizeCreate, user: dict = De
         'color': req.color,
         'created_at': datetime.now(timezone.utc).isoformat()
     }
-    await db.prizes.insert_one(prize)
-    prize.pop('_id', None)
+    await prize_repository.add_prize(game_id, prize)
+    await record_prize_change(game_id, game['tenant_id'], 1)
     return prize
 
 
 @router.put("/game-prizes/{prize_id}")
 async def update_game_prize(prize_id: str, req: AdminPrizeUpdate, user: dict = Depends(require_super_admin)):
-    prize = await db.prizes.find_one({'id': prize_id}, {'_id': 0})
+    prize = await prize_repository.find_prize(prize_id)
     if not prize:
         raise HTTPException(404, 'Prize not found')
 
     update = {k: v for k, v in req.model_dump().items() if v is not None}
     if 'stock' in update:
-        diff = update['stock'] - prize.get('stock', 0)
-        update['stock_remaining'] = max(0, prize.get('stock_remaining', 0) + diff)
+        update.update(prize_repository.restock(prize, update.pop('stock')))
 
-    if update:
-        await db.prizes.update_one({'id': prize_id}, {'$set': update})
-    updated = await db.prizes.find_one({'id': prize_id}, {'_id': 0})
-    return updated
+    return await prize_repository.update_prize(prize_id, update)
 
 
 @router.delete("/game-prizes/{prize_id}")
 async def delete_game_prize(prize_id: str, user: dict = Depends(require_super_admin)):
-    prize = await db.prizes.find_one({'id': prize_id}, {'_id': 0})
+    prize = await prize_repository.find_prize(prize_id)
     if not prize:
         raise HTTPException(404, 'Prize not found')
-    await db.prizes.delete_one({'id': prize_id})
+    await prize_repository.delete_prize(prize_id)
+    await record_prize_change(prize['campaign_id'], prize.get('tenant_id'), -1)
     return {'message': 'Prize deleted'}
 
 
+# ==================== STATS MAINTENANCE ====================
+
+@router.post("/stats/reconcile")
+async def reconcile_materialized_stats(
+    user: dict = Depends(require_super_admin),
+    tenant_id: Optional[str] = None
+):
+    """Recompute materialized tenant/campaign counters and repair any drift."""
+    report = await reconcile_stats(tenant_id)
+    return report
+
+
+@router.get("/metrics")
+async def get_metrics(user: dict = Depends(require_super_admin)):
+    """In-process counters and timings of the worker serving this request."""
+    return metrics.snapshot()
+
+
+@router.get("/profiles")
+async def list_profiles(user: dict = Depends(require_super_admin)):
+    """Request profiles stored by this worker, newest first."""
+    profiles = await asyncio.to_thread(profiling.list_profiles)
+    return {'engine': profiling.ENGINE, 'profiles': profiles}
+
+
+@router.get("/profiles/{profile_id}/{fmt}")
+async def get_profile(profile_id: str, fmt: str, user: dict = Depends(require_super_admin)):
+    """One stored profile as ``html``, ``speedscope`` (pyinstrument) or ``pstats`` (cProfile)."""
+    if not profiling.is_profile_id(profile_id):
+        raise HTTPException(400, 'Invalid profile id')
+    found = await asyncio.to_thread(profiling.read_profile, profile_id, fmt)
+    if not found:
+        raise HTTPException(404, 'Profile not found')
+    content, media_type, filename = found
+    headers = {} if fmt == 'html' else {'Content-Disposition': f'attachment; filename="{filename}"'}
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
 # ==================== TENANT IMPERSONATION ====================
 
 @router.post("/tenants/{tenant_id}/impersonate")
@@ -1307,7 +1440,7 @@ async def impersonate_tenant(tenant_id: str, request: Request, user: dict = Depe
     
     # Create impersonation token with special flag
     from auth import create_token
-    token = create_token(owner['id'], owner['role'], tenant_id)
+    token = create_token(owner['id'], owner['role'], tenant_id, tenant_status=tenant.get('status'))
     
     # Log impersonation
     await db.audit_logs.insert_one({
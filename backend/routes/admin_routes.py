@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Request, Depends, Query
 from pydantic import BaseModel
 from database import db
-from auth import require_super_admin, hash_password, get_current_user
+from auth import require_super_admin, hash_password, get_current_user, revoke_tenant_tokens, invalidate_tenant
+from pagination import paginate, TOTAL_MODE_PATTERN
+from message_inbox import record_tenant_created
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
@@ -113,7 +115,7 @@ async def create_tenant(req: CreateTenantRequest, request: Request, user: dict =
     new_user = {
         'id': user_id,
         'email': req.email.lower(),
-        'password_hash': hash_password(req.password),
+        'password_hash': await hash_password(req.password),
         'role': 'tenant_owner',
         'tenant_id': tenant_id,
         'name': req.business_name,
@@ -125,6 +127,7 @@ async def create_tenant(req: CreateTenantRequest, request: Request, user: dict =
     }
 
     await db.tenants.insert_one(tenant)
+    await record_tenant_created()
     await db.users.insert_one(new_user)
     await db.subscriptions.insert_one({
         'id': str(uuid.uuid4()),
@@ -165,6 +168,10 @@ async def update_tenant_status(
         {'id': tenant_id},
         {'$set': {'status': req.status, 'updated_at': datetime.now(timezone.utc).isoformat()}}
     )
+    if req.status == 'suspended':
+        await revoke_tenant_tokens(tenant_id)
+    else:
+        invalidate_tenant(tenant_id)
 
     await db.audit_logs.insert_one({
         'id': str(uuid.uuid4()),
@@ -184,22 +191,28 @@ async def get_audit_logs(
     user: dict = Depends(require_super_admin),
     skip: int = 0,
     limit: int = 50,
+    after: Optional[str] = None,
+    total_mode: str = Query('exact', pattern=TOTAL_MODE_PATTERN),
     tenant_id: Optional[str] = None
 ):
     query = {}
     if tenant_id:
         query['tenant_id'] = tenant_id
-    logs = await db.audit_logs.find(query, {'_id': 0}).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.audit_logs.count_documents(query)
-    return {'logs': logs, 'total': total}
+    page = await paginate(
+        db.audit_logs, query, limit=limit, after=after, skip=skip, total_mode=total_mode
+    )
+    return {'logs': page['items'], 'total': page['total'], 'next_cursor': page['next_cursor']}
 
 
 @router.get("/fraud")
 async def get_fraud_flags(
     user: dict = Depends(require_super_admin),
     skip: int = 0,
-    limit: int = 50
+    limit: int = 50,
+    after: Optional[str] = None,
+    total_mode: str = Query('exact', pattern=TOTAL_MODE_PATTERN)
 ):
-    flags = await db.fraud_flags.find({}, {'_id': 0}).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.fraud_flags.count_documents({})
-    return {'flags': flags, 'total': total}
+    page = await paginate(
+        db.fraud_flags, {}, limit=limit, after=after, skip=skip, total_mode=total_mode
+    )
+    return {'flags': page['items'], 'total': page['total'], 'next_cursor': page['next_cursor']}
@@ -0,0 +1,25 @@
+"""
+Public asset delivery (content-addressed, immutable)
+"""
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from asset_store import read_asset, get_variant_content_type, IMMUTABLE_CACHE_CONTROL, ASSET_SECURITY_HEADERS
+
+router = APIRouter(prefix="/api/assets", tags=["assets"])
+
+
+@router.get("/{key}")
+async def get_asset(key: str, request: Request):
+    """Serve a stored asset variant. Keys embed the content hash, so responses never change."""
+    etag = f'"{key}"'
+    headers = {'ETag': etag, 'Cache-Control': IMMUTABLE_CACHE_CONTROL, **ASSET_SECURITY_HEADERS}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+
+    content_type = await get_variant_content_type(key)
+    if not content_type:
+        raise HTTPException(404, 'Asset not found')
+    data = await read_asset(key)
+    if data is None:
+        raise HTTPException(404, 'Asset not found')
+    return Response(data, media_type=content_type, headers=headers)
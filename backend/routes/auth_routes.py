@@ -1,9 +1,12 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
 from pydantic import BaseModel, EmailStr
 from database import db
+from login_throttle import check_login_attempt, clear_email
+from message_inbox import record_tenant_created
 from auth import (
-    hash_password, verify_password, create_token, 
-    generate_verification_token, get_current_user
+    hash_password, verify_and_rehash, create_token, 
+    generate_verification_token, get_current_user,
+    get_bearer_payload, revoke_token, revoke_user_tokens
 )
 import uuid
 from datetime import datetime, timezone
@@ -126,7 +129,7 @@ async def signup(req: SignupRequest, request: Request):
     user = {
         'id': user_id,
         'email': req.email.lower(),
-        'password_hash': hash_password(req.password),
+        'password_hash': await hash_password(req.password),
         'role': 'tenant_owner',
         'tenant_id': tenant_id,
         'first_name': req.first_name,
@@ -143,6 +146,7 @@ async def signup(req: SignupRequest, request: Request):
     }
 
     await db.tenants.insert_one(tenant)
+    await record_tenant_created()
     await db.users.insert_one(user)
 
     # Create default free subscription
@@ -168,7 +172,7 @@ async def signup(req: SignupRequest, request: Request):
     })
 
     # Auto-login after signup
-    token = create_token(user_id, 'tenant_owner', tenant_id)
+    token = create_token(user_id, 'tenant_owner', tenant_id, tenant_status='active')
 
     return {
         'message': 'Account created successfully',
@@ -192,10 +196,17 @@ async def signup(req: SignupRequest, request: Request):
 
 
 @router.post("/login")
-async def login(req: LoginRequest):
+async def login(req: LoginRequest, request: Request):
+    await check_login_attempt(req.email.lower(), request.client.host if request.client else 'unknown')
     user = await db.users.find_one({'email': req.email.lower()}, {'_id': 0})
-    if not user or not verify_password(req.password, user['password_hash']):
+    if not user:
+        raise HTTPException(401, 'Invalid email or password')
+    valid, new_hash = await verify_and_rehash(req.password, user['password_hash'])
+    if not valid:
         raise HTTPException(401, 'Invalid email or password')
+    if new_hash:
+        await db.users.update_one({'id': user['id']}, {'$set': {'password_hash': new_hash}})
+    await clear_email(req.email.lower())
 
     # Check tenant status
     tenant = None
@@ -204,7 +215,10 @@ async def login(req: LoginRequest):
         if tenant and tenant.get('status') == 'suspended':
             raise HTTPException(403, 'Your account has been suspended')
 
-    token = create_token(user['id'], user['role'], user.get('tenant_id'))
+    token = create_token(
+        user['id'], user['role'], user.get('tenant_id'),
+        tenant_status=tenant.get('status') if tenant else None
+    )
 
     return {
         'token': token,
@@ -240,6 +254,13 @@ async def get_me(user: dict = Depends(get_current_user)):
     }
 
 
+@router.post("/logout")
+async def logout(request: Request, user: dict = Depends(get_current_user)):
+    payload = get_bearer_payload(request)
+    await revoke_token(payload['jti'], payload['exp'])
+    return {'message': 'Logged out'}
+
+
 @router.post("/verify-email")
 async def verify_email(req: VerifyEmailRequest):
     user = await db.users.find_one({'verification_token': req.token}, {'_id': 0})
@@ -276,9 +297,10 @@ async def reset_password(req: ResetPasswordRequest):
     await db.users.update_one(
         {'id': user['id']},
         {'$set': {
-            'password_hash': hash_password(req.new_password),
+            'password_hash': await hash_password(req.new_password),
             'reset_token': None,
             'updated_at': datetime.now(timezone.utc).isoformat()
         }}
     )
+    await revoke_user_tokens(user['id'])
     return {'message': 'Password reset successfully'}
@@ -1,12 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from database import db
-from auth import require_tenant_owner
+from auth import require_tenant_owner, invalidate_tenant
+from stripe_gateway import get_gateway
 import uuid
-import os
 from datetime import datetime, timezone
 import logging
-import stripe
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/billing", tags=["billing"])
@@ -29,13 +28,6 @@ async def list_plans():
     return {"plans": PLANS}
 
 
-def _get_stripe_key() -> str:
-    stripe_key = os.environ.get("STRIPE_API_KEY")
-    if not stripe_key:
-        raise HTTPException(500, "Stripe not configured (missing STRIPE_API_KEY)")
-    return stripe_key
-
-
 @router.post("/checkout")
 async def create_checkout(req: CheckoutRequest, user: dict = Depends(require_tenant_owner)):
     if req.plan not in PLANS or req.plan == "free":
@@ -47,7 +39,7 @@ async def create_checkout(req: CheckoutRequest, user: dict = Depends(require_ten
     plan_info = PLANS[req.plan]
     amount = plan_info["price_monthly"] if req.billing_cycle == "monthly" else plan_info["price_yearly"]
 
-    stripe.api_key = _get_stripe_key()
+    gateway = await get_gateway()
 
     # Stripe = montant en CENTIMES (int)
     amount_cents = int(round(float(amount) * 100))
@@ -56,28 +48,31 @@ async def create_checkout(req: CheckoutRequest, user: dict = Depends(require_ten
     cancel_url = f"{req.origin_url}/dashboard/billing"
 
     try:
-        session = stripe.checkout.Session.create(
-            mode="payment",
-            success_url=success_url,
-            cancel_url=cancel_url,
-            line_items=[
-                {
-                    "price_data": {
-                        "currency": "usd",
-                        "product_data": {
-                            "name": f"{plan_info['name']} ({req.billing_cycle})",
+        session = await gateway.create_checkout_session(
+            {
+                "mode": "payment",
+                "success_url": success_url,
+                "cancel_url": cancel_url,
+                "line_items": [
+                    {
+                        "price_data": {
+                            "currency": "usd",
+                            "product_data": {
+                                "name": f"{plan_info['name']} ({req.billing_cycle})",
+                            },
+                            "unit_amount": amount_cents,
                         },
-                        "unit_amount": amount_cents,
-                    },
-                    "quantity": 1,
-                }
-            ],
-            metadata={
-                "tenant_id": user["tenant_id"],
-                "user_id": user["id"],
-                "plan": req.plan,
-                "billing_cycle": req.billing_cycle,
+                        "quantity": 1,
+                    }
+                ],
+                "metadata": {
+                    "tenant_id": user["tenant_id"],
+                    "user_id": user["id"],
+                    "plan": req.plan,
+                    "billing_cycle": req.billing_cycle,
+                },
             },
+            idempotency_key=str(uuid.uuid4()),
         )
     except Exception as e:
         logger.exception("Stripe checkout session creation failed")
@@ -105,10 +100,10 @@ async def create_checkout(req: CheckoutRequest, user: dict = Depends(require_ten
 
 @router.get("/checkout/status/{session_id}")
 async def checkout_status(session_id: str, user: dict = Depends(require_tenant_owner)):
-    stripe.api_key = _get_stripe_key()
+    gateway = await get_gateway()
 
     try:
-        session = stripe.checkout.Session.retrieve(session_id)
+        session = await gateway.retrieve_checkout_session(session_id)
     except Exception as e:
         raise HTTPException(400, f"Invalid session_id or Stripe error: {str(e)}")
 
@@ -143,8 +138,13 @@ async def checkout_status(session_id: str, user: dict = Depends(require_tenant_o
 
             await db.tenants.update_one(
                 {"id": tx["tenant_id"]},
-                {"$set": {"plan": plan, "updated_at": datetime.now(timezone.utc).isoformat()}},
+                {"$set": {
+                    "plan": plan,
+                    "plan_changed_at": datetime.now(timezone.utc),
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                }},
             )
+            invalidate_tenant(tx["tenant_id"])
 
             await db.subscriptions.update_one(
                 {"tenant_id": tx["tenant_id"]},
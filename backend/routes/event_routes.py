@@ -0,0 +1,115 @@
+"""
+Live activity feed (Server-Sent Events and WebSocket)
+Tenants receive their own plays, wins and redemptions; super admins receive
+every tenant's, or a single tenant's with ``tenant_id``.
+
+Clients that cannot send headers first exchange their session token for a
+short-lived stream ticket (``POST /ticket``). Open streams re-check token
+revocation on every heartbeat and end once the session is revoked.
+"""
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, Depends
+from fastapi.responses import StreamingResponse
+
+from auth import (
+    get_stream_user, get_current_user, get_bearer_payload, create_stream_ticket, is_revoked,
+    STREAM_TICKET_SECONDS
+)
+from event_bus import subscribe, tenant_channel, ADMIN_CHANNEL
+from json_response import dumps
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+
+
+def _channels(user: dict, tenant_id: Optional[str]) -> list:
+    if user['role'] == 'super_admin':
+        return [tenant_channel(tenant_id)] if tenant_id else [ADMIN_CHANNEL]
+    if not user.get('tenant_id'):
+        raise HTTPException(403, 'Tenant access required')
+    return [tenant_channel(user['tenant_id'])]
+
+
+@router.post("/ticket")
+async def create_ticket(request: Request, user: dict = Depends(get_current_user)):
+    """Exchange the session token for a stream ticket to pass as ``?ticket=``."""
+    return {'ticket': create_stream_ticket(get_bearer_payload(request)), 'expires_in': STREAM_TICKET_SECONDS}
+
+
+@router.get("/stream")
+async def stream_events(request: Request, tenant_id: Optional[str] = None):
+    """Server-Sent Events feed (``ticket`` query parameter accepted for EventSource)."""
+    user, payload = await get_stream_user(request)
+    channels = _channels(user, tenant_id)
+
+    async def event_source():
+        async with subscribe(channels) as queue:
+            yield b'retry: 5000\n\n'
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    event = None
+                if is_revoked(payload):
+                    yield b'event: revoked\ndata: {}\n\n'
+                    return
+                if event is None:
+                    yield b': keep-alive\n\n'
+                    continue
+                yield b'event: ' + event['type'].encode() + b'\ndata: ' + dumps(event) + b'\n\n'
+
+    return StreamingResponse(
+        event_source(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, tenant_id: Optional[str] = None):
+    """WebSocket feed; authenticate with the ``ticket`` query parameter."""
+    try:
+        user, payload = await get_stream_user(websocket)
+        channels = _channels(user, tenant_id)
+    except HTTPException as e:
+        await websocket.close(code=4000 + e.status_code, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+
+    async def wait_for_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    async with subscribe(channels) as queue:
+        disconnected = asyncio.create_task(wait_for_disconnect())
+        next_event = None
+        try:
+            while not disconnected.done():
+                if next_event is None:
+                    next_event = asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait(
+                    {next_event, disconnected}, timeout=HEARTBEAT_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if disconnected in done:
+                    break
+                if is_revoked(payload):
+                    await websocket.close(code=4401, reason='Token revoked')
+                    break
+                if not done:
+                    continue
+                await websocket.send_text(dumps(next_event.result()).decode())
+                next_event = None
+        except WebSocketDisconnect:
+            pass
+        finally:
+            if next_event is not None:
+                next_event.cancel()
+            disconnected.cancel()
@@ -3,7 +3,17 @@ from pydantic import BaseModel
 from database import db
 from auth import hash_identifier
 from game_engine import weighted_draw, generate_reward_code, calculate_prize_index
+from stats_store import record_play
+from event_bus import publish_play
+from timeutils import utcnow, month_start
+from player_search import build_search_tokens
+from precompressed import PrecompressedPayload
+from campaign_lifecycle import on_transition
+from prize_repository import decrement_stock
+from repositories import campaigns, tenants, players, plays, reward_codes
 import uuid
+import os
+import time
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 import logging
@@ -14,6 +24,18 @@ router = APIRouter(prefix="/api/game", tags=["game"])
 
 MAX_PLAYS_PER_IDENTIFIER = 2
 
+# Public game configs are served precompressed from a short-lived cache
+GAME_CONFIG_CACHE_TTL_SECONDS = float(os.environ.get('GAME_CONFIG_CACHE_TTL_SECONDS', '30'))
+GAME_CONFIG_CACHE_MAX_ENTRIES = 1000
+_game_config_cache = {}
+
+
+@on_transition
+def invalidate_game_config(campaign: dict, status: str = None):
+    """Drop the cached public configs of a campaign (every language)."""
+    for key in [k for k in _game_config_cache if k[0] == campaign.get('slug')]:
+        _game_config_cache.pop(key, None)
+
 
 class PlayRequest(BaseModel):
     email: str
@@ -33,32 +55,36 @@ class ConsentRecord(BaseModel):
 
 
 @router.get("/{slug}")
-async def get_campaign_for_play(slug: str, lang: str = "en"):
-    # Find campaign by slug across all tenants (public endpoint)
-    campaign = await db.campaigns.find_one(
-        {'slug': slug, 'status': {'$in': ['active', 'test']}},
-        {'_id': 0}
+async def get_campaign_for_play(slug: str, request: Request, lang: str = "en"):
+    key = (slug, lang)
+    cached = _game_config_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1].response(request)
+
+    # Dynamic payloads favour fast compression levels over the last few bytes
+    payload = PrecompressedPayload.from_json(
+        await _build_campaign_config(slug, lang), gzip_level=6, brotli_quality=5
     )
+    if len(_game_config_cache) >= GAME_CONFIG_CACHE_MAX_ENTRIES:
+        _game_config_cache.clear()
+    _game_config_cache[key] = (time.monotonic() + GAME_CONFIG_CACHE_TTL_SECONDS, payload)
+    return payload.response(request)
+
+
+async def _build_campaign_config(slug: str, lang: str) -> dict:
+    # Find campaign by slug across all tenants (public endpoint)
+    campaign = await campaigns.playable(slug)
     if not campaign:
         raise HTTPException(404, 'Campaign not found or not active')
 
-    tenant = await db.tenants.find_one({'id': campaign['tenant_id']}, {'_id': 0})
+    tenant = await tenants.by_id(campaign['tenant_id'])
     
     # Get tenant profile for social links and branding
     tenant_profile = await db.tenant_profiles.find_one({'tenant_id': campaign['tenant_id']}, {'_id': 0})
 
-    # Get prizes - check both embedded prizes and separate collection
-    prizes = campaign.get('prizes', [])
-    if not prizes:
-        # Fallback to separate prizes collection
-        prizes = await db.prizes.find(
-            {'campaign_id': campaign['id']},
-            {'_id': 0}
-        ).to_list(100)
-    
     # Clean up prizes for frontend (remove sensitive data)
     clean_prizes = []
-    for p in prizes:
+    for p in campaign['prizes']:
         clean_p = {
             'id': p.get('id'),
             'label': p.get('label', ''),
@@ -120,10 +146,7 @@ async def get_campaign_for_play(slug: str, lang: str = "en"):
 
 @router.post("/{slug}/play")
 async def play_game(slug: str, req: PlayRequest, request: Request):
-    campaign = await db.campaigns.find_one(
-        {'slug': slug, 'status': {'$in': ['active', 'test']}},
-        {'_id': 0}
-    )
+    campaign = await campaigns.playable(slug)
     if not campaign:
         raise HTTPException(404, 'Campaign not found or not active')
 
@@ -164,14 +187,9 @@ async def play_game(slug: str, req: PlayRequest, request: Request):
 
     # Check plan play limits for non-test plays
     if not is_test:
-        tenant = await db.tenants.find_one({'id': tenant_id}, {'_id': 0})
+        tenant = await tenants.by_id(tenant_id, {'_id': 0, 'plan': 1})
         plan = tenant.get('plan', 'free') if tenant else 'free'
-        month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0).isoformat()
-        monthly_plays = await db.plays.count_documents({
-            'tenant_id': tenant_id,
-            'is_test': False,
-            'created_at': {'$gte': month_start}
-        })
+        monthly_plays = await plays.count_live_since(tenant_id, month_start())
         limits = {'free': 500, 'pro': 10000, 'business': 999999}
         if monthly_plays >= limits.get(plan, 500):
             raise HTTPException(429, 'Monthly play limit reached for current plan')
@@ -184,32 +202,21 @@ async def play_game(slug: str, req: PlayRequest, request: Request):
 
     # Fraud check: max plays per identifier per campaign
     if not is_test:
-        email_plays = await db.plays.count_documents({
-            'campaign_id': campaign_id,
-            'email_hash': email_hash,
-            'is_test': False
-        })
+        email_plays = await plays.count_live_by(campaign_id, 'email_hash', email_hash)
         if email_plays >= MAX_PLAYS_PER_IDENTIFIER:
             raise HTTPException(429, 'Maximum plays reached for this email')
 
         if phone_hash:
-            phone_plays = await db.plays.count_documents({
-                'campaign_id': campaign_id,
-                'phone_hash': phone_hash,
-                'is_test': False
-            })
+            phone_plays = await plays.count_live_by(campaign_id, 'phone_hash', phone_hash)
             if phone_plays >= MAX_PLAYS_PER_IDENTIFIER:
                 raise HTTPException(429, 'Maximum plays reached for this phone number')
 
     # IP rate limiting
     ip_address = request.client.host if request.client else 'unknown'
     if not is_test:
-        recent_ip_plays = await db.plays.count_documents({
-            'campaign_id': campaign_id,
-            'ip_address': ip_address,
-            'is_test': False,
-            'created_at': {'$gte': (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()}
-        })
+        recent_ip_plays = await plays.count_live_by(
+            campaign_id, 'ip_address', ip_address, since=utcnow() - timedelta(hours=1)
+        )
         if recent_ip_plays >= 10:
             await db.fraud_flags.insert_one({
                 'id': str(uuid.uuid4()),
@@ -218,17 +225,15 @@ async def play_game(slug: str, req: PlayRequest, request: Request):
                 'type': 'ip_rate_limit',
                 'details': f'IP {ip_address} exceeded rate limit',
                 'ip_address': ip_address,
-                'created_at': datetime.now(timezone.utc).isoformat()
+                'created_at': utcnow()
             })
             raise HTTPException(429, 'Too many plays from this location')
 
     # Get or create player
-    player = await db.players.find_one({
-        'campaign_id': campaign_id,
-        'email_hash': email_hash
-    }, {'_id': 0})
+    player = await players.for_campaign(campaign_id, email_hash)
 
-    if not player:
+    new_player = player is None
+    if new_player:
         player = {
             'id': str(uuid.uuid4()),
             'campaign_id': campaign_id,
@@ -238,9 +243,9 @@ async def play_game(slug: str, req: PlayRequest, request: Request):
             'phone': req.phone,
             'phone_hash': phone_hash,
             'plays_count': 0,
-            'created_at': datetime.now(timezone.utc).isoformat()
+            'created_at': utcnow()
         }
-        await db.players.insert_one(player)
+        await players.insert_one(player)
 
     # Record consent
     await db.consents.insert_one({
@@ -250,15 +255,11 @@ async def play_game(slug: str, req: PlayRequest, request: Request):
         'consent_type': 'game_terms',
         'ip_address': ip_address,
         'legal_text_version': '1.0',
-        'created_at': datetime.now(timezone.utc).isoformat()
+        'created_at': utcnow()
     })
 
     # Server-side weighted draw
-    # Get prizes - check both embedded prizes and separate collection
-    prizes = campaign.get('prizes', [])
-    if not prizes:
-        prizes = await db.prizes.find({'campaign_id': campaign_id}, {'_id': 0}).to_list(100)
-    
+    prizes = campaign['prizes']
     all_prizes_for_index = prizes.copy()
 
     winning_prize = weighted_draw(prizes)
@@ -270,7 +271,7 @@ async def play_game(slug: str, req: PlayRequest, request: Request):
     if winning_prize:
         prize_index = calculate_prize_index(all_prizes_for_index, winning_prize['id'])
         reward_code_str = generate_reward_code(is_test)
-        expires_at = (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+        expires_at = utcnow() + timedelta(days=30)
 
         reward = {
             'id': str(uuid.uuid4()),
@@ -284,9 +285,9 @@ async def play_game(slug: str, req: PlayRequest, request: Request):
             'redeemed_at': None,
             'redeemed_by': None,
             'is_test': is_test,
-            'created_at': datetime.now(timezone.utc).isoformat()
+            'created_at': utcnow()
         }
-        await db.reward_codes.insert_one(reward)
+        await reward_codes.insert_one(reward)
         reward_data = {
             'code': reward_code_str,
             'expires_at': expires_at,
@@ -296,12 +297,10 @@ async def play_game(slug: str, req: PlayRequest, request: Request):
 
         # Decrement stock only for non-test plays
         if not is_test:
-            await db.prizes.update_one(
-                {'id': winning_prize['id'], 'stock_remaining': {'$gt': 0}},
-                {'$inc': {'stock_remaining': -1}}
-            )
+            await decrement_stock(campaign_id, winning_prize['id'])
 
     # Record play
+    played_at = utcnow()
     play = {
         'id': str(uuid.uuid4()),
         'play_id': str(uuid.uuid4()),
@@ -317,21 +316,28 @@ async def play_game(slug: str, req: PlayRequest, request: Request):
         'reward_code_id': reward['id'] if winning_prize and reward_data else None,
         'email_hash': email_hash,
         'phone_hash': phone_hash,
+        'search_tokens': build_search_tokens(req.email, req.phone, req.first_name),
         'ip_address': ip_address,
         'device_hash': req.device_hash,
         'marketing_consent': req.marketing_consent,
         'tasks_completed': req.tasks_completed,
         'is_test': is_test,
-        'played_at': datetime.now(timezone.utc),
-        'created_at': datetime.now(timezone.utc).isoformat()
+        'played_at': played_at,
+        'created_at': played_at
     }
-    await db.plays.insert_one(play)
+    await plays.insert_one(play)
 
     # Update player play count
-    await db.players.update_one(
-        {'id': player['id']},
-        {'$inc': {'plays_count': 1}}
+    await players.increment_plays(player['id'])
+
+    await record_play(
+        tenant_id,
+        campaign_id,
+        is_test=is_test,
+        new_player=new_player,
+        reward_issued=reward_data is not None
     )
+    publish_play(play)
 
     return {
         'won': winning_prize is not None,
@@ -349,7 +355,7 @@ async def record_consent(req: ConsentRecord, request: Request):
         'consent_type': req.consent_type,
         'ip_address': request.client.host if request.client else 'unknown',
         'legal_text_version': req.legal_text_version,
-        'created_at': datetime.now(timezone.utc).isoformat()
+        'created_at': utcnow()
     }
     await db.consents.insert_one(consent)
     return {'message': 'Consent recorded'}
@@ -9,10 +9,14 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 import csv
 import io
+import uuid
 from bson import ObjectId
 
 from database import db
 from auth import get_current_user
+from json_response import FastJSONResponse
+from player_search import search_query
+from pagination import decode_cursor, encode_cursor, apply_keyset, count_total, TOTAL_MODE_PATTERN
 
 router = APIRouter(prefix="/api/tenant", tags=["tenant-analytics"])
 
@@ -21,6 +25,8 @@ router = APIRouter(prefix="/api/tenant", tags=["tenant-analytics"])
 async def get_players(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    total_mode: str = Query('exact', pattern=TOTAL_MODE_PATTERN),
     campaign_id: Optional[str] = None,
     marketing_consent: Optional[str] = None,
     search: Optional[str] = None,
@@ -28,7 +34,12 @@ async def get_players(
     date_to: Optional[str] = None,
     user: dict = Depends(get_current_user)
 ):
-    """Get list of players for tenant with filters"""
+    """Get list of players for tenant with filters.
+
+    Pass the returned ``next_cursor`` as ``after`` to fetch the next page
+    with an index range scan; ``page`` is still honoured when ``after`` is
+    omitted.
+    """
     if user.get('role') not in ['tenant_owner', 'super_admin']:
         raise HTTPException(403, "Access denied")
     
@@ -45,12 +56,9 @@ async def get_players(
     if marketing_consent:
         query["marketing_consent"] = marketing_consent == "true"
     
-    if search:
-        query["$or"] = [
-            {"email": {"$regex": search, "$options": "i"}},
-            {"phone": {"$regex": search, "$options": "i"}},
-            {"first_name": {"$regex": search, "$options": "i"}}
-        ]
+    search_filter = search_query(search)
+    if search_filter:
+        query.update(search_filter)
     
     if date_from:
         try:
@@ -70,19 +78,19 @@ async def get_players(
             pass
 
     # Get total count
-    total = await db.plays.count_documents(query)
-    pages = (total + limit - 1) // limit
-    skip = (page - 1) * limit
+    total = await count_total(db.plays, query, total_mode)
+    pages = (total + limit - 1) // limit if total is not None else None
+    cursor = decode_cursor(after)
 
-    # Get players with campaign info
-    # Handle both old format (created_at) and new format (played_at)
+    # Get players with campaign info, newest first on the
+    # (tenant_id, played_at, id) index
     pipeline = [
-        {"$match": query},
-        {"$addFields": {
-            "sort_date": {"$ifNull": ["$played_at", "$created_at"]}
-        }},
-        {"$sort": {"sort_date": -1}},
-        {"$skip": skip},
+        {"$match": apply_keyset(query, "played_at", cursor)},
+        {"$sort": {"played_at": -1, "id": -1}},
+    ]
+    if not cursor:
+        pipeline.append({"$skip": (page - 1) * limit})
+    pipeline += [
         {"$limit": limit},
         {"$lookup": {
             "from": "campaigns",
@@ -105,12 +113,13 @@ async def get_players(
         {"$project": {
             "_id": 0,
             "id": {"$ifNull": ["$play_id", "$id"]},
+            "cursor_id": "$id",
             "email": {"$ifNull": ["$email", {"$arrayElemAt": ["$player.email", 0]}]},
             "phone": {"$ifNull": ["$phone", {"$arrayElemAt": ["$player.phone", 0]}]},
             "first_name": 1,
             "campaign_id": 1,
             "campaign_title": {"$arrayElemAt": ["$campaign.title", 0]},
-            "played_at": {"$ifNull": ["$played_at", "$created_at"]},
+            "played_at": 1,
             "won": {"$gt": ["$prize_id", None]},
             "prize_label": 1,
             "marketing_consent": {"$ifNull": ["$marketing_consent", False]}
@@ -119,6 +128,12 @@ async def get_players(
 
     players = await db.plays.aggregate(pipeline).to_list(None)
 
+    next_cursor = None
+    if len(players) == limit:
+        next_cursor = encode_cursor(players[-1].get("played_at"), players[-1].get("cursor_id"))
+    for p in players:
+        p.pop("cursor_id", None)
+
     # Get stats
     stats_pipeline = [
         {"$match": {"tenant_id": tenant_id}},
@@ -136,13 +151,14 @@ async def get_players(
     }
     del stats["_id"]
 
-    return {
+    return FastJSONResponse({
         "players": players,
         "total": total,
         "pages": pages,
         "page": page,
+        "next_cursor": next_cursor,
         "stats": stats
-    }
+    })
 
 
 @router.get("/players/export")
@@ -178,11 +194,9 @@ async def export_players(
     if marketing_consent:
         query["marketing_consent"] = marketing_consent == "true"
     
-    if search:
-        query["$or"] = [
-            {"email": {"$regex": search, "$options": "i"}},
-            {"phone": {"$regex": search, "$options": "i"}}
-        ]
+    search_filter = search_query(search)
+    if search_filter:
+        query.update(search_filter)
 
     # Only export players with marketing consent for GDPR compliance
     query["marketing_consent"] = True
@@ -232,12 +246,13 @@ async def export_players(
     
     # Log export
     await db.audit_logs.insert_one({
+        "id": str(uuid.uuid4()),
         "tenant_id": tenant_id,
-        "user_id": user.get("sub"),
+        "user_id": user.get("id"),
         "action": "players_exported",
         "category": "data",
         "details": {"count": len(players)},
-        "created_at": datetime.now(timezone.utc)
+        "created_at": datetime.now(timezone.utc).isoformat()
     })
 
     return StreamingResponse(
@@ -383,13 +398,10 @@ async def get_analytics(
     ]
     top_campaigns = await db.plays.aggregate(top_campaigns_pipeline).to_list(None)
 
-    # Recent activity - handle both played_at and created_at
+    # Recent activity (played_at is backfilled on every play)
     recent_pipeline = [
         {"$match": {"tenant_id": tenant_id}},
-        {"$addFields": {
-            "sort_date": {"$ifNull": ["$played_at", "$created_at"]}
-        }},
-        {"$sort": {"sort_date": -1}},
+        {"$sort": {"played_at": -1}},
         {"$limit": 10},
         {"$lookup": {
             "from": "players",
@@ -400,13 +412,13 @@ async def get_analytics(
         {"$project": {
             "_id": 0,
             "email": {"$ifNull": ["$email", {"$arrayElemAt": ["$player.email", 0]}]},
-            "played_at": {"$ifNull": ["$played_at", "$created_at"]},
+            "played_at": 1,
             "won": {"$gt": ["$prize_id", None]}
         }}
     ]
     recent_activity = await db.plays.aggregate(recent_pipeline).to_list(None)
 
-    return {
+    return FastJSONResponse({
         "total_plays": total_plays,
         "total_wins": total_wins,
         "unique_players": unique_players,
@@ -421,4 +433,4 @@ async def get_analytics(
         "hourly_distribution": hourly_distribution,
         "top_campaigns": top_campaigns,
         "recent_activity": recent_activity
-    }
+    })
@@ -1,16 +1,17 @@
 """
 Tenant Profile Routes - Business details, logo upload, social links
 """
-from fastapi import APIRouter, HTTPException, Request, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Request, Depends, UploadFile, File, Query, Response
 from pydantic import BaseModel
 from database import db
 from auth import get_current_user, require_tenant_access
+from asset_store import store_image, public_asset, DEFAULT_VARIANT
+from message_inbox import list_inbox, unread_count, mark_read
+from qr_service import game_url, render_qr, render_campaigns_zip, FORMATS as QR_FORMATS
 import uuid
 from datetime import datetime, timezone
 from typing import Optional, Dict
 import base64
-import qrcode
-import io
 import os
 
 router = APIRouter(prefix="/api/tenant", tags=["tenant-profile"])
@@ -129,30 +130,33 @@ async def update_tenant_branding(
 
 @router.post("/logo")
 async def upload_logo(
+    request: Request,
     file: UploadFile = File(...),
     user: dict = Depends(require_tenant_access)
 ):
-    """Upload tenant logo (stored as base64 for simplicity)."""
-    if not file.content_type.startswith('image/'):
-        raise HTTPException(400, 'File must be an image')
-    
-    # Read and encode
+    """Upload tenant logo to the asset store; the tenant keeps only URLs.
+
+    The image type is detected from the bytes; the client's content type is ignored.
+    """
     content = await file.read()
     if len(content) > 2 * 1024 * 1024:  # 2MB limit
         raise HTTPException(400, 'File too large (max 2MB)')
     
-    base64_image = f"data:{file.content_type};base64,{base64.b64encode(content).decode()}"
+    asset = await store_image(content, tenant_id=user['tenant_id'])
+    logo = public_asset(asset, os.environ.get('ASSET_BASE_URL') or str(request.base_url))
+    logo_url = logo['urls'][DEFAULT_VARIANT]
     
     await db.tenants.update_one(
         {'id': user['tenant_id']},
         {'$set': {
-            'profile.logo_url': base64_image,
-            'branding.logo_url': base64_image,
+            'profile.logo_url': logo_url,
+            'branding.logo_url': logo_url,
+            'branding.logo_asset': logo,
             'updated_at': datetime.now(timezone.utc).isoformat()
         }}
     )
     
-    return {'message': 'Logo uploaded', 'logo_url': base64_image}
+    return {'message': 'Logo uploaded', 'logo_url': logo_url, 'logo': logo}
 
 
 # NOTE: /players endpoint moved to tenant_analytics_routes.py with enhanced filters and stats
@@ -163,82 +167,88 @@ async def get_campaign_qrcode(
     campaign_id: str,
     user: dict = Depends(require_tenant_access)
 ):
-    """Generate QR code for a campaign."""
-    campaign = await db.campaigns.find_one({
-        'id': campaign_id,
-        'tenant_id': user['tenant_id']
-    })
+    """QR code for a campaign as a PNG data URL."""
+    campaign = await db.campaigns.find_one(
+        {'id': campaign_id, 'tenant_id': user['tenant_id']},
+        {'_id': 0, 'slug': 1, 'title': 1}
+    )
     if not campaign:
         raise HTTPException(404, 'Campaign not found')
     
-    tenant = await db.tenants.find_one({'id': user['tenant_id']})
-    
-    # Build the game URL
-    base_url = os.environ.get('REACT_APP_BACKEND_URL', 'https://wheel-fortune-12.preview.emergentagent.com')
-    game_url = f"{base_url}/play/{campaign['slug']}"
-    
-    # Generate QR code
-    qr = qrcode.QRCode(version=1, box_size=10, border=4)
-    qr.add_data(game_url)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convert to base64
-    buffer = io.BytesIO()
-    img.save(buffer, format='PNG')
-    qr_base64 = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+    url = game_url(campaign['slug'])
+    png = await render_qr(url, 'screen', 'png')
+    qr_base64 = f"data:image/png;base64,{base64.b64encode(png).decode()}"
     
     return {
         'qr_code': qr_base64,
-        'game_url': game_url,
+        'game_url': url,
         'campaign_name': campaign.get('title', ''),
         'campaign_slug': campaign['slug']
     }
 
 
+@router.get("/campaigns/{campaign_id}/qrcode.{fmt}")
+async def download_campaign_qrcode(
+    campaign_id: str,
+    fmt: str,
+    size: str = 'print',
+    user: dict = Depends(require_tenant_access)
+):
+    """Download a campaign QR code as SVG, PNG or PDF (size: screen, print, poster or pixels)."""
+    campaign = await db.campaigns.find_one(
+        {'id': campaign_id, 'tenant_id': user['tenant_id']},
+        {'_id': 0, 'slug': 1}
+    )
+    if not campaign:
+        raise HTTPException(404, 'Campaign not found')
+    
+    data = await render_qr(game_url(campaign['slug']), size, fmt)
+    return Response(
+        data,
+        media_type=QR_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="qr-{campaign["slug"]}.{fmt}"',
+            'Cache-Control': 'private, max-age=3600'
+        }
+    )
+
+
+@router.get("/qrcodes/campaigns.zip")
+async def download_all_campaign_qrcodes(
+    fmt: str = Query('png', alias='format'),
+    size: str = 'print',
+    user: dict = Depends(require_tenant_access)
+):
+    """Zip of QR codes for every campaign of the tenant."""
+    campaigns = await db.campaigns.find(
+        {'tenant_id': user['tenant_id'], 'status': {'$ne': 'deleted'}},
+        {'_id': 0, 'slug': 1}
+    ).to_list(None)
+    if not campaigns:
+        raise HTTPException(404, 'No campaigns')
+    
+    data = await render_campaigns_zip(campaigns, size, fmt)
+    return Response(
+        data,
+        media_type='application/zip',
+        headers={'Content-Disposition': 'attachment; filename="qr-codes.zip"'}
+    )
+
+
 @router.get("/admin-messages")
 async def get_admin_messages_for_tenant(user: dict = Depends(require_tenant_access)):
     """Get admin messages for this tenant (broadcast + targeted)."""
-    tenant_id = user['tenant_id']
-    now = datetime.now(timezone.utc).isoformat()
-    
-    # Get broadcast messages + messages targeted to this tenant
-    messages = await db.admin_messages.find({
-        '$or': [
-            {'target_type': 'broadcast'},
-            {'target_type': 'targeted', 'target_tenant_ids': tenant_id}
-        ],
-        '$or': [
-            {'expires_at': None},
-            {'expires_at': {'$gt': now}}
-        ]
-    }, {'_id': 0}).sort('created_at', -1).to_list(50)
-    
-    # Mark which ones are read
-    for m in messages:
-        read = await db.tenant_message_reads.find_one({
-            'tenant_id': tenant_id,
-            'message_id': m['id']
-        })
-        m['is_read'] = read is not None
-    
-    return {'messages': messages}
+    return {'messages': await list_inbox(user['tenant_id'])}
+
+
+@router.get("/admin-messages/unread-count")
+async def get_admin_messages_unread_count(user: dict = Depends(require_tenant_access)):
+    """Number of unread admin messages (cheap enough to poll)."""
+    return {'unread': await unread_count(user['tenant_id'])}
 
 
 @router.post("/admin-messages/{message_id}/read")
 async def mark_message_read(message_id: str, user: dict = Depends(require_tenant_access)):
     """Mark an admin message as read."""
-    existing = await db.tenant_message_reads.find_one({
-        'tenant_id': user['tenant_id'],
-        'message_id': message_id
-    })
-    
-    if not existing:
-        await db.tenant_message_reads.insert_one({
-            'tenant_id': user['tenant_id'],
-            'message_id': message_id,
-            'read_at': datetime.now(timezone.utc).isoformat()
-        })
-    
+    await mark_read(user['tenant_id'], message_id)
     return {'message': 'Marked as read'}
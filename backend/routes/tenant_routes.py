@@ -1,8 +1,16 @@
 from fastapi import APIRouter, HTTPException, Request, Depends, Query
 from pydantic import BaseModel
 from database import db
-from auth import require_tenant_owner, require_tenant_access, hash_password, get_current_user
+from auth import require_tenant_owner, require_tenant_access, hash_password, get_current_user, revoke_user_tokens
 from game_engine import validate_campaign_for_publish
+from timeutils import day_bounds
+from pagination import paginate, TOTAL_MODE_PATTERN
+from campaign_lifecycle import notify as notify_lifecycle
+import prize_repository
+from redemption import redeem_code, redeem_codes, verify_code
+from stats_store import (
+    get_tenant_stats, get_campaign_stats, record_prize_change, drop_campaign
+)
 import uuid
 import re
 from datetime import datetime, timezone
@@ -56,28 +64,33 @@ class StaffCreate(BaseModel):
     password: str
 
 
+class BulkRedeemRequest(BaseModel):
+    codes: List[str]
+
+
 @router.get("/dashboard")
 async def tenant_dashboard(user: dict = Depends(require_tenant_owner)):
     tid = user['tenant_id']
-    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    today_start, today_end = day_bounds()
 
     total_campaigns = await db.campaigns.count_documents({'tenant_id': tid})
     active_campaigns = await db.campaigns.count_documents({'tenant_id': tid, 'status': 'active'})
-    total_plays = await db.plays.count_documents({'tenant_id': tid, 'is_test': {'$ne': True}})
+    stats = await get_tenant_stats(tid)
+    total_plays = stats['plays']
     plays_today = await db.plays.count_documents({
         'tenant_id': tid,
         'is_test': {'$ne': True},
-        'created_at': {'$regex': f'^{today}'}
+        'played_at': {'$gte': today_start, '$lt': today_end}
     })
-    total_players = await db.players.count_documents({'tenant_id': tid})
-    rewards_issued = await db.reward_codes.count_documents({'tenant_id': tid})
-    rewards_redeemed = await db.reward_codes.count_documents({'tenant_id': tid, 'status': 'redeemed'})
+    total_players = stats['players']
+    rewards_issued = stats['rewards_issued']
+    rewards_redeemed = stats['rewards_redeemed']
 
     conversion_rate = round((rewards_redeemed / rewards_issued * 100), 1) if rewards_issued > 0 else 0
 
     recent_plays = await db.plays.find(
         {'tenant_id': tid, 'is_test': {'$ne': True}}, {'_id': 0}
-    ).sort('created_at', -1).to_list(10)
+    ).sort('played_at', -1).to_list(10)
 
     return {
         'total_campaigns': total_campaigns,
@@ -104,9 +117,10 @@ async def list_campaigns(
 
     campaigns = await db.campaigns.find(query, {'_id': 0}).sort('created_at', -1).to_list(100)
 
+    campaign_stats = await get_campaign_stats([c['id'] for c in campaigns])
     for c in campaigns:
-        c['prize_count'] = await db.prizes.count_documents({'campaign_id': c['id']})
-        c['play_count'] = await db.plays.count_documents({'campaign_id': c['id'], 'is_test': {'$ne': True}})
+        c['prize_count'] = campaign_stats[c['id']]['prizes']
+        c['play_count'] = campaign_stats[c['id']]['plays']
 
     return {'campaigns': campaigns}
 
@@ -136,6 +150,7 @@ async def create_campaign(req: CampaignCreate, request: Request, user: dict = De
         'description': req.description,
         'description_fr': req.description_fr,
         'status': 'draft',
+        'prizes': [],
         'start_date': req.start_date,
         'end_date': req.end_date,
         'legal_text': req.legal_text,
@@ -165,12 +180,9 @@ async def create_campaign(req: CampaignCreate, request: Request, user: dict = De
 @router.get("/campaigns/{campaign_id}")
 async def get_campaign(campaign_id: str, user: dict = Depends(require_tenant_owner)):
     tid = user['tenant_id']
-    campaign = await db.campaigns.find_one({'id': campaign_id, 'tenant_id': tid}, {'_id': 0})
+    campaign = await prize_repository.get_campaign_with_prizes({'id': campaign_id, 'tenant_id': tid})
     if not campaign:
         raise HTTPException(404, 'Campaign not found')
-
-    prizes = await db.prizes.find({'campaign_id': campaign_id}, {'_id': 0}).to_list(100)
-    campaign['prizes'] = prizes
     return campaign
 
 
@@ -189,6 +201,7 @@ async def update_campaign(campaign_id: str, req: CampaignCreate, user: dict = De
 
     await db.campaigns.update_one({'id': campaign_id}, {'$set': update})
     updated = await db.campaigns.find_one({'id': campaign_id}, {'_id': 0})
+    notify_lifecycle(updated)
     return updated
 
 
@@ -200,7 +213,7 @@ async def update_campaign_status(
     user: dict = Depends(require_tenant_owner)
 ):
     tid = user['tenant_id']
-    campaign = await db.campaigns.find_one({'id': campaign_id, 'tenant_id': tid}, {'_id': 0})
+    campaign = await prize_repository.get_campaign_with_prizes({'id': campaign_id, 'tenant_id': tid})
     if not campaign:
         raise HTTPException(404, 'Campaign not found')
 
@@ -220,15 +233,16 @@ async def update_campaign_status(
 
     # Validate before publishing
     if target == 'active':
-        prizes = await db.prizes.find({'campaign_id': campaign_id}, {'_id': 0}).to_list(100)
-        errors = validate_campaign_for_publish(campaign, prizes)
+        errors = validate_campaign_for_publish(campaign, campaign['prizes'])
         if errors:
             raise HTTPException(400, f'Validation errors: {", ".join(errors)}')
 
-    await db.campaigns.update_one(
-        {'id': campaign_id},
-        {'$set': {'status': target, 'updated_at': datetime.now(timezone.utc).isoformat()}}
-    )
+    update = {'status': target, 'updated_at': datetime.now(timezone.utc).isoformat()}
+    if target == 'test':
+        # Marks the campaign for auto-start if its start date is still ahead
+        update['test_since'] = update['updated_at']
+    await db.campaigns.update_one({'id': campaign_id}, {'$set': update})
+    notify_lifecycle({**campaign, **update})
 
     await db.audit_logs.insert_one({
         'id': str(uuid.uuid4()),
@@ -252,7 +266,7 @@ async def delete_campaign(campaign_id: str, user: dict = Depends(require_tenant_
     if campaign['status'] == 'active':
         raise HTTPException(400, 'Cannot delete active campaign. Pause or end it first.')
     await db.campaigns.delete_one({'id': campaign_id})
-    await db.prizes.delete_many({'campaign_id': campaign_id})
+    await drop_campaign(campaign_id)
     return {'message': 'Campaign deleted'}
 
 
@@ -260,17 +274,16 @@ async def delete_campaign(campaign_id: str, user: dict = Depends(require_tenant_
 @router.get("/campaigns/{campaign_id}/prizes")
 async def list_prizes(campaign_id: str, user: dict = Depends(require_tenant_owner)):
     tid = user['tenant_id']
-    campaign = await db.campaigns.find_one({'id': campaign_id, 'tenant_id': tid})
+    campaign = await prize_repository.get_campaign_with_prizes({'id': campaign_id, 'tenant_id': tid}, {'_id': 0, 'id': 1, 'prizes': 1})
     if not campaign:
         raise HTTPException(404, 'Campaign not found')
-    prizes = await db.prizes.find({'campaign_id': campaign_id}, {'_id': 0}).to_list(100)
-    return {'prizes': prizes}
+    return {'prizes': campaign['prizes']}
 
 
 @router.post("/campaigns/{campaign_id}/prizes")
 async def add_prize(campaign_id: str, req: PrizeCreate, user: dict = Depends(require_tenant_owner)):
     tid = user['tenant_id']
-    campaign = await db.campaigns.find_one({'id': campaign_id, 'tenant_id': tid})
+    campaign = await db.campaigns.find_one({'id': campaign_id, 'tenant_id': tid}, {'_id': 0, 'id': 1})
     if not campaign:
         raise HTTPException(404, 'Campaign not found')
 
@@ -289,15 +302,15 @@ async def add_prize(campaign_id: str, req: PrizeCreate, user: dict = Depends(req
         'created_at': datetime.now(timezone.utc).isoformat()
     }
 
-    await db.prizes.insert_one(prize)
-    prize.pop('_id', None)
+    await prize_repository.add_prize(campaign_id, prize)
+    await record_prize_change(campaign_id, tid, 1)
     return prize
 
 
 @router.put("/prizes/{prize_id}")
 async def update_prize(prize_id: str, req: PrizeUpdate, user: dict = Depends(require_tenant_owner)):
     tid = user['tenant_id']
-    prize = await db.prizes.find_one({'id': prize_id, 'tenant_id': tid})
+    prize = await prize_repository.find_prize(prize_id, tid)
     if not prize:
         raise HTTPException(404, 'Prize not found')
 
@@ -306,23 +319,19 @@ async def update_prize(prize_id: str, req: PrizeUpdate, user: dict = Depends(req
         if v is not None:
             update[k] = v
     if 'stock' in update:
-        diff = update['stock'] - prize['stock']
-        update['stock_remaining'] = max(0, prize['stock_remaining'] + diff)
+        update.update(prize_repository.restock(prize, update.pop('stock')))
 
-    if update:
-        await db.prizes.update_one({'id': prize_id}, {'$set': update})
-
-    updated = await db.prizes.find_one({'id': prize_id}, {'_id': 0})
-    return updated
+    return await prize_repository.update_prize(prize_id, update)
 
 
 @router.delete("/prizes/{prize_id}")
 async def delete_prize(prize_id: str, user: dict = Depends(require_tenant_owner)):
     tid = user['tenant_id']
-    prize = await db.prizes.find_one({'id': prize_id, 'tenant_id': tid})
+    prize = await prize_repository.find_prize(prize_id, tid)
     if not prize:
         raise HTTPException(404, 'Prize not found')
-    await db.prizes.delete_one({'id': prize_id})
+    await prize_repository.delete_prize(prize_id)
+    await record_prize_change(prize['campaign_id'], tid, -1)
     return {'message': 'Prize deleted'}
 
 
@@ -360,7 +369,7 @@ async def add_staff(req: StaffCreate, user: dict = Depends(require_tenant_owner)
     staff = {
         'id': str(uuid.uuid4()),
         'email': req.email.lower(),
-        'password_hash': hash_password(req.password),
+        'password_hash': await hash_password(req.password),
         'role': 'tenant_staff',
         'tenant_id': tid,
         'name': req.name,
@@ -382,6 +391,7 @@ async def remove_staff(staff_id: str, user: dict = Depends(require_tenant_owner)
     if not staff:
         raise HTTPException(404, 'Staff member not found')
     await db.users.delete_one({'id': staff_id})
+    await revoke_user_tokens(staff_id)
     return {'message': 'Staff member removed'}
 
 
@@ -391,6 +401,8 @@ async def list_rewards(
     user: dict = Depends(require_tenant_access),
     skip: int = 0,
     limit: int = 50,
+    after: Optional[str] = None,
+    total_mode: str = Query('exact', pattern=TOTAL_MODE_PATTERN),
     campaign_id: Optional[str] = None,
     status: Optional[str] = None
 ):
@@ -401,68 +413,31 @@ async def list_rewards(
     if status:
         query['status'] = status
 
-    rewards = await db.reward_codes.find(query, {'_id': 0}).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.reward_codes.count_documents(query)
-    return {'rewards': rewards, 'total': total}
+    page = await paginate(
+        db.reward_codes, query, limit=limit, after=after, skip=skip, total_mode=total_mode
+    )
+    return {'rewards': page['items'], 'total': page['total'], 'next_cursor': page['next_cursor']}
 
 
 @router.post("/rewards/{code}/redeem")
 async def redeem_reward(code: str, request: Request, user: dict = Depends(require_tenant_access)):
-    tid = user['tenant_id']
-    reward = await db.reward_codes.find_one({'code': code, 'tenant_id': tid}, {'_id': 0})
-
-    if not reward:
-        raise HTTPException(404, 'Reward code not found')
-    if reward['status'] == 'redeemed':
-        raise HTTPException(400, 'Code already redeemed')
-    if reward['status'] == 'expired':
-        raise HTTPException(400, 'Code has expired')
-    if reward.get('code', '').startswith('TEST-'):
-        raise HTTPException(400, 'Test codes cannot be redeemed')
-
-    # Check expiry
-    if reward.get('expires_at'):
-        exp = datetime.fromisoformat(reward['expires_at'])
-        if datetime.now(timezone.utc) > exp:
-            await db.reward_codes.update_one({'code': code}, {'$set': {'status': 'expired'}})
-            raise HTTPException(400, 'Code has expired')
-
-    await db.reward_codes.update_one(
-        {'code': code},
-        {'$set': {
-            'status': 'redeemed',
-            'redeemed_at': datetime.now(timezone.utc).isoformat(),
-            'redeemed_by': user['id']
-        }}
-    )
+    ip_address = request.client.host if request.client else 'unknown'
+    reward = await redeem_code(user['tenant_id'], code, user, ip_address)
+    return {'message': 'Code redeemed successfully', 'reward': reward}
 
-    await db.audit_logs.insert_one({
-        'id': str(uuid.uuid4()),
-        'tenant_id': tid,
-        'user_id': user['id'],
-        'action': 'redeem_code',
-        'details': f'Code {code} redeemed by {user["email"]}',
-        'ip_address': request.client.host if request.client else 'unknown',
-        'created_at': datetime.now(timezone.utc).isoformat()
-    })
 
-    return {'message': 'Code redeemed successfully', 'reward': reward}
+@router.post("/rewards/bulk-redeem")
+async def bulk_redeem_rewards(req: BulkRedeemRequest, request: Request, user: dict = Depends(require_tenant_access)):
+    """Redeem many scanned codes at once; each code gets its own result."""
+    ip_address = request.client.host if request.client else 'unknown'
+    results = await redeem_codes(user['tenant_id'], req.codes, user, ip_address)
+    return {
+        'results': results,
+        'redeemed': sum(1 for r in results if r['status'] == 'redeemed'),
+        'failed': sum(1 for r in results if r['status'] != 'redeemed')
+    }
 
 
 @router.get("/rewards/{code}/verify")
 async def verify_reward(code: str, user: dict = Depends(require_tenant_access)):
-    tid = user['tenant_id']
-    reward = await db.reward_codes.find_one({'code': code, 'tenant_id': tid}, {'_id': 0})
-    if not reward:
-        raise HTTPException(404, 'Reward code not found')
-
-    # Get prize info
-    prize = await db.prizes.find_one({'id': reward.get('prize_id')}, {'_id': 0})
-    # Get player info
-    player = await db.players.find_one({'id': reward.get('player_id')}, {'_id': 0})
-
-    return {
-        'reward': reward,
-        'prize': prize,
-        'player': player
-    }
+    return await verify_code(user['tenant_id'], code)
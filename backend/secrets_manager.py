@@ -0,0 +1,89 @@
+"""
+Platform secrets manager.
+
+Decrypted platform settings (Stripe keys, webhook secret) are cached in
+memory for ``SECRETS_CACHE_TTL_SECONDS`` so checkouts and settings reads
+don't load and decrypt the document on every request. Writers ``$inc`` the
+document's ``version``; each read compares it (an indexed, one-field lookup)
+with the cached version, so changes made through any worker apply
+everywhere on the next read. ``invalidate_platform_settings`` drops this
+worker's copy right away.
+"""
+import os
+import time
+import logging
+
+from database import db
+from crypto_utils import decrypt_value, rotate_value
+
+logger = logging.getLogger(__name__)
+
+SECRETS_CACHE_TTL_SECONDS = float(os.environ.get('SECRETS_CACHE_TTL_SECONDS', '300'))
+
+ENCRYPTED_FIELDS = ('test_secret_key_encrypted', 'live_secret_key_encrypted')
+
+_cache = {}
+
+
+def invalidate_platform_settings(setting_type: str = None):
+    if setting_type:
+        _cache.pop(setting_type, None)
+    else:
+        _cache.clear()
+
+
+async def _stored_version(setting_type: str) -> int:
+    doc = await db.platform_settings.find_one({'setting_type': setting_type}, {'_id': 0, 'version': 1})
+    return (doc or {}).get('version', 0)
+
+
+async def get_stripe_settings() -> dict:
+    """Return the Stripe settings document with secret keys decrypted."""
+    cached = _cache.get('stripe')
+    if cached and cached[0] > time.monotonic() and cached[1] == await _stored_version('stripe'):
+        return cached[2]
+
+    doc = await db.platform_settings.find_one({'setting_type': 'stripe'}, {'_id': 0}) or {}
+    settings = {
+        'mode': doc.get('mode', 'test'),
+        'test_secret_key': decrypt_value(doc.get('test_secret_key_encrypted', '')),
+        'live_secret_key': decrypt_value(doc.get('live_secret_key_encrypted', '')),
+        'test_publishable_key': doc.get('test_publishable_key', ''),
+        'live_publishable_key': doc.get('live_publishable_key', ''),
+        'webhook_secret': doc.get('webhook_secret', ''),
+        'configured': bool(doc)
+    }
+    _cache['stripe'] = (time.monotonic() + SECRETS_CACHE_TTL_SECONDS, doc.get('version', 0), settings)
+    return settings
+
+
+async def get_stripe_secret_key() -> str:
+    """STRIPE_API_KEY from the environment, else the active mode's stored key."""
+    env_key = os.environ.get('STRIPE_API_KEY')
+    if env_key:
+        return env_key
+    settings = await get_stripe_settings()
+    return settings['live_secret_key'] if settings['mode'] == 'live' else settings['test_secret_key']
+
+
+async def get_stripe_webhook_secret() -> str:
+    return os.environ.get('STRIPE_WEBHOOK_SECRET') or (await get_stripe_settings())['webhook_secret']
+
+
+async def rotate_platform_secrets() -> int:
+    """Re-encrypt stored platform secrets under the primary encryption key."""
+    rotated = 0
+    async for doc in db.platform_settings.find({}, {'_id': 1, **{f: 1 for f in ENCRYPTED_FIELDS}}):
+        update = {}
+        for field in ENCRYPTED_FIELDS:
+            if doc.get(field):
+                new_value = rotate_value(doc[field])
+                if new_value != doc[field]:
+                    update[field] = new_value
+        if update:
+            await db.platform_settings.update_one({'_id': doc['_id']}, {'$set': update, '$inc': {'version': 1}})
+            rotated += 1
+    if rotated:
+        invalidate_platform_settings()
+        logger.info(f"Re-encrypted secrets in {rotated} platform settings documents")
+    return rotated
@@ -11,7 +11,25 @@ ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 from database import db, client
-from auth import hash_password
+from json_response import FastJSONResponse
+from compression import CompressionMiddleware
+from query_stats import QueryStatsMiddleware
+from profiling import ProfilingMiddleware
+from auth import hash_password, load_revocations, REVOCATION_REFRESH_SECONDS
+from stats_store import reconcile_stats
+from migrations import migrate_event_timestamps, backfill_search_tokens, migrate_inline_logos, migrate_prize_collection
+from timeutils import utcnow
+from secrets_manager import get_stripe_secret_key, get_stripe_webhook_secret, rotate_platform_secrets
+import stripe_gateway
+import stripe_webhooks
+from message_inbox import reconcile_message_counters, record_tenant_created
+import event_bus
+import sweeper
+import campaign_lifecycle
+from translation_bundles import translations_response, warm_bundles
+import json
+import background
+import password_hasher
 
 # Import routers
 from routes.auth_routes import router as auth_router
@@ -23,8 +41,10 @@ from routes.tenant_profile_routes import router as tenant_profile_router
 from routes.tenant_analytics_routes import router as tenant_analytics_router
 from routes.game_routes import router as game_router
 from routes.billing_routes import router as billing_router
+from routes.asset_routes import router as asset_router
+from routes.event_routes import router as event_router
 
-app = FastAPI(title="PrizeWheel Pro API")
+app = FastAPI(title="PrizeWheel Pro API", default_response_class=FastJSONResponse)
 
 
 def _build_cors_settings() -> dict:
@@ -52,6 +72,8 @@ app.include_router(tenant_profile_router)
 app.include_router(tenant_analytics_router)
 app.include_router(game_router)
 app.include_router(billing_router)
+app.include_router(asset_router)
+app.include_router(event_router)
 
 # CORS
 cors_settings = _build_cors_settings()
@@ -62,6 +84,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+# Added before QueryStatsMiddleware so it runs inside it and can read the request's DB stats
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(QueryStatsMiddleware)
 
 # Logging
 logging.basicConfig(
@@ -85,6 +111,10 @@ async def startup():
     await db.prizes.create_index("campaign_id")
     await db.plays.create_index([("campaign_id", 1), ("email_hash", 1)])
     await db.plays.create_index([("campaign_id", 1), ("phone_hash", 1)])
+    await db.plays.create_index([("tenant_id", 1), ("played_at", -1), ("id", -1)])
+    await db.plays.create_index([("tenant_id", 1), ("campaign_id", 1), ("played_at", -1), ("id", -1)])
+    await db.plays.create_index([("campaign_id", 1), ("ip_address", 1), ("played_at", -1)])
+    await db.plays.create_index([("tenant_id", 1), ("search_tokens", 1), ("played_at", -1), ("id", -1)])
     await db.reward_codes.create_index("code", unique=True)
     await db.players.create_index([("campaign_id", 1), ("email_hash", 1)])
     await db.payment_transactions.create_index("session_id")
@@ -94,6 +124,8 @@ async def startup():
     await db.platform_settings.create_index("setting_type", unique=True)
     await db.admin_messages.create_index("id", unique=True)
     await db.admin_messages.create_index("created_at")
+    await db.admin_messages.create_index([("target_tenant_ids", 1), ("created_at", -1)])
+    await db.admin_messages.create_index([("target_type", 1), ("created_at", -1)])
     await db.tenant_message_reads.create_index([("tenant_id", 1), ("message_id", 1)], unique=True)
     await db.tenant_notes.create_index([("tenant_id", 1), ("created_at", -1)])
     await db.banned_ips.create_index("value", unique=True)
@@ -101,8 +133,34 @@ async def startup():
     await db.blacklisted_identities.create_index("value", unique=True)
     await db.audit_logs.create_index([("tenant_id", 1), ("created_at", -1)])
     await db.audit_logs.create_index("category")
+
+    # Keyset pagination: (sort key, id) compound indexes
+    await db.audit_logs.create_index([("created_at", -1), ("id", -1)])
+    await db.audit_logs.create_index([("tenant_id", 1), ("created_at", -1), ("id", -1)])
+    await db.fraud_flags.create_index([("created_at", -1), ("id", -1)])
+    await db.reward_codes.create_index([("tenant_id", 1), ("created_at", -1), ("id", -1)])
+    await db.reward_codes.create_index([("status", 1), ("expires_at", 1)])
+    await db.campaigns.create_index("status")
+    await db.campaigns.create_index("prizes.id")
+    await db.campaigns.create_index([("created_at", -1), ("id", -1)])
+    await db.campaigns.create_index([("tenant_id", 1), ("created_at", -1), ("id", -1)])
+    await db.tenants.create_index([("created_at", -1), ("id", -1)])
     await db.consents.create_index([("player_id", 1), ("consent_type", 1)])
 
+    # Materialized stats
+    await db.tenant_stats.create_index("tenant_id", unique=True)
+    await db.campaign_stats.create_index("campaign_id", unique=True)
+    await db.campaign_stats.create_index("tenant_id")
+    await db.login_throttle.create_index("key", unique=True)
+    await db.login_throttle.create_index("expires_at", expireAfterSeconds=0)
+    await db.token_revocations.create_index([("kind", 1), ("key", 1)], unique=True)
+    await db.token_revocations.create_index("expires_at", expireAfterSeconds=0)
+    await db.stripe_events.create_index("id", unique=True)
+    await db.assets.create_index("id", unique=True)
+    await db.stripe_events.create_index([("status", 1), ("created", 1)])
+    await db.stripe_events.create_index([("tenant_id", 1), ("status", 1), ("created", 1)])
+    await db.stripe_events.create_index([("received_at", -1), ("id", -1)])
+
     # Seed super admin
     admin_email = os.environ.get('SUPER_ADMIN_EMAIL', 'admin@prizewheelpro.com')
     admin_password = os.environ.get('SUPER_ADMIN_PASSWORD', 'Admin123!')
@@ -113,7 +171,7 @@ async def startup():
         admin = {
             'id': str(uuid.uuid4()),
             'email': admin_email,
-            'password_hash': hash_password(admin_password),
+            'password_hash': await hash_password(admin_password),
             'role': 'super_admin',
             'tenant_id': None,
             'name': 'Super Admin',
@@ -129,7 +187,7 @@ async def startup():
         await db.users.update_one(
             {'id': existing_admin['id']},
             {'$set': {
-                'password_hash': hash_password(admin_password),
+                'password_hash': await hash_password(admin_password),
                 'email_verified': True,
                 'updated_at': datetime.now(timezone.utc).isoformat()
             }}
@@ -162,11 +220,12 @@ async def startup():
             'created_at': datetime.now(timezone.utc).isoformat(),
             'updated_at': datetime.now(timezone.utc).isoformat()
         })
+        await record_tenant_created()
 
         await db.users.insert_one({
             'id': demo_owner_id,
             'email': demo_tenant_email,
-            'password_hash': hash_password(demo_tenant_password),
+            'password_hash': await hash_password(demo_tenant_password),
             'role': 'tenant_owner',
             'tenant_id': demo_tenant_id,
             'name': demo_tenant_name,
@@ -189,7 +248,7 @@ async def startup():
         await db.users.update_one(
             {'id': demo_user['id']},
             {'$set': {
-                'password_hash': hash_password(demo_tenant_password),
+                'password_hash': await hash_password(demo_tenant_password),
                 'email_verified': True,
                 'updated_at': datetime.now(timezone.utc).isoformat()
             }}
@@ -258,6 +317,25 @@ async def startup():
             await db.plans.insert_one(plan)
             logger.info(f"Plan seeded: {plan['name']}")
 
+    warm_bundles()
+
+    # Background jobs (first reconcile run also backfills missing stats documents)
+    background.start_task('migrate-event-timestamps', migrate_event_timestamps())
+    background.start_task('backfill-search-tokens', backfill_search_tokens())
+    background.start_task('rotate-platform-secrets', rotate_platform_secrets())
+    background.start_task('migrate-inline-logos', migrate_inline_logos())
+    background.start_task('migrate-prize-collection', migrate_prize_collection())
+    background.start_task('stripe-webhook-worker', stripe_webhooks.run_worker())
+    if event_bus.EVENT_BUS_BACKEND == 'changestream':
+        background.start_task('event-bus-change-streams', event_bus.run_change_stream_adapter())
+    stats_interval = int(os.environ.get('STATS_RECONCILE_INTERVAL_SECONDS', '3600'))
+    background.run_periodic('stats-reconcile', reconcile_stats, stats_interval, single_worker=True)
+    background.run_periodic('message-counters-reconcile', reconcile_message_counters, stats_interval,
+                            single_worker=True)
+    background.run_periodic('reward-expiry-sweep', sweeper.expire_reward_codes, sweeper.SWEEP_INTERVAL_SECONDS, initial_delay=30)
+    background.start_task('campaign-lifecycle', campaign_lifecycle.scheduler.run())
+    background.run_periodic('token-revocations-refresh', load_revocations, REVOCATION_REFRESH_SECONDS)
+
     logger.info("Startup complete.")
 
 
@@ -272,64 +350,31 @@ async def health():
 
 
 @app.get("/api/translations/{lang}")
-async def get_translations(lang: str):
-    from i18n import TRANSLATIONS
-    if lang not in TRANSLATIONS:
-        lang = 'en'
-    return TRANSLATIONS[lang]
+async def get_translations(lang: str, request: Request, ns: str = None):
+    """Precompressed translation bundle; ``ns=game,common`` limits it to those namespaces."""
+    return translations_response(request, lang, ns)
 
 
 # Stripe webhook endpoint (must be at app level, not router)
 @app.post("/api/webhook/stripe")  # ✅ Fixed: was @api.post (NameError)
 async def stripe_webhook(request: Request):
-    stripe_key = os.environ.get("STRIPE_API_KEY")
+    stripe_key = await get_stripe_secret_key()
     if not stripe_key:
         return {"status": "ok"}  # Stripe not configured, ignore
 
     try:
-        import stripe
-        stripe.api_key = stripe_key
-
         body = await request.body()
         sig_header = request.headers.get("Stripe-Signature")
-        webhook_secret = os.environ.get("STRIPE_WEBHOOK_SECRET")
+        webhook_secret = await get_stripe_webhook_secret()
 
         if not webhook_secret or not sig_header:
             return {"status": "ignored"}
 
-        event = stripe.Webhook.construct_event(
-            payload=body,
-            sig_header=sig_header,
-            secret=webhook_secret,
-        )
+        # Verify only; the event is applied by the webhook worker
+        stripe_gateway.construct_event(body, sig_header, webhook_secret)
+        queued = await stripe_webhooks.ingest_event(json.loads(body))
 
-        if event["type"] == "checkout.session.completed":
-            session = event["data"]["object"]
-            session_id = session.get("id")
-            metadata = session.get("metadata", {})
-
-            tenant_id = metadata.get("tenant_id")
-            plan = metadata.get("plan", "free")
-
-            if session_id:
-                await db.payment_transactions.update_one(
-                    {"session_id": session_id},
-                    {"$set": {
-                        "payment_status": "paid",
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }}
-                )
-
-            if tenant_id:
-                await db.tenants.update_one(
-                    {"id": tenant_id},
-                    {"$set": {
-                        "plan": plan,
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }}
-                )
-
-        return {"status": "success"}
+        return {"status": "success" if queued else "duplicate"}
 
     except Exception as e:
         logger.exception("Stripe webhook error")
@@ -347,7 +392,7 @@ async def record_cookie_consent(request: Request):
         'categories': body.get('categories', {}),
         'ip_address': request.client.host if request.client else 'unknown',
         'user_agent': request.headers.get('user-agent', ''),
-        'created_at': datetime.now(timezone.utc).isoformat()
+        'created_at': utcnow()
     }
     await db.consents.insert_one(consent)
     return {"status": "ok"}
@@ -355,4 +400,7 @@ async def record_cookie_consent(request: Request):
 
 @app.on_event("shutdown")
 async def shutdown():
+    await background.shutdown()
+    password_hasher.shutdown()
+    stripe_gateway.shutdown()
     client.close()
@@ -0,0 +1,243 @@
+"""
+Materialized tenant and campaign statistics.
+
+Counters live in the ``tenant_stats`` and ``campaign_stats`` collections and
+are maintained with atomic ``$inc`` upserts from the play, redeem and prize
+write paths, so dashboards read precomputed numbers instead of running
+``count_documents`` per campaign. ``reconcile_stats`` recomputes every
+counter from the source collections and repairs any drift; the periodic run
+is held by a single worker (see ``background.run_periodic``).
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+TENANT_FIELDS = ('plays', 'test_plays', 'players', 'rewards_issued', 'rewards_redeemed')
+CAMPAIGN_FIELDS = (
+    'plays', 'test_plays', 'players', 'prizes',
+    'rewards_issued', 'live_rewards_issued', 'rewards_redeemed'
+)
+
+
+def _empty(fields) -> dict:
+    return {f: 0 for f in fields}
+
+
+async def _increment(collection, key_field: str, key: str, counters: dict, tenant_id: str = None):
+    counters = {k: v for k, v in counters.items() if v}
+    if not key or not counters:
+        return
+    update = {
+        '$inc': counters,
+        '$set': {'updated_at': datetime.now(timezone.utc).isoformat()}
+    }
+    if tenant_id:
+        update['$setOnInsert'] = {'tenant_id': tenant_id}
+    await collection.update_one({key_field: key}, update, upsert=True)
+
+
+async def _increment_tenant(tenant_id: str, counters: dict):
+    await _increment(db.tenant_stats, 'tenant_id', tenant_id, counters)
+
+
+async def _increment_campaign(campaign_id: str, tenant_id: str, counters: dict):
+    await _increment(db.campaign_stats, 'campaign_id', campaign_id, counters, tenant_id=tenant_id)
+
+
+# ==================== WRITE PATHS ====================
+
+async def record_play(
+    tenant_id: str,
+    campaign_id: str,
+    is_test: bool,
+    new_player: bool,
+    reward_issued: bool
+):
+    """Account for one play (and the player/reward it may have created)."""
+    counters = {'test_plays' if is_test else 'plays': 1}
+    if new_player:
+        counters['players'] = 1
+    if reward_issued:
+        counters['rewards_issued'] = 1
+
+    campaign_counters = dict(counters)
+    if reward_issued and not is_test:
+        campaign_counters['live_rewards_issued'] = 1
+
+    await asyncio.gather(
+        _increment_tenant(tenant_id, counters),
+        _increment_campaign(campaign_id, tenant_id, campaign_counters)
+    )
+
+
+async def record_redeem(tenant_id: str, campaign_id: str, count: int = 1):
+    """Account for ``count`` reward codes switching to ``redeemed``."""
+    await asyncio.gather(
+        _increment_tenant(tenant_id, {'rewards_redeemed': count}),
+        _increment_campaign(campaign_id, tenant_id, {'rewards_redeemed': count})
+    )
+
+
+async def record_prize_change(campaign_id: str, tenant_id: str, delta: int):
+    """Account for prizes added (positive delta) or removed (negative delta)."""
+    await _increment_campaign(campaign_id, tenant_id, {'prizes': delta})
+
+
+async def drop_campaign(campaign_id: str):
+    """Forget the counters of a deleted campaign."""
+    await db.campaign_stats.delete_one({'campaign_id': campaign_id})
+
+
+# ==================== READ PATHS ====================
+
+async def get_tenant_stats(tenant_id: str) -> dict:
+    doc = await db.tenant_stats.find_one({'tenant_id': tenant_id}, {'_id': 0})
+    return {**_empty(TENANT_FIELDS), **(doc or {})}
+
+
+async def get_tenant_stats_many(tenant_ids: list) -> dict:
+    """Return ``{tenant_id: stats}`` for every requested tenant in one query."""
+    docs = await db.tenant_stats.find(
+        {'tenant_id': {'$in': list(tenant_ids)}}, {'_id': 0}
+    ).to_list(len(tenant_ids) or 1)
+    found = {d['tenant_id']: d for d in docs}
+    return {tid: {**_empty(TENANT_FIELDS), **found.get(tid, {})} for tid in tenant_ids}
+
+
+async def get_campaign_stats(campaign_ids: list) -> dict:
+    """Return ``{campaign_id: stats}`` for every requested campaign in one query."""
+    docs = await db.campaign_stats.find(
+        {'campaign_id': {'$in': list(campaign_ids)}}, {'_id': 0}
+    ).to_list(len(campaign_ids) or 1)
+    found = {d['campaign_id']: d for d in docs}
+    return {cid: {**_empty(CAMPAIGN_FIELDS), **found.get(cid, {})} for cid in campaign_ids}
+
+
+# ==================== RECONCILER ====================
+
+async def _expected_counters(tenant_id: Optional[str]):
+    """Recompute every counter from the source collections."""
+    match = {'tenant_id': tenant_id} if tenant_id else {}
+    campaigns = {}
+    tenants = {}
+
+    def campaign_entry(tid, cid):
+        entry = campaigns.setdefault(cid, {'tenant_id': tid, **_empty(CAMPAIGN_FIELDS)})
+        tenants.setdefault(tid, _empty(TENANT_FIELDS))
+        return entry
+
+    plays = await db.plays.aggregate([
+        {'$match': match},
+        {'$group': {
+            '_id': {'tenant_id': '$tenant_id', 'campaign_id': '$campaign_id'},
+            'plays': {'$sum': {'$cond': [{'$eq': ['$is_test', True]}, 0, 1]}},
+            'test_plays': {'$sum': {'$cond': [{'$eq': ['$is_test', True]}, 1, 0]}}
+        }}
+    ]).to_list(None)
+    for row in plays:
+        tid, cid = row['_id'].get('tenant_id'), row['_id'].get('campaign_id')
+        entry = campaign_entry(tid, cid)
+        for field in ('plays', 'test_plays'):
+            entry[field] = row[field]
+            tenants[tid][field] += row[field]
+
+    players = await db.players.aggregate([
+        {'$match': match},
+        {'$group': {
+            '_id': {'tenant_id': '$tenant_id', 'campaign_id': '$campaign_id'},
+            'players': {'$sum': 1}
+        }}
+    ]).to_list(None)
+    for row in players:
+        tid, cid = row['_id'].get('tenant_id'), row['_id'].get('campaign_id')
+        campaign_entry(tid, cid)['players'] = row['players']
+        tenants[tid]['players'] += row['players']
+
+    codes = await db.reward_codes.aggregate([
+        {'$match': match},
+        {'$group': {
+            '_id': {'tenant_id': '$tenant_id', 'campaign_id': '$campaign_id'},
+            'rewards_issued': {'$sum': 1},
+            'live_rewards_issued': {'$sum': {'$cond': [{'$eq': ['$is_test', True]}, 0, 1]}},
+            'rewards_redeemed': {'$sum': {'$cond': [{'$eq': ['$status', 'redeemed']}, 1, 0]}}
+        }}
+    ]).to_list(None)
+    for row in codes:
+        tid, cid = row['_id'].get('tenant_id'), row['_id'].get('campaign_id')
+        entry = campaign_entry(tid, cid)
+        for field in ('rewards_issued', 'live_rewards_issued', 'rewards_redeemed'):
+            entry[field] = row[field]
+        tenants[tid]['rewards_issued'] += row['rewards_issued']
+        tenants[tid]['rewards_redeemed'] += row['rewards_redeemed']
+
+    prizes = await db.campaigns.aggregate([
+        {'$match': match},
+        {'$project': {'_id': 0, 'tenant_id': 1, 'id': 1, 'prizes': {'$size': {'$ifNull': ['$prizes', []]}}}},
+        {'$match': {'prizes': {'$gt': 0}}}
+    ]).to_list(None)
+    for row in prizes:
+        campaign_entry(row.get('tenant_id'), row['id'])['prizes'] = row['prizes']
+
+    campaigns.pop(None, None)
+    tenants.pop(None, None)
+    return tenants, campaigns
+
+
+def _drift(expected: dict, current: dict, fields) -> dict:
+    return {f: expected[f] - current.get(f, 0) for f in fields if current.get(f, 0) != expected[f]}
+
+
+async def reconcile_stats(tenant_id: Optional[str] = None) -> dict:
+    """Verify the materialized counters against the source collections.
+
+    Drift is repaired with ``$inc`` of the difference, never a blind
+    ``$set``, so increments landing while the reconciler runs are kept.
+    Stats documents with no remaining source rows are brought to zero.
+    """
+    tenants, campaigns = await _expected_counters(tenant_id)
+    match = {'tenant_id': tenant_id} if tenant_id else {}
+    now = datetime.now(timezone.utc).isoformat()
+    report = {'tenants_checked': 0, 'campaigns_checked': 0, 'tenants_corrected': 0, 'campaigns_corrected': 0}
+
+    current_tenants = {
+        d['tenant_id']: d
+        for d in await db.tenant_stats.find(match, {'_id': 0}).to_list(None)
+    }
+    for tid in set(tenants) | set(current_tenants):
+        report['tenants_checked'] += 1
+        expected = tenants.get(tid, _empty(TENANT_FIELDS))
+        current = current_tenants.get(tid, {})
+        delta = _drift(expected, current, TENANT_FIELDS)
+        if delta:
+            report['tenants_corrected'] += 1
+            await db.tenant_stats.update_one(
+                {'tenant_id': tid},
+                {'$inc': delta, '$set': {'updated_at': now, 'reconciled_at': now}},
+                upsert=True
+            )
+
+    current_campaigns = {
+        d['campaign_id']: d
+        for d in await db.campaign_stats.find(match, {'_id': 0}).to_list(None)
+    }
+    for cid in set(campaigns) | set(current_campaigns):
+        report['campaigns_checked'] += 1
+        expected = campaigns.get(cid, {'tenant_id': current_campaigns[cid].get('tenant_id'), **_empty(CAMPAIGN_FIELDS)})
+        current = current_campaigns.get(cid, {})
+        delta = _drift(expected, current, CAMPAIGN_FIELDS)
+        if delta:
+            report['campaigns_corrected'] += 1
+            await db.campaign_stats.update_one(
+                {'campaign_id': cid},
+                {'$inc': delta, '$set': {'tenant_id': expected['tenant_id'], 'updated_at': now, 'reconciled_at': now}},
+                upsert=True
+            )
+
+    if report['tenants_corrected'] or report['campaigns_corrected']:
+        logger.warning(f"Stats reconciler corrected drift: {report}")
+    return report
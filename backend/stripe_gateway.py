@@ -0,0 +1,81 @@
+"""
+Asynchronous Stripe gateway.
+
+The Stripe SDK is synchronous, so calls run in a small dedicated thread
+pool instead of blocking the event loop. Each gateway owns a
+``StripeClient`` with its own API key (no global ``stripe.api_key``), a
+pooled HTTP client, request timeouts and the SDK's retry with exponential
+backoff; retried POSTs reuse an idempotency key so they are safe.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+
+import stripe
+from fastapi import HTTPException
+
+from secrets_manager import get_stripe_secret_key
+
+STRIPE_TIMEOUT_SECONDS = float(os.environ.get('STRIPE_TIMEOUT_SECONDS', '20'))
+STRIPE_MAX_RETRIES = int(os.environ.get('STRIPE_MAX_RETRIES', '2'))
+STRIPE_WORKERS = int(os.environ.get('STRIPE_WORKERS', '8'))
+
+_executor = ThreadPoolExecutor(max_workers=STRIPE_WORKERS, thread_name_prefix='stripe')
+
+
+class StripeGateway:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: float = STRIPE_TIMEOUT_SECONDS,
+        max_retries: int = STRIPE_MAX_RETRIES
+    ):
+        self.api_key = api_key
+        self._client = stripe.StripeClient(
+            api_key,
+            base_addresses={'api': base_url} if base_url else {},
+            http_client=stripe.RequestsClient(timeout=timeout),
+            max_network_retries=max_retries
+        )
+
+    async def _call(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+    async def create_checkout_session(self, params: dict, idempotency_key: Optional[str] = None):
+        options = {'idempotency_key': idempotency_key} if idempotency_key else {}
+        return await self._call(self._client.checkout.sessions.create, params=params, options=options)
+
+    async def retrieve_checkout_session(self, session_id: str):
+        return await self._call(self._client.checkout.sessions.retrieve, session_id)
+
+
+def construct_event(payload: bytes, sig_header: str, secret: str):
+    """Verify a webhook signature and parse the event (no network I/O)."""
+    return stripe.Webhook.construct_event(payload=payload, sig_header=sig_header, secret=secret)
+
+
+_gateways = {}
+
+
+async def get_gateway() -> StripeGateway:
+    """Return the gateway for the currently configured API key.
+
+    Gateways are reused so their HTTP connections stay pooled; a key change
+    in the platform settings yields a fresh gateway on the next call.
+    """
+    api_key = await get_stripe_secret_key()
+    if not api_key:
+        raise HTTPException(500, "Stripe not configured (missing STRIPE_API_KEY)")
+    gateway = _gateways.get(api_key)
+    if gateway is None:
+        _gateways.clear()
+        gateway = _gateways[api_key] = StripeGateway(api_key, base_url=os.environ.get('STRIPE_API_BASE'))
+    return gateway
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
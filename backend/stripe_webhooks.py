@@ -0,0 +1,243 @@
+"""
+Stripe webhook ingestion pipeline.
+
+Verified events are stored in ``stripe_events`` keyed by the Stripe event id
+and acknowledged immediately; Stripe retries of the same event hit the
+unique index and are dropped. A background worker applies stored events in
+``created`` order with at most one event in flight per tenant, retrying
+failures with backoff.
+
+Handlers only ``$set`` final state, and the checkout handler leaves a
+tenant's plan alone when the plan was changed after the event was created
+(``tenants.plan_changed_at``, stamped by every plan change). Replaying an old
+checkout therefore re-marks its payment but never undoes a later upgrade,
+downgrade or cancellation. Replays must be narrowed by event ids, tenant or
+date.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from auth import invalidate_tenant
+from database import db
+from timeutils import utcnow
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_LEASE_SECONDS = int(os.environ.get('STRIPE_WEBHOOK_LEASE_SECONDS', '60'))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('STRIPE_WEBHOOK_MAX_ATTEMPTS', '8'))
+WEBHOOK_POLL_SECONDS = float(os.environ.get('STRIPE_WEBHOOK_POLL_SECONDS', '5'))
+CLAIM_BATCH_SIZE = 100
+
+UNFINISHED = ['pending', 'processing']
+
+_wakeup = asyncio.Event()
+
+
+# ==================== HANDLERS ====================
+
+async def _handle_checkout_completed(event: dict):
+    session = event['data']['object']
+    session_id = session.get('id')
+    metadata = session.get('metadata') or {}
+    tenant_id = metadata.get('tenant_id')
+    plan = metadata.get('plan', 'free')
+
+    if session_id:
+        await db.payment_transactions.update_one(
+            {'session_id': session_id},
+            {'$set': {
+                'payment_status': 'paid',
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }}
+        )
+
+    if tenant_id:
+        created = datetime.fromtimestamp(event.get('created') or utcnow().timestamp(), timezone.utc)
+        result = await db.tenants.update_one(
+            {'id': tenant_id, 'plan_changed_at': {'$not': {'$gt': created}}},
+            {'$set': {
+                'plan': plan,
+                'plan_changed_at': created,
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }}
+        )
+        if result.matched_count:
+            invalidate_tenant(tenant_id)
+        else:
+            logger.info(f"Stripe event {event.get('id')} predates the last plan change of tenant {tenant_id}; plan kept")
+
+
+HANDLERS = {
+    'checkout.session.completed': _handle_checkout_completed,
+}
+
+
+# ==================== INGESTION ====================
+
+def _event_tenant(event: dict) -> Optional[str]:
+    obj = (event.get('data') or {}).get('object') or {}
+    return (obj.get('metadata') or {}).get('tenant_id')
+
+
+async def ingest_event(event: dict) -> bool:
+    """Persist a verified event; returns False if it was already received."""
+    now = utcnow()
+    try:
+        await db.stripe_events.insert_one({
+            'id': event['id'],
+            'type': event.get('type'),
+            'tenant_id': _event_tenant(event),
+            'created': datetime.fromtimestamp(event.get('created') or now.timestamp(), timezone.utc),
+            'payload': event,
+            'status': 'pending',
+            'attempts': 0,
+            'next_attempt_at': now,
+            'received_at': now
+        })
+    except DuplicateKeyError:
+        return False
+    _wakeup.set()
+    return True
+
+
+# ==================== WORKER ====================
+
+def _runnable(now: datetime) -> dict:
+    """Pending events due for an attempt, and processing events whose worker lost its lease."""
+    return {'$or': [
+        {'status': 'pending', 'next_attempt_at': {'$lte': now}},
+        {'status': 'processing', 'lease_until': {'$lte': now}},
+    ]}
+
+
+async def _lane_blocked(ev: dict) -> bool:
+    """Whether an earlier event of the same tenant is still unfinished."""
+    if not ev.get('tenant_id'):
+        return False
+    earlier = await db.stripe_events.find_one({
+        'tenant_id': ev['tenant_id'],
+        'status': {'$in': UNFINISHED},
+        '$or': [
+            {'created': {'$lt': ev['created']}},
+            {'created': ev['created'], 'received_at': {'$lt': ev['received_at']}},
+        ]
+    }, {'_id': 1})
+    return earlier is not None
+
+
+async def _claim_next() -> Optional[dict]:
+    """Claim the oldest runnable event whose tenant has no earlier unfinished event.
+
+    Only runnable events are scanned, in batches, so lanes waiting on a
+    backoff or a live lease never hide runnable events queued behind them.
+    """
+    now = utcnow()
+    cursor = db.stripe_events.find(
+        _runnable(now), {'_id': 0, 'payload': 0}
+    ).sort([('created', 1), ('received_at', 1)]).batch_size(CLAIM_BATCH_SIZE)
+
+    seen = set()
+    try:
+        async for ev in cursor:
+            lane = ev.get('tenant_id') or ev['id']
+            if lane in seen:
+                continue
+            seen.add(lane)
+            if await _lane_blocked(ev):
+                continue
+            claimed = await db.stripe_events.find_one_and_update(
+                {'id': ev['id'], 'status': ev['status'], 'attempts': ev['attempts']},
+                {'$set': {'status': 'processing', 'lease_until': now + timedelta(seconds=WEBHOOK_LEASE_SECONDS)},
+                 '$inc': {'attempts': 1}},
+                projection={'_id': 0},
+                return_document=ReturnDocument.AFTER
+            )
+            if claimed:
+                return claimed
+    finally:
+        await cursor.close()
+    return None
+
+
+async def _apply(ev: dict):
+    handler = HANDLERS.get(ev['type'])
+    try:
+        if handler:
+            await handler(ev['payload'])
+    except Exception as e:
+        logger.exception(f"Stripe event {ev['id']} failed (attempt {ev['attempts']})")
+        failed = ev['attempts'] >= WEBHOOK_MAX_ATTEMPTS
+        await db.stripe_events.update_one({'id': ev['id']}, {'$set': {
+            'status': 'failed' if failed else 'pending',
+            'last_error': str(e),
+            'next_attempt_at': utcnow() + timedelta(seconds=min(2 ** ev['attempts'], 600))
+        }})
+        return
+    await db.stripe_events.update_one({'id': ev['id']}, {'$set': {
+        'status': 'processed' if handler else 'ignored',
+        'processed_at': utcnow(),
+        'last_error': None
+    }})
+
+
+async def process_pending() -> int:
+    """Apply every currently runnable event; returns how many were handled."""
+    handled = 0
+    while True:
+        ev = await _claim_next()
+        if not ev:
+            return handled
+        await _apply(ev)
+        handled += 1
+
+
+async def run_worker():
+    """Background loop: drain the queue, then sleep until woken or polled."""
+    while True:
+        try:
+            await process_pending()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Stripe webhook worker failed")
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), WEBHOOK_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ==================== REPLAY ====================
+
+async def replay_events(
+    event_ids: Optional[list] = None,
+    tenant_id: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> int:
+    """Queue finished events matching every given filter again.
+
+    At least one filter is required; requeueing the whole history is never
+    what reconciliation needs.
+    """
+    if not (event_ids or tenant_id or since):
+        raise ValueError('replay_events needs event_ids, tenant_id or since')
+    query = {'status': {'$in': ['processed', 'ignored', 'failed']}}
+    if event_ids:
+        query['id'] = {'$in': event_ids}
+    if tenant_id:
+        query['tenant_id'] = tenant_id
+    if since:
+        query['created'] = {'$gte': since}
+    result = await db.stripe_events.update_many(query, {
+        '$set': {'status': 'pending', 'attempts': 0, 'next_attempt_at': utcnow(), 'replayed_at': utcnow()},
+        '$unset': {'lease_until': ''}
+    })
+    if result.modified_count:
+        _wakeup.set()
+    return result.modified_count
@@ -0,0 +1,50 @@
+"""
+Scheduled sweeps over time-bound documents.
+
+Reward codes used to be marked ``expired`` only when staff tried to redeem
+them, so status filters, redemption counts and analytics kept treating
+lapsed codes as active. ``expire_reward_codes`` flips them in batches using
+the ``(status, expires_at)`` index. Campaign start/end transitions are
+handled by ``campaign_lifecycle``.
+"""
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from database import db
+from timeutils import utcnow, time_clauses
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL_SECONDS = int(os.environ.get('SWEEP_INTERVAL_SECONDS', '300'))
+SWEEP_BATCH_SIZE = int(os.environ.get('SWEEP_BATCH_SIZE', '1000'))
+
+
+# ==================== REWARD CODES ====================
+
+async def expire_reward_codes(now: Optional[datetime] = None) -> int:
+    """Mark every active code past its ``expires_at`` as expired; returns the count."""
+    now = now or utcnow()
+    started = time.perf_counter()
+    query = {'status': 'active', '$or': time_clauses('reward_codes', 'expires_at', lte=now)}
+    expired = 0
+    while True:
+        batch = await db.reward_codes.find(query, {'_id': 1}).limit(SWEEP_BATCH_SIZE).to_list(SWEEP_BATCH_SIZE)
+        if not batch:
+            break
+        result = await db.reward_codes.update_many(
+            {**query, '_id': {'$in': [d['_id'] for d in batch]}},
+            {'$set': {'status': 'expired'}}
+        )
+        expired += result.modified_count
+        if len(batch) < SWEEP_BATCH_SIZE:
+            break
+
+    metrics.increment('reward_codes_expired', expired)
+    metrics.observe('reward_expiry_sweep_ms', (time.perf_counter() - started) * 1000)
+    if expired:
+        logger.info(f"Expired {expired} reward codes")
+    return expired
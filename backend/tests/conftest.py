@@ -0,0 +1,102 @@
+"""
+Shared fixtures for offline tests.
+
+``fake_stripe`` serves a minimal Stripe API (checkout sessions) on a local
+port so billing code can be exercised without network access.
+"""
+
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+
+class FakeStripeState:
+    def __init__(self):
+        self.sessions = {}
+        self.requests = []
+        self.fail_next = 0
+        self.delay = 0.0
+
+
+def _make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _fail_if_scheduled(self):
+            if state.delay:
+                threading.Event().wait(state.delay)
+            if state.fail_next:
+                state.fail_next -= 1
+                self._send(500, {"error": {"type": "api_error", "message": "fake outage"}},
+                           {"Stripe-Should-Retry": "true"})
+                return True
+            return False
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode())
+            state.requests.append(("POST", self.path, self.headers.get("Authorization"),
+                                   self.headers.get("Idempotency-Key")))
+            if self._fail_if_scheduled():
+                return
+            if self.path != "/v1/checkout/sessions":
+                self._send(404, {"error": {"type": "invalid_request_error", "message": "not found"}})
+                return
+            session_id = f"cs_test_{uuid.uuid4().hex}"
+            session = {
+                "id": session_id,
+                "object": "checkout.session",
+                "url": f"https://checkout.stripe.test/{session_id}",
+                "status": "open",
+                "payment_status": "unpaid",
+                "amount_total": int(form.get("line_items[0][price_data][unit_amount]", ["0"])[0]),
+                "currency": form.get("line_items[0][price_data][currency]", ["usd"])[0],
+                "metadata": {
+                    key[len("metadata["):-1]: values[0]
+                    for key, values in form.items() if key.startswith("metadata[")
+                },
+            }
+            state.sessions[session_id] = session
+            self._send(200, session)
+
+        def do_GET(self):
+            state.requests.append(("GET", self.path, self.headers.get("Authorization"), None))
+            if self._fail_if_scheduled():
+                return
+            prefix = "/v1/checkout/sessions/"
+            session = state.sessions.get(self.path[len(prefix):]) if self.path.startswith(prefix) else None
+            if not session:
+                self._send(404, {"error": {"type": "invalid_request_error", "message": "No such session"}})
+                return
+            self._send(200, session)
+
+    return Handler
+
+
+@pytest.fixture
+def fake_stripe():
+    """Run a fake Stripe API; yields ``(base_url, state)``."""
+    state = FakeStripeState()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", state
+    finally:
+        server.shutdown()
+        server.server_close()
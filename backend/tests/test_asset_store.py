@@ -0,0 +1,44 @@
+"""
+Test uploaded image handling:
+- The image type is detected from the bytes, not from what the client claims
+- SVG and other non-raster payloads are refused
+"""
+
+import io
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+from PIL import Image
+
+from asset_store import _render_variants, DISPLAY_SIZES
+
+
+def png_bytes(size=(600, 300)):
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, (255, 0, 0, 128)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestRenderVariants:
+    """Test decoding and re-encoding of uploads"""
+
+    def test_png_variants(self):
+        content_type, variants = _render_variants(png_bytes())
+        assert content_type == "image/png"
+        assert set(variants) == set(DISPLAY_SIZES)
+        body, variant_type, ext, width, height = variants["md"]
+        assert (variant_type, ext, width) == ("image/png", "png", 256)
+
+    @pytest.mark.parametrize("payload", [
+        b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>',
+        b"<html><script>alert(1)</script></html>",
+    ])
+    def test_script_payloads_refused(self, payload):
+        with pytest.raises(HTTPException) as exc:
+            _render_variants(payload)
+        assert exc.value.status_code == 400
@@ -0,0 +1,117 @@
+"""
+Test campaign lifecycle scheduler:
+- Test campaigns go live once their start has passed, if put in test before it
+- Campaigns failing the publish checks are not started
+- Running campaigns end once their end has passed
+- Date-only end bounds cover the whole day
+- Draft campaigns are never started automatically
+- The heap orders upcoming transitions by due time
+- A failing iteration drops leadership and the loop keeps running
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("motor")
+
+import campaign_lifecycle
+from game_engine import publish_errors
+from campaign_lifecycle import LifecycleScheduler, campaign_window, next_transition, scheduled_status
+
+NOW = datetime(2026, 6, 15, 12, 0, tzinfo=timezone.utc)
+
+
+class TestCampaignSchedule:
+    """Test schedule transitions"""
+
+    def test_test_campaign_starts(self):
+        campaign = {"status": "test", "starts_at": "2026-06-15T11:00:00Z", "ends_at": "2026-07-01T00:00:00Z",
+                    "test_since": "2026-06-10T09:00:00+00:00"}
+        assert scheduled_status(campaign, NOW) == "active"
+
+    def test_test_mode_after_start_stays_test(self):
+        campaign = {"status": "test", "starts_at": "2026-06-01T00:00:00Z", "test_since": "2026-06-15T11:59:00+00:00"}
+        assert scheduled_status(campaign, NOW) is None
+        assert scheduled_status({"status": "test", "starts_at": "2026-06-01T00:00:00Z"}, NOW) is None
+
+    def test_not_started_yet(self):
+        campaign = {"status": "test", "start_date": "2026-06-16", "test_since": "2026-06-10T00:00:00+00:00"}
+        assert scheduled_status(campaign, NOW) is None
+
+    def test_running_campaign_ends(self):
+        for status in ("active", "paused", "test"):
+            assert scheduled_status({"status": status, "ends_at": "2026-06-15T11:59:00+00:00"}, NOW) == "ended"
+
+    def test_date_only_end_covers_day(self):
+        campaign = {"status": "active", "end_date": "2026-06-15"}
+        assert campaign_window(campaign)[1] == datetime(2026, 6, 16, tzinfo=timezone.utc)
+        assert scheduled_status(campaign, NOW) is None
+
+    def test_draft_untouched(self):
+        assert scheduled_status({"status": "draft", "start_date": "2026-01-01"}, NOW) is None
+        assert scheduled_status({"status": "ended", "end_date": "2026-01-01"}, NOW) is None
+
+
+class TestTransitionHeap:
+    """Test transition ordering"""
+
+    def test_next_transition(self):
+        tested = {"test_since": "2026-06-10T00:00:00+00:00"}
+        assert next_transition({"status": "test", "start_date": "2026-06-20", "end_date": "2026-06-30", **tested},
+                               NOW) == datetime(2026, 6, 20, tzinfo=timezone.utc)
+        assert next_transition({"status": "active", "ends_at": "2026-06-30T00:00:00Z"}, NOW) == \
+            datetime(2026, 6, 30, tzinfo=timezone.utc)
+        assert next_transition({"status": "test", "starts_at": "2026-06-12T00:00:00Z", **tested}, NOW) == NOW
+        assert next_transition({"status": "test", "start_date": "2026-06-20", "end_date": "2026-06-30"}, NOW) == \
+            datetime(2026, 7, 1, tzinfo=timezone.utc)
+        assert next_transition({"status": "active"}, NOW) is None
+        assert next_transition({"status": "draft", "start_date": "2026-06-20"}, NOW) is None
+
+    def test_heap_orders_by_due_time(self):
+        scheduler = LifecycleScheduler()
+        scheduler.push({"id": "late", "status": "active", "end_date": "2026-08-01"}, NOW)
+        scheduler.push({"id": "soon", "status": "test", "start_date": "2026-06-16",
+                        "test_since": "2026-06-10T00:00:00+00:00"}, NOW)
+        scheduler.push({"id": "never", "status": "active"}, NOW)
+        assert scheduler.next_due() == datetime(2026, 6, 16, tzinfo=timezone.utc)
+        assert [entry[1] for entry in sorted(scheduler._heap)] == ["soon", "late"]
+
+
+class TestPublishChecks:
+    """Test the checks run before a campaign goes live"""
+
+    def test_builder_campaign(self):
+        campaign = {"created_by_admin": True, "terms_text": "T&C", "prizes": [{"stock_remaining": 0}]}
+        assert publish_errors(campaign) == ["No stock available"]
+        assert publish_errors({"created_by_admin": True}) == ["No prizes configured"]
+
+    def test_tenant_campaign(self):
+        campaign = {"start_date": "2026-06-01", "end_date": "2026-06-30", "prizes": [{"stock_remaining": 3}]}
+        assert publish_errors(campaign) == ["Legal text is required"]
+        assert publish_errors({**campaign, "legal_text": "Rules"}) == []
+
+
+class TestSchedulerLoop:
+    """Test resilience of the leader loop"""
+
+    def test_errors_do_not_stop_loop(self, monkeypatch):
+        attempts = []
+
+        async def flaky_lease():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("server selection timeout")
+            if len(attempts) == 3:
+                raise asyncio.CancelledError
+            return False
+
+        monkeypatch.setattr(campaign_lifecycle, "acquire_lease", flaky_lease)
+        monkeypatch.setattr(campaign_lifecycle, "LEASE_TTL_SECONDS", 0.03)
+        scheduler = LifecycleScheduler()
+        scheduler.is_leader = True
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(scheduler.run())
+        assert len(attempts) == 3
+        assert scheduler.is_leader is False
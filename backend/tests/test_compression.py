@@ -0,0 +1,96 @@
+"""
+Test response compression middleware:
+- Large JSON is gzipped, small bodies and unaccepted encodings pass through
+- Streaming responses are compressed chunk by chunk without buffering
+- Already-encoded (precompressed) responses are untouched
+- CPU time is recorded in metrics
+"""
+
+import asyncio
+import gzip
+import json
+import zlib
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+import compression
+import metrics
+from compression import CompressionMiddleware
+
+
+def make_app(content_type, chunks, extra_headers=()):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type.encode()), *extra_headers],
+        })
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def call(app, accept_encoding="gzip", minimum_size=1024):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=minimum_size)(scope, receive, send))
+    headers = dict(messages[0]["headers"])
+    return headers, messages[1:]
+
+
+@pytest.fixture(autouse=True)
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    metrics.reset()
+
+
+class TestCompressionMiddleware:
+    """Test negotiation and thresholds"""
+
+    def test_large_json_gzipped(self):
+        body = json.dumps([{"email": f"p{i}@example.com"} for i in range(500)]).encode()
+        headers, bodies = call(make_app("application/json", [body]))
+        assert headers[b"content-encoding"] == b"gzip"
+        assert int(headers[b"content-length"]) == len(bodies[0]["body"]) < len(body)
+        assert gzip.decompress(bodies[0]["body"]) == body
+        assert metrics.snapshot()["timings"]["compression_cpu_ms{encoding=gzip}"]["count"] == 1
+
+    def test_small_body_untouched(self):
+        headers, bodies = call(make_app("application/json", [b'{"ok":true}']))
+        assert b"content-encoding" not in headers
+        assert bodies[0]["body"] == b'{"ok":true}'
+
+    def test_no_accept_encoding(self):
+        body = b"x" * 5000
+        headers, bodies = call(make_app("application/json", [body]), accept_encoding="identity")
+        assert b"content-encoding" not in headers
+        assert bodies[0]["body"] == body
+
+    def test_streaming_csv_not_buffered(self):
+        chunks = [b"email,phone\n"] + [f"p{i}@example.com,0600000000\n".encode() * 50 for i in range(5)]
+        headers, bodies = call(make_app("text/csv", chunks))
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+        assert len(bodies) == len(chunks)
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Every flushed chunk is decodable as soon as it arrives
+        for sent, original in zip(bodies, chunks):
+            assert decoder.decompress(sent["body"]) == original
+
+    def test_precompressed_passthrough(self):
+        payload = gzip.compress(b"x" * 5000)
+        headers, bodies = call(make_app("application/json", [payload], [(b"content-encoding", b"gzip")]))
+        assert bodies[0]["body"] == payload
+
+    def test_binary_types_untouched(self):
+        headers, bodies = call(make_app("image/png", [b"\x89PNG" * 2000]))
+        assert b"content-encoding" not in headers
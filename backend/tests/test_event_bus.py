@@ -0,0 +1,64 @@
+"""
+Test live activity event bus (in-memory backend):
+- Tenant subscribers only receive their own tenant's events
+- Admin subscribers receive every tenant's events
+- Wins and plays are distinguished; redemptions carry the code
+- Slow subscribers drop their oldest event instead of blocking
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+
+import event_bus
+
+
+@pytest.fixture(autouse=True)
+def memory_backend(monkeypatch):
+    monkeypatch.setattr(event_bus, "EVENT_BUS_BACKEND", "memory")
+    event_bus._subscribers.clear()
+    yield
+    event_bus._subscribers.clear()
+
+
+def play(tenant_id, prize_id=None):
+    return {"play_id": "p1", "tenant_id": tenant_id, "campaign_id": "c1", "email": "a@b.c",
+            "prize_id": prize_id, "prize_label": "Coffee" if prize_id else None}
+
+
+class TestEventBus:
+    """Test channel fan-out"""
+
+    def test_tenant_isolation_and_admin_fanout(self):
+        async def scenario():
+            async with event_bus.subscribe([event_bus.tenant_channel("t1")]) as t1, \
+                    event_bus.subscribe([event_bus.tenant_channel("t2")]) as t2, \
+                    event_bus.subscribe([event_bus.ADMIN_CHANNEL]) as admin:
+                event_bus.publish_play(play("t1", prize_id="prize"))
+                event_bus.publish_redemption({"tenant_id": "t1", "code": "ABC123", "campaign_id": "c1"})
+                return [t1.get_nowait()["type"], t1.get_nowait()["type"]], t2.qsize(), admin.qsize()
+
+        t1_types, t2_size, admin_size = asyncio.run(scenario())
+        assert t1_types == ["win", "redemption"]
+        assert t2_size == 0
+        assert admin_size == 2
+        assert event_bus.subscriber_count() == 0
+
+    def test_slow_subscriber_drops_oldest(self, monkeypatch):
+        monkeypatch.setattr(event_bus, "SUBSCRIBER_QUEUE_SIZE", 2)
+
+        async def scenario():
+            async with event_bus.subscribe([event_bus.tenant_channel("t1")]) as queue:
+                for i in range(3):
+                    p = play("t1")
+                    p["play_id"] = f"p{i}"
+                    event_bus.publish_play(p)
+                return [queue.get_nowait()["data"]["id"] for _ in range(queue.qsize())]
+
+        assert asyncio.run(scenario()) == ["p1", "p2"]
+
+    def test_no_subscribers_is_noop(self):
+        event_bus.publish_play(play("t1"))
+        assert event_bus.subscriber_count() == 0
@@ -0,0 +1,112 @@
+"""
+Test fast JSON response class:
+- Datetimes, ObjectIds and non-string keys serialize natively
+- Output matches FastAPI's jsonable_encoder + json.dumps
+- Serialization benchmark over representative dashboard payloads
+"""
+
+import base64
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from json_response import FastJSONResponse, orjson
+
+BENCH_ROUNDS = 20
+
+
+def players_payload(count=500):
+    now = datetime.now(timezone.utc)
+    return {
+        "players": [{
+            "id": str(uuid.uuid4()),
+            "email": f"player{i}@example.com",
+            "phone": "+33612345678",
+            "first_name": "Jean",
+            "campaign_id": str(uuid.uuid4()),
+            "campaign_title": "Summer wheel",
+            "played_at": now - timedelta(minutes=i),
+            "won": i % 3 == 0,
+            "prize_label": "10% off" if i % 3 == 0 else None,
+            "marketing_consent": i % 2 == 0,
+        } for i in range(count)],
+        "total": 125000,
+        "pages": 2500,
+        "page": 1,
+        "next_cursor": "abc",
+        "stats": {"total": 125000, "with_email": 120000, "with_phone": 80000, "marketing_consent": 60000},
+    }
+
+
+def analytics_payload():
+    return {
+        "total_plays": 125000,
+        "conversion_rate": 0.3333,
+        "plays_over_time": [{"date": f"2026-01-{d:02d}", "plays": d * 10, "wins": d} for d in range(1, 31)],
+        "hourly_distribution": [{"hour": h, "count": h * 7} for h in range(24)],
+        "recent_activity": [{"email": "a@b.c", "played_at": datetime.now(timezone.utc), "won": True}] * 10,
+    }
+
+
+def tenant_detail_payload():
+    logo = "data:image/png;base64," + base64.b64encode(os.urandom(150_000)).decode()
+    return {
+        "tenant": {"id": str(uuid.uuid4()), "name": "Boulangerie", "logo_url": logo,
+                   "created_at": datetime.now(timezone.utc).isoformat()},
+        "campaigns": [{"id": str(uuid.uuid4()), "title": f"Campaign {i}", "plays": i * 100} for i in range(50)],
+        "stats": {"plays": 125000, "players": 40000},
+    }
+
+
+PAYLOADS = {
+    "get_players": players_payload,
+    "get_analytics": analytics_payload,
+    "get_tenant_detail": tenant_detail_payload,
+}
+
+
+def baseline_render(content):
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class TestFastJSONResponse:
+    """Test serialization compatibility"""
+
+    def test_native_types(self):
+        oid = ObjectId()
+        moment = datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc)
+        body = FastJSONResponse({"_id": oid, "at": moment, 1: "one"}).body
+        assert json.loads(body) == {"_id": str(oid), "at": "2026-01-02T03:04:05.123456+00:00", "1": "one"}
+
+    @pytest.mark.parametrize("name", sorted(PAYLOADS))
+    def test_matches_default_encoder(self, name):
+        content = PAYLOADS[name]()
+        assert json.loads(FastJSONResponse(content).body) == json.loads(baseline_render(content))
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson not installed")
+class TestSerializationBenchmark:
+    """Compare with jsonable_encoder + json.dumps"""
+
+    @pytest.mark.parametrize("name", sorted(PAYLOADS))
+    def test_faster_than_default(self, name):
+        content = PAYLOADS[name]()
+
+        def bench(render):
+            started = time.perf_counter()
+            for _ in range(BENCH_ROUNDS):
+                render(content)
+            return (time.perf_counter() - started) / BENCH_ROUNDS * 1000
+
+        baseline_ms = bench(baseline_render)
+        fast_ms = bench(lambda c: FastJSONResponse(c).body)
+        assert fast_ms < baseline_ms, f"{name}: default {baseline_ms:.2f}ms, fast {fast_ms:.2f}ms"
@@ -0,0 +1,68 @@
+"""
+Test login brute-force throttle (in-memory backend):
+- Per-email bucket rejects after its capacity with a Retry-After
+- Buckets drain over time
+- Successful login clears the email bucket
+- Rejections are counted in metrics
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+
+from fastapi import HTTPException
+
+import login_throttle
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def memory_backend(monkeypatch):
+    monkeypatch.setattr(login_throttle, "THROTTLE_BACKEND", "memory")
+    monkeypatch.setattr(login_throttle, "BUCKETS", {"email": (3, 1.0), "ip": (100, 1.0)})
+    login_throttle._buckets.clear()
+    metrics.reset()
+    yield
+    login_throttle._buckets.clear()
+
+
+def attempt(email="victim@example.com", ip="10.0.0.1"):
+    asyncio.run(login_throttle.check_login_attempt(email, ip))
+
+
+class TestLoginThrottle:
+    """Test leaky bucket behaviour"""
+
+    def test_rejects_after_capacity(self):
+        for _ in range(3):
+            attempt()
+        with pytest.raises(HTTPException) as exc:
+            attempt()
+        assert exc.value.status_code == 429
+        assert int(exc.value.headers["Retry-After"]) >= 1
+        assert metrics.snapshot()["counters"]["login_throttle_rejected{scope=email}"] == 1
+
+    def test_other_email_unaffected(self):
+        for _ in range(3):
+            attempt()
+        attempt(email="someone-else@example.com")
+
+    def test_bucket_drains(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(login_throttle.time, "monotonic", lambda: clock[0])
+        for _ in range(3):
+            attempt()
+        clock[0] += 2
+        attempt()
+        attempt()
+        with pytest.raises(HTTPException):
+            attempt()
+
+    def test_clear_email_after_success(self):
+        for _ in range(3):
+            attempt()
+        asyncio.run(login_throttle.clear_email("victim@example.com"))
+        attempt()
@@ -0,0 +1,92 @@
+"""
+Test admin message read receipts:
+- A first read of a visible message records a receipt and counts it once
+- Messages targeted at other tenants are neither marked read nor counted
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+
+from pymongo.errors import DuplicateKeyError
+
+import message_inbox
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+        elif isinstance(doc.get(key), list):
+            if condition not in doc[key]:
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class FakeMessages:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def find_one(self, query, projection=None):
+        return next((d for d in self.docs if _matches(d, query)), None)
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                for field, value in update["$inc"].items():
+                    doc[field] = doc.get(field, 0) + value
+                return
+
+
+class FakeReads:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        if any(d["tenant_id"] == doc["tenant_id"] and d["message_id"] == doc["message_id"] for d in self.docs):
+            raise DuplicateKeyError("duplicate read receipt")
+        self.docs.append(doc)
+
+
+class FakeDB:
+    def __init__(self, messages):
+        self.admin_messages = FakeMessages(messages)
+        self.tenant_message_reads = FakeReads()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB([
+        {"id": "broadcast-1", "target_type": "broadcast", "read_count": 0},
+        {"id": "targeted-1", "target_type": "targeted", "target_tenant_ids": ["tenant-a"], "read_count": 0},
+    ])
+    monkeypatch.setattr(message_inbox, "db", fake)
+    return fake
+
+
+def read_count(db, message_id):
+    return next(m for m in db.admin_messages.docs if m["id"] == message_id)["read_count"]
+
+
+class TestMarkRead:
+    """Test read receipts and read_count"""
+
+    @pytest.mark.parametrize("message_id", ["broadcast-1", "targeted-1"])
+    def test_first_read_counted_once(self, db, message_id):
+        assert asyncio.run(message_inbox.mark_read("tenant-a", message_id))
+        assert not asyncio.run(message_inbox.mark_read("tenant-a", message_id))
+        assert read_count(db, message_id) == 1
+
+    def test_other_tenants_message_ignored(self, db):
+        assert not asyncio.run(message_inbox.mark_read("tenant-b", "targeted-1"))
+        assert db.tenant_message_reads.docs == []
+        assert read_count(db, "targeted-1") == 0
+
+    def test_unknown_message_ignored(self, db):
+        assert not asyncio.run(message_inbox.mark_read("tenant-a", "missing"))
+        assert db.tenant_message_reads.docs == []
@@ -0,0 +1,166 @@
+"""
+Test background data migrations:
+- String timestamps convert to UTC datetimes; unparseable ones keep their raw value
+- Converted collections stop matching legacy strings in time filters
+- Play counts fall back to created_at until played_at is backfilled
+- Inline logos the asset store refuses are left in place
+- Inline logos only migrate to absolute asset URLs
+"""
+
+import asyncio
+import base64
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+import asset_store
+import migrations
+import timeutils
+from repositories import Plays, plays
+
+NOW = datetime(2026, 6, 15, 12, 0, tzinfo=timezone.utc)
+
+SVG_LOGO = "data:image/svg+xml;base64," + base64.b64encode(
+    b'<svg xmlns="http://www.w3.org/2000/svg"><circle r="4"/></svg>'
+).decode()
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        return self
+
+    def limit(self, count):
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = docs or []
+        self.writes = []
+
+    def find(self, query, projection=None):
+        after = query.get("_id", {}).get("$gt")
+        return FakeCursor([d for d in self.docs if after is None or d["_id"] > after])
+
+    async def find_one(self, query, projection=None):
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        pass
+
+    async def bulk_write(self, ops, ordered=True):
+        self.writes.extend(ops)
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+class TestTimestampConverter:
+    """Test ISO string to datetime conversion"""
+
+    def test_update(self):
+        build = migrations._timestamp_update(("created_at", "expires_at", "redeemed_at"))
+        update = build({
+            "created_at": "2026-06-01T10:00:00Z",
+            "expires_at": "not a date",
+            "redeemed_at": datetime(2026, 6, 2, tzinfo=timezone.utc),
+        })
+        assert update["$set"]["created_at"] == datetime(2026, 6, 1, 10, tzinfo=timezone.utc)
+        assert update["$set"]["expires_at"] is None
+        assert update["$set"]["expires_at_raw"] == "not a date"
+        assert "redeemed_at" not in update["$set"]
+
+    def test_nothing_to_convert(self):
+        assert migrations._timestamp_update(("created_at",))({"created_at": NOW}) is None
+
+    def test_marks_collection_converted(self, monkeypatch):
+        async def done(*args, **kwargs):
+            return 0
+
+        monkeypatch.setattr(migrations, "run_batched_migration", done)
+        monkeypatch.setattr(timeutils, "_string_timestamps_pending", {"reward_codes"})
+        assert len(timeutils.time_clauses("reward_codes", "expires_at", gt=NOW)) == 2
+        asyncio.run(migrations.convert_string_timestamps("reward_codes", ("expires_at",)))
+        assert timeutils.time_clauses("reward_codes", "expires_at", gt=NOW) == [{"expires_at": {"$gt": NOW}}]
+
+
+class TestTimeClauses:
+    """Test filters during the conversion"""
+
+    def test_legacy_strings_matched(self, monkeypatch):
+        monkeypatch.setattr(timeutils, "_string_timestamps_pending", {"reward_codes"})
+        clauses = timeutils.time_clauses("reward_codes", "expires_at", gt=NOW)
+        assert clauses[1] == {"expires_at": {"$gt": "2026-06-15T12:00:00+00:00"}}
+        # Legacy values were written with isoformat() too, so string order is time order
+        assert "2026-06-16T00:00:00+00:00" > clauses[1]["expires_at"]["$gt"]
+
+
+class TestPlayedAtFallback:
+    """Test play count filters before and after the played_at backfill"""
+
+    def test_created_at_until_backfilled(self, monkeypatch):
+        monkeypatch.setattr(Plays, "played_at_backfilled", False)
+        monkeypatch.setattr(timeutils, "_string_timestamps_pending", set())
+        assert plays._played_since(NOW) == {"$or": [
+            {"played_at": {"$gte": NOW}},
+            {"played_at": None, "$or": [{"created_at": {"$gte": NOW}}]},
+        ]}
+
+    def test_backfill_marks_plays(self, monkeypatch):
+        async def done(*args, **kwargs):
+            return 0
+
+        monkeypatch.setattr(migrations, "run_batched_migration", done)
+        monkeypatch.setattr(Plays, "played_at_backfilled", False)
+        asyncio.run(migrations.backfill_played_at())
+        assert plays._played_since(NOW) == {"played_at": {"$gte": NOW}}
+
+
+class TestInlineLogos:
+    """Test moving inline logos to the asset store"""
+
+    def test_svg_logo_left_in_place(self, monkeypatch):
+        pytest.importorskip("PIL")
+        tenants = FakeCollection([
+            {"_id": 1, "id": "tenant-svg", "branding": {"logo_url": SVG_LOGO}, "profile": {"logo_url": SVG_LOGO}}
+        ])
+        monkeypatch.setattr(migrations, "db", FakeDB(tenants=tenants))
+        monkeypatch.setattr(migrations, "ASSET_BASE_URL", "https://app.example.com")
+        monkeypatch.setattr(asset_store, "db", FakeDB())
+        assert asyncio.run(migrations.migrate_inline_logos()) == 0
+        assert tenants.writes == []
+        assert tenants.docs[0]["branding"]["logo_url"] == SVG_LOGO
+
+    def test_refused_without_absolute_base_url(self, monkeypatch):
+        async def fail(*args, **kwargs):
+            raise AssertionError("migration ran")
+
+        monkeypatch.setattr(migrations, "run_batched_migration", fail)
+        monkeypatch.setattr(migrations, "ASSET_BASE_URL", "")
+        assert asyncio.run(migrations.migrate_inline_logos()) == 0
+
+    def test_migrated_logo_url_is_absolute(self, monkeypatch):
+        async def stored(data, tenant_id=None):
+            return {"id": "a1", "variants": {"md": {"key": "a1-md.png"}, "sm": {"key": "a1-sm.png"}}}
+
+        monkeypatch.setattr(migrations, "store_image", stored)
+        monkeypatch.setattr(migrations, "ASSET_BASE_URL", "https://app.example.com/")
+        update = asyncio.run(migrations._inline_logo_update({"id": "t1", "branding": {"logo_url": SVG_LOGO}}))
+        assert update["$set"]["branding.logo_url"] == "https://app.example.com/api/assets/a1-md.png"
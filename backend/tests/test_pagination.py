@@ -0,0 +1,161 @@
+"""
+Test keyset pagination:
+- Cursors round-trip strings, numbers, datetimes and null sort values
+- Malformed cursors are refused with a 400
+- Walking every page returns each row exactly once in sort order, in both
+  directions, including rows whose sort key is null or missing
+"""
+
+import asyncio
+import json
+import base64
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+
+from pagination import encode_cursor, decode_cursor, paginate
+
+NOW = datetime(2026, 6, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def _sort_value(value):
+    # Mongo orders null and missing before any other value
+    return (0, None) if value is None else (1, value)
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+        elif key == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            for op, operand in condition.items():
+                if op == "$ne":
+                    ok = value != operand
+                else:
+                    ok = value is not None and operand is not None and (
+                        value < operand if op == "$lt" else value > operand
+                    )
+                if not ok:
+                    return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self.docs.sort(key=lambda d: _sort_value(d.get(key)), reverse=direction < 0)
+        return self
+
+    def skip(self, count):
+        self.docs = self.docs[count:]
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return [dict(d) for d in self.docs]
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeCursor([d for d in self.docs if _matches(d, query)])
+
+    async def count_documents(self, query, limit=None):
+        return sum(1 for d in self.docs if _matches(d, query))
+
+
+def _walk(collection, direction, limit):
+    seen, after = [], None
+    while True:
+        page = asyncio.run(paginate(collection, {}, direction=direction, limit=limit, after=after))
+        seen.extend(d["id"] for d in page["items"])
+        after = page["next_cursor"]
+        if not after:
+            return seen
+
+
+@pytest.fixture
+def docs():
+    rows = [{"id": f"p{i:02d}", "created_at": NOW - timedelta(hours=i % 4)} for i in range(10)]
+    rows += [{"id": "n01", "created_at": None}, {"id": "n02"}, {"id": "n03", "created_at": None}]
+    return rows
+
+
+class TestCursorEncoding:
+    """Test cursor round trips"""
+
+    @pytest.mark.parametrize("value", ["2026-06-15", 42, 1.5, None, NOW])
+    def test_round_trip(self, value):
+        assert decode_cursor(encode_cursor(value, "doc-1")) == (value, "doc-1")
+
+    def test_no_cursor(self):
+        assert decode_cursor(None) is None
+        assert decode_cursor("") is None
+
+    def test_cursor_is_unpadded(self):
+        assert "=" not in encode_cursor(NOW, "a")
+
+    @pytest.mark.parametrize("token", [
+        "not base64!",
+        base64.urlsafe_b64encode(b"{}").decode(),
+        base64.urlsafe_b64encode(json.dumps([1, 2, 3]).encode()).decode(),
+    ])
+    def test_malformed_cursor(self, token):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(token)
+        assert exc.value.status_code == 400
+
+
+class TestPaginate:
+    """Test page walks over the keyset"""
+
+    @pytest.mark.parametrize("direction", [-1, 1])
+    @pytest.mark.parametrize("limit", [1, 3, 13])
+    def test_every_row_once_in_order(self, docs, direction, limit):
+        expected = [
+            d["id"] for d in sorted(
+                sorted(docs, key=lambda d: d["id"], reverse=direction < 0),
+                key=lambda d: _sort_value(d.get("created_at")), reverse=direction < 0
+            )
+        ]
+        assert _walk(FakeCollection(docs), direction, limit) == expected
+
+    def test_null_keys_last_when_descending(self, docs):
+        assert _walk(FakeCollection(docs), -1, 4)[-3:] == ["n03", "n02", "n01"]
+
+    def test_last_page_has_no_cursor(self, docs):
+        page = asyncio.run(paginate(FakeCollection(docs), {}, limit=len(docs) + 1))
+        assert page["next_cursor"] is None
+        assert page["total"] == len(docs)
+
+    def test_full_last_page_ends_with_empty_page(self, docs):
+        collection = FakeCollection(docs)
+        first = asyncio.run(paginate(collection, {}, limit=len(docs)))
+        assert first["next_cursor"]
+        rest = asyncio.run(paginate(collection, {}, limit=len(docs), after=first["next_cursor"]))
+        assert rest["items"] == [] and rest["next_cursor"] is None
+
+    def test_skip_ignored_with_cursor(self, docs):
+        collection = FakeCollection(docs)
+        first = asyncio.run(paginate(collection, {}, limit=2))
+        second = asyncio.run(paginate(collection, {}, limit=2, after=first["next_cursor"], skip=5))
+        assert [d["id"] for d in second["items"]] == _walk(collection, -1, 4)[2:4]
@@ -0,0 +1,114 @@
+"""
+Test password hashing service:
+- Cost parsing and rehash detection
+- Verify-and-rehash when the configured cost changes
+- Queue-depth limit sheds excess work with a 503
+- Event-loop latency stays flat during a login storm (benchmark)
+"""
+
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("bcrypt")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+
+import password_hasher
+from password_hasher import hash_cost, needs_rehash, verify_and_rehash
+
+STORM_LOGINS = 32
+LOOP_LAG_BUDGET_MS = 50
+
+
+@pytest.fixture
+def fast_rounds(monkeypatch):
+    monkeypatch.setattr(password_hasher, "BCRYPT_ROUNDS", 4)
+
+
+class TestCost:
+    """Test bcrypt cost detection"""
+
+    def test_hash_cost_parsed(self):
+        assert hash_cost("$2b$12$" + "a" * 53) == 12
+        assert hash_cost("not-a-hash") is None
+
+    def test_needs_rehash_on_cost_change(self, fast_rounds):
+        assert needs_rehash("$2b$12$" + "a" * 53)
+        assert not needs_rehash("$2b$04$" + "a" * 53)
+
+
+class TestVerify:
+    """Test verification through the worker pool"""
+
+    def test_hash_and_verify(self, fast_rounds):
+        async def run():
+            hashed = await password_hasher.hash_password("Secret123!")
+            assert hash_cost(hashed) == 4
+            assert await password_hasher.verify_password("Secret123!", hashed)
+            assert not await password_hasher.verify_password("wrong", hashed)
+        asyncio.run(run())
+
+    def test_rehash_on_cost_change(self, monkeypatch):
+        async def run():
+            monkeypatch.setattr(password_hasher, "BCRYPT_ROUNDS", 5)
+            old_hash = await password_hasher.hash_password("Secret123!")
+            monkeypatch.setattr(password_hasher, "BCRYPT_ROUNDS", 4)
+
+            ok, new_hash = await verify_and_rehash("Secret123!", old_hash)
+            assert ok
+            assert hash_cost(new_hash) == 4
+
+            ok, again = await verify_and_rehash("Secret123!", new_hash)
+            assert ok and again is None
+
+            ok, none = await verify_and_rehash("wrong", old_hash)
+            assert not ok and none is None
+        asyncio.run(run())
+
+    def test_queue_limit_returns_503(self, fast_rounds, monkeypatch):
+        monkeypatch.setattr(password_hasher, "HASH_MAX_QUEUE", 0)
+
+        async def run():
+            with pytest.raises(HTTPException) as exc:
+                await password_hasher.hash_password("Secret123!")
+            assert exc.value.status_code == 503
+        asyncio.run(run())
+
+
+class TestLoginStormBenchmark:
+    """Event-loop latency while many logins hash concurrently"""
+
+    def test_event_loop_latency_flat(self):
+        async def run():
+            hashed = await password_hasher.hash_password("Secret123!")
+            lags = []
+            done = asyncio.Event()
+
+            async def probe():
+                while not done.is_set():
+                    start = time.perf_counter()
+                    await asyncio.sleep(0.005)
+                    lags.append((time.perf_counter() - start - 0.005) * 1000)
+
+            probe_task = asyncio.create_task(probe())
+            started = time.perf_counter()
+            results = await asyncio.gather(*[
+                password_hasher.verify_password("Secret123!", hashed)
+                for _ in range(STORM_LOGINS)
+            ])
+            elapsed = time.perf_counter() - started
+            done.set()
+            await probe_task
+
+            assert all(results)
+            lags.sort()
+            p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0
+            assert p99 < LOOP_LAG_BUDGET_MS, (
+                f"{STORM_LOGINS} logins at cost {password_hasher.BCRYPT_ROUNDS} "
+                f"with {password_hasher.HASH_WORKERS} workers took {elapsed:.2f}s with "
+                f"loop lag p99={p99:.1f}ms max={lags[-1] if lags else 0:.1f}ms"
+            )
+        asyncio.run(run())
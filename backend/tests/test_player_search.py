@@ -0,0 +1,136 @@
+"""
+Test player search index:
+- Token generation (edge n-grams of email, name, phone digits)
+- Query builder escapes input and never emits an unanchored regex
+- Latency on a 1M-play tenant (opt-in, needs a scratch MongoDB)
+"""
+
+import os
+import random
+import string
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from player_search import build_search_tokens, search_query, normalize, MAX_PREFIX
+
+LATENCY_MONGO_URL = os.environ.get('PLAYER_SEARCH_LATENCY_MONGO_URL')
+LATENCY_PLAYS = int(os.environ.get('PLAYER_SEARCH_LATENCY_PLAYS', '1000000'))
+LATENCY_BUDGET_MS = float(os.environ.get('PLAYER_SEARCH_LATENCY_BUDGET_MS', '50'))
+
+
+class TestSearchTokens:
+    """Test token generation for plays"""
+
+    def test_tokens_cover_email_prefixes(self):
+        tokens = build_search_tokens("Jean.Dupont@Example.com", None, None)
+        assert "je" in tokens
+        assert "jean.dupont@example.com" in tokens
+        assert "example.com" in tokens
+
+    def test_tokens_cover_first_name_without_accents(self):
+        tokens = build_search_tokens(None, None, "Hélène")
+        assert "helene" in tokens
+        assert "he" in tokens
+
+    def test_tokens_cover_phone_digits(self):
+        tokens = build_search_tokens(None, "+33 6 12 34 56 78", None)
+        assert "33612345678" in tokens
+        assert "336" in tokens
+
+    def test_tokens_are_bounded(self):
+        tokens = build_search_tokens("a" * 200 + "@example.com", None, None)
+        assert max(len(t) for t in tokens) <= MAX_PREFIX
+
+
+class TestSearchQuery:
+    """Test the query builder"""
+
+    def test_blank_search_returns_none(self):
+        assert search_query("") is None
+        assert search_query("   ") is None
+
+    def test_search_is_exact_token_match(self):
+        assert search_query("  JEAN ") == {"search_tokens": "jean"}
+
+    def test_phone_search_uses_digits(self):
+        assert search_query("06 12-34") == {"search_tokens": "061234"}
+
+    def test_regex_input_is_escaped(self):
+        query = search_query("(")
+        assert query == {"search_tokens": {"$regex": "^\\("}}
+
+    def test_regex_metacharacters_are_literal(self):
+        assert search_query(".*") == {"search_tokens": ".*"}
+
+    def test_normalize(self):
+        assert normalize("  Émile   ZOLA ") == "emile zola"
+
+
+def _random_play(tenant_id, now):
+    name = ''.join(random.choices(string.ascii_lowercase, k=8))
+    phone = ''.join(random.choices(string.digits, k=10))
+    email = f"{name}@example.com"
+    played_at = now - timedelta(seconds=random.randint(0, 365 * 86400))
+    return {
+        'id': str(uuid.uuid4()),
+        'tenant_id': tenant_id,
+        'campaign_id': 'latency-campaign',
+        'email': email,
+        'phone': phone,
+        'first_name': name,
+        'search_tokens': build_search_tokens(email, phone, name),
+        'played_at': played_at,
+        'created_at': played_at,
+    }
+
+
+@pytest.mark.skipif(not LATENCY_MONGO_URL, reason="Set PLAYER_SEARCH_LATENCY_MONGO_URL to run latency tests")
+class TestSearchLatency:
+    """Search latency on a 1M-play tenant (writes to a throwaway database)"""
+
+    @pytest.fixture(scope="class")
+    def plays_collection(self):
+        from pymongo import MongoClient, ASCENDING, DESCENDING
+
+        client = MongoClient(LATENCY_MONGO_URL)
+        db_name = f"player_search_latency_{uuid.uuid4().hex[:8]}"
+        collection = client[db_name].plays
+        collection.create_index([
+            ("tenant_id", ASCENDING), ("search_tokens", ASCENDING),
+            ("played_at", DESCENDING), ("id", DESCENDING)
+        ])
+
+        now = datetime.now(timezone.utc)
+        batch = []
+        for _ in range(LATENCY_PLAYS):
+            batch.append(_random_play("latency-tenant", now))
+            if len(batch) == 10000:
+                collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            collection.insert_many(batch, ordered=False)
+
+        yield collection
+        client.drop_database(db_name)
+        client.close()
+
+    def _run(self, collection, term):
+        query = {"tenant_id": "latency-tenant", **search_query(term)}
+        start = time.perf_counter()
+        list(collection.find(query, {"_id": 0}).sort([("played_at", -1), ("id", -1)]).limit(20))
+        return (time.perf_counter() - start) * 1000, query
+
+    def test_search_uses_index(self, plays_collection):
+        _, query = self._run(plays_collection, "ab")
+        plan = plays_collection.find(query).sort([("played_at", -1), ("id", -1)]).limit(20).explain()
+        assert "COLLSCAN" not in str(plan["queryPlanner"]["winningPlan"])
+
+    def test_search_latency_p95(self, plays_collection):
+        terms = [''.join(random.choices(string.ascii_lowercase, k=random.randint(2, 6))) for _ in range(50)]
+        terms += [''.join(random.choices(string.digits, k=4)) for _ in range(20)]
+        timings = sorted(self._run(plays_collection, t)[0] for t in terms)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        assert p95 < LATENCY_BUDGET_MS, f"p95 over {LATENCY_PLAYS} plays {p95:.1f}ms exceeds {LATENCY_BUDGET_MS}ms"
@@ -0,0 +1,44 @@
+"""
+Test prize repository helpers:
+- Cloned prizes get new ids and full stock
+- Owner fields implied by the campaign are not copied into embedded prizes
+- Stock updates keep the total field the prize uses and shift the remaining stock
+"""
+
+import pytest
+
+pytest.importorskip("motor")
+
+from prize_repository import clone_prizes, restock
+
+
+class TestClonePrizes:
+    """Test prize cloning for duplicated campaigns"""
+
+    def test_new_ids_and_full_stock(self):
+        source = [
+            {"id": "p1", "label": "Coffee", "stock": 10, "stock_remaining": 2},
+            {"id": "p2", "label": "Cake", "stock_total": 5, "stock_remaining": 0},
+        ]
+        clones = clone_prizes(source)
+        assert [c["label"] for c in clones] == ["Coffee", "Cake"]
+        assert [c["stock_remaining"] for c in clones] == [10, 5]
+        assert {c["id"] for c in clones}.isdisjoint({"p1", "p2"})
+        assert source[0]["stock_remaining"] == 2
+
+    def test_owner_fields_dropped(self):
+        clone, = clone_prizes([{"id": "p1", "campaign_id": "c1", "tenant_id": "t1", "migrated_at": "x", "stock": 1}])
+        assert not {"campaign_id", "tenant_id", "migrated_at"} & clone.keys()
+
+
+class TestRestock:
+    """Test stock total updates"""
+
+    def test_builder_prize(self):
+        prize = {"id": "p1", "stock_total": 10, "stock_remaining": 4}
+        assert restock(prize, 15) == {"stock_total": 15, "stock_remaining": 9}
+        assert restock(prize, 3) == {"stock_total": 3, "stock_remaining": 0}
+
+    def test_game_prize(self):
+        assert restock({"id": "p1", "stock": 5, "stock_remaining": 5}, 8) == {"stock": 8, "stock_remaining": 8}
+        assert restock({"id": "p1"}, 2) == {"stock": 2, "stock_remaining": 2}
@@ -0,0 +1,80 @@
+"""
+Test opt-in request profiling:
+- Only requests carrying the profiling token are profiled
+- Stored profiles form a ring of PROFILE_RING_SIZE entries
+- Profile ids are validated before touching the disk
+- Event streams are not profiled; long requests are cut at the time cap
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+
+import profiling
+
+
+@pytest.fixture
+def ring(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_RING_SIZE", 2)
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 0)
+    # cProfile is always available; pyinstrument is optional
+    monkeypatch.setattr(profiling, "ENGINE", "cprofile")
+    monkeypatch.setattr(profiling, "_new_session", profiling._CProfileSession)
+    return tmp_path
+
+
+def request(token=None, path="/api/game/x", content_type=b"application/json", delay=0):
+    sent = []
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(delay)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b"x-profile", token.encode())] if token else []
+    scope = {"type": "http", "method": "GET", "path": path, "headers": headers}
+    asyncio.run(profiling.ProfilingMiddleware(app)(scope, None, send))
+    return dict(sent[0]["headers"]).get(b"x-profile-id")
+
+
+class TestProfilingMiddleware:
+    """Test profile capture and storage"""
+
+    def test_requires_token(self, ring):
+        assert request() is None
+        assert request("wrong") is None
+        assert profiling.list_profiles() == []
+
+    def test_ring_keeps_newest(self, ring):
+        ids = [request("secret").decode() for _ in range(3)]
+        stored = profiling.list_profiles()
+        assert len(stored) == 2
+        assert {p["id"] for p in stored} <= set(ids)
+        assert stored[0]["status"] == 200 and stored[0]["engine"] == "cprofile"
+
+        content, media_type, _ = profiling.read_profile(stored[0]["id"], "html")
+        assert media_type == "text/html" and b"<pre>" in content
+        assert profiling.read_profile(stored[0]["id"], "speedscope") is None
+
+    def test_rejects_bad_ids(self, ring):
+        assert not profiling.is_profile_id("../../etc/passwd")
+        assert profiling.read_profile("../secret", "html") is None
+
+    def test_streams_not_profiled(self, ring):
+        assert request("secret", path="/api/events/stream") is None
+        assert request("secret", content_type=b"text/event-stream") is None
+        assert profiling.list_profiles() == []
+        assert not profiling._active
+
+    def test_time_cap(self, ring, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILING_MAX_SECONDS", 0.01)
+        assert request("secret", delay=0.05)
+        profile, = profiling.list_profiles()
+        assert profile["truncated"] and profile["profiled_ms"] < profile["duration_ms"]
@@ -0,0 +1,99 @@
+"""
+Test QR code rendering:
+- Named and pixel sizes are validated
+- Each format renders its own file type
+- Raster output is exactly the requested size, even for dense codes
+- Repeated requests are served from the cache
+"""
+
+import asyncio
+import io
+
+import pytest
+
+pytest.importorskip("qrcode")
+pytest.importorskip("PIL")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+from PIL import Image
+
+import qr_service
+
+URL = "https://app.example.com/play/summer-wheel"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    qr_service._cache.clear()
+    yield
+    qr_service._cache.clear()
+
+
+class TestResolveSize:
+    """Test size validation"""
+
+    @pytest.mark.parametrize("name", sorted(qr_service.SIZES))
+    def test_named_size(self, name):
+        assert qr_service.resolve_size(name) == qr_service.SIZES[name]
+
+    def test_pixel_size(self):
+        assert qr_service.resolve_size("512") == 512
+        assert qr_service.resolve_size(qr_service.MIN_SIZE) == qr_service.MIN_SIZE
+
+    @pytest.mark.parametrize("size", ["huge", None, "1.5", qr_service.MIN_SIZE - 1, qr_service.MAX_SIZE + 1])
+    def test_invalid_size(self, size):
+        with pytest.raises(HTTPException) as exc:
+            qr_service.resolve_size(size)
+        assert exc.value.status_code == 400
+
+
+class TestRender:
+    """Test format dispatch and output size"""
+
+    @pytest.mark.parametrize("fmt, magic", [("svg", b"<svg"), ("png", b"\x89PNG"), ("pdf", b"%PDF")])
+    def test_format_dispatch(self, fmt, magic):
+        assert asyncio.run(qr_service.render_qr(URL, "screen", fmt)).startswith(magic)
+
+    def test_invalid_format(self):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(qr_service.render_qr(URL, "screen", "gif"))
+        assert exc.value.status_code == 400
+
+    @pytest.mark.parametrize("size", [300, 301, 1000, 1200])
+    def test_png_exact_size(self, size):
+        image = Image.open(io.BytesIO(asyncio.run(qr_service.render_qr(URL, size, "png"))))
+        assert image.size == (size, size)
+
+    def test_dense_code_exact_size(self):
+        url = URL + "?ref=" + "x" * 400
+        image = Image.open(io.BytesIO(asyncio.run(qr_service.render_qr(url, qr_service.MIN_SIZE, "png"))))
+        assert image.size == (qr_service.MIN_SIZE, qr_service.MIN_SIZE)
+
+    def test_padding_is_white(self):
+        image = Image.open(io.BytesIO(asyncio.run(qr_service.render_qr(URL, 301, "png"))))
+        assert image.getpixel((0, 0)) == (255, 255, 255)
+        assert image.getpixel((300, 300)) == (255, 255, 255)
+
+
+class TestCache:
+    """Test the rendered bytes cache"""
+
+    def test_cache_hit(self, monkeypatch):
+        calls = []
+
+        def render(url, pixels, fmt):
+            calls.append((url, pixels, fmt))
+            return b"qr"
+
+        monkeypatch.setattr(qr_service, "_render", render)
+        assert asyncio.run(qr_service.render_qr(URL, "print", "png")) == b"qr"
+        assert asyncio.run(qr_service.render_qr(URL, "1200", "png")) == b"qr"
+        assert calls == [(URL, 1200, "png")]
+
+    def test_oldest_entry_evicted(self, monkeypatch):
+        monkeypatch.setattr(qr_service, "_render", lambda url, pixels, fmt: url.encode())
+        monkeypatch.setattr(qr_service, "QR_CACHE_MAX_ENTRIES", 2)
+        for slug in ("a", "b", "a", "c"):
+            asyncio.run(qr_service.render_qr(slug, "screen", "svg"))
+        assert [key[0] for key in qr_service._cache] == ["a", "c"]
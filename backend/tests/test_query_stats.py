@@ -0,0 +1,108 @@
+"""
+Test MongoDB query instrumentation:
+- Collection operations and cursor reads are counted and timed per collection/op
+- Fluent cursor chains keep the instrumented proxy
+- The middleware reports DB time per request and labels it with the route
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+
+import metrics
+import query_stats
+from query_stats import InstrumentedCollection, QueryStatsMiddleware
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(0)
+        return list(self.docs)
+
+
+class FakeCollection:
+    name = "plays"
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def find_one(self, query, projection=None):
+        return self.docs[0] if self.docs else None
+
+    def find(self, query=None, projection=None):
+        return FakeCursor(self.docs)
+
+
+class Route:
+    path = "/api/game/{slug}/play"
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestInstrumentedCollection:
+    """Test per-operation recording"""
+
+    def test_operations_recorded(self):
+        collection = InstrumentedCollection(FakeCollection([{"id": 1}, {"id": 2}, {"id": 3}]))
+
+        async def scenario():
+            await collection.find_one({"id": 1})
+            return await collection.find({"tenant_id": "t"}).sort("played_at", -1).limit(2).to_list(10)
+
+        docs = asyncio.run(scenario())
+        assert len(docs) == 2
+        snap = metrics.snapshot()
+        assert snap["counters"]["db_queries{collection=plays,op=find_one}"] == 1
+        assert snap["counters"]["db_queries{collection=plays,op=find}"] == 1
+        assert snap["counters"]["db_documents_returned{collection=plays,op=find}"] == 2
+        timing = snap["timings"]["db_query_ms{collection=plays,op=find}"]
+        assert timing["count"] == 1 and sum(timing["buckets"].values()) == 1
+
+    def test_shape_hides_values(self):
+        shape = query_stats._shape({"email": "a@b.c", "played_at": {"$gte": 1}, "$or": [{"x": 1}]})
+        assert "a@b.c" not in shape
+        assert shape == "{email, played_at: {$gte}, $or}"
+
+
+class TestQueryStatsMiddleware:
+    """Test per-request DB time"""
+
+    def test_reports_db_time(self):
+        collection = InstrumentedCollection(FakeCollection([{"id": 1}]))
+        sent = []
+
+        async def app(scope, receive, send):
+            scope["route"] = Route()
+            await collection.find_one({"id": 1})
+            await collection.find_one({"id": 2})
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = QueryStatsMiddleware(app, timing_header=True)
+        asyncio.run(middleware({"type": "http", "path": "/api/game/x/play"}, None, send))
+
+        headers = dict(sent[0]["headers"])
+        assert headers[b"x-db-queries"] == b"2"
+        assert headers[b"server-timing"].startswith(b"db;dur=")
+        timings = metrics.snapshot()["timings"]
+        assert timings["db_request_queries{route=/api/game/{slug}/play}"]["sum"] == 2
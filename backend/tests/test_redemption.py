@@ -0,0 +1,119 @@
+"""
+Test reward code redemption engine (needs a reachable MongoDB via MONGO_URL):
+- Concurrent redemptions of one code succeed exactly once
+- Expired, unknown and test codes are refused with the right reason
+- Bulk redemption reports a status per code
+- Verify resolves prize and player in one call
+"""
+
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+
+from fastapi import HTTPException
+
+STAFF = {"id": "staff-test", "email": "staff@example.com"}
+
+
+@pytest.fixture
+def env():
+    """Fresh tenant with two reward codes; everything it wrote is removed afterwards."""
+    try:
+        from database import db
+    except RuntimeError as e:
+        pytest.skip(str(e))
+    import redemption
+    from timeutils import utcnow
+
+    tenant_id = f"test-tenant-{uuid.uuid4()}"
+    suffix = uuid.uuid4().hex[:8].upper()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(asyncio.wait_for(db.command("ping"), 2))
+    except Exception:
+        loop.close()
+        pytest.skip("MongoDB not reachable")
+
+    def reward(code, expires_at):
+        return {"id": str(uuid.uuid4()), "tenant_id": tenant_id, "campaign_id": f"camp-{suffix}",
+                "prize_id": f"prize-{suffix}", "player_id": f"player-{suffix}", "code": code,
+                "status": "active", "expires_at": expires_at, "redeemed_at": None,
+                "redeemed_by": None, "is_test": False, "created_at": utcnow()}
+
+    codes = {"live": f"LIVE{suffix}", "lapsed": f"OLD{suffix}"}
+    loop.run_until_complete(db.reward_codes.insert_many([
+        reward(codes["live"], utcnow() + timedelta(days=1)),
+        reward(codes["lapsed"], utcnow() - timedelta(minutes=1)),
+    ]))
+    loop.run_until_complete(db.campaigns.insert_one({
+        "id": f"camp-{suffix}", "tenant_id": tenant_id, "prizes": [{"id": f"prize-{suffix}", "label": "Coffee"}]
+    }))
+    loop.run_until_complete(db.players.insert_one({"id": f"player-{suffix}", "email": "p@example.com"}))
+
+    yield loop, db, redemption, tenant_id, codes
+
+    for name in ("reward_codes", "audit_logs", "tenant_stats", "campaign_stats"):
+        loop.run_until_complete(db[name].delete_many({"tenant_id": tenant_id}))
+    loop.run_until_complete(db.campaigns.delete_one({"id": f"camp-{suffix}"}))
+    loop.run_until_complete(db.players.delete_one({"id": f"player-{suffix}"}))
+    loop.close()
+
+
+class TestRedemption:
+    """Test exactly-once redemption"""
+
+    def test_concurrent_redeem_exactly_once(self, env):
+        loop, db, redemption, tenant_id, codes = env
+
+        async def attempt():
+            try:
+                await redemption.redeem_code(tenant_id, codes["live"], STAFF)
+                return "ok"
+            except HTTPException as e:
+                return e.detail
+
+        results = loop.run_until_complete(asyncio.gather(*(attempt() for _ in range(25))))
+        assert results.count("ok") == 1
+        assert set(results) - {"ok"} == {"Code already redeemed"}
+        assert loop.run_until_complete(
+            db.audit_logs.count_documents({"tenant_id": tenant_id, "action": "redeem_code"})
+        ) == 1
+
+    def test_refusals(self, env):
+        loop, db, redemption, tenant_id, codes = env
+        for code, status, detail in (
+            (codes["lapsed"], 400, "Code has expired"),
+            ("NOPE", 404, "Reward code not found"),
+            ("TEST-ABC", 400, "Test codes cannot be redeemed"),
+        ):
+            with pytest.raises(HTTPException) as exc:
+                loop.run_until_complete(redemption.redeem_code(tenant_id, code, STAFF))
+            assert (exc.value.status_code, exc.value.detail) == (status, detail)
+
+        lapsed = loop.run_until_complete(db.reward_codes.find_one({"code": codes["lapsed"]}))
+        assert lapsed["status"] == "expired"
+
+    def test_bulk_redeem(self, env):
+        loop, db, redemption, tenant_id, codes = env
+        results = loop.run_until_complete(redemption.redeem_codes(
+            tenant_id, [codes["live"], codes["live"], codes["lapsed"], "NOPE", "TEST-X"], STAFF
+        ))
+        assert [(r["code"], r["status"]) for r in results] == [
+            (codes["live"], "redeemed"),
+            (codes["lapsed"], "expired"),
+            ("NOPE", "not_found"),
+            ("TEST-X", "test_code"),
+        ]
+
+    def test_verify(self, env):
+        loop, db, redemption, tenant_id, codes = env
+        result = loop.run_until_complete(redemption.verify_code(tenant_id, codes["live"]))
+        assert result["reward"]["code"] == codes["live"]
+        assert result["prize"]["label"] == "Coffee"
+        assert result["player"]["email"] == "p@example.com"
+        assert "_id" not in result["reward"] and "_id" not in result["prize"]
@@ -0,0 +1,61 @@
+"""
+Test the platform secrets cache:
+- Repeated reads reuse the decrypted settings
+- A version bump written by another worker reloads them on the next read
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("cryptography")
+
+import secrets_manager
+from crypto_utils import encrypt_value
+
+
+class FakeCollection:
+    def __init__(self, doc):
+        self.doc = doc
+        self.full_reads = 0
+
+    async def find_one(self, query, projection=None):
+        if set(projection) != {"_id", "version"}:
+            self.full_reads += 1
+        return {k: v for k, v in self.doc.items() if k != "_id"}
+
+
+class FakeDB:
+    def __init__(self, doc):
+        self.platform_settings = FakeCollection(doc)
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    fake = FakeDB({
+        "setting_type": "stripe",
+        "mode": "test",
+        "test_secret_key_encrypted": encrypt_value("sk_test_old"),
+        "version": 1,
+    })
+    monkeypatch.setattr(secrets_manager, "db", fake)
+    secrets_manager.invalidate_platform_settings()
+    yield fake.platform_settings
+    secrets_manager.invalidate_platform_settings()
+
+
+class TestSettingsCache:
+    """Test cache reuse and cross-worker invalidation"""
+
+    def test_cached_reads(self, settings):
+        for _ in range(3):
+            assert asyncio.run(secrets_manager.get_stripe_settings())["test_secret_key"] == "sk_test_old"
+        assert settings.full_reads == 1
+
+    def test_version_bump_reloads(self, settings):
+        asyncio.run(secrets_manager.get_stripe_settings())
+        # Written through another worker: this one's cache was never invalidated
+        settings.doc.update(test_secret_key_encrypted=encrypt_value("sk_test_new"), version=2)
+        assert asyncio.run(secrets_manager.get_stripe_settings())["test_secret_key"] == "sk_test_new"
+        assert settings.full_reads == 2
@@ -0,0 +1,73 @@
+"""
+Test event stream authentication:
+- Stream tickets open streams but are refused as bearer tokens
+- Session tokens are refused in the query string
+- Revoking the session revokes streams opened with its ticket
+- Revocation rejects tokens issued earlier in the same second, not later ones
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("jwt")
+pytest.importorskip("fastapi")
+pytest.importorskip("bcrypt")
+
+from fastapi import HTTPException
+
+import auth
+
+
+class Connection:
+    def __init__(self, headers=None, query_params=None):
+        self.headers = headers or {}
+        self.query_params = query_params or {}
+
+
+@pytest.fixture
+def session():
+    token = auth.create_token("user-stream-test", "tenant_owner", tenant_id="tenant-stream-test")
+    yield token, auth.decode_token(token)
+    auth._revoked_jtis.clear()
+    auth._user_revoked_before.clear()
+    auth._tenant_revoked_before.clear()
+
+
+class TestStreamTickets:
+    """Test ticket scope and revocation"""
+
+    def test_ticket_is_stream_only(self, session):
+        token, payload = session
+        ticket = auth.create_stream_ticket(payload)
+        with pytest.raises(HTTPException):
+            auth.get_bearer_payload(Connection(headers={"Authorization": f"Bearer {ticket}"}))
+        assert auth.get_bearer_payload(Connection(headers={"Authorization": f"Bearer {token}"}))["sub"] == payload["sub"]
+
+    def test_session_token_refused_in_query(self, session):
+        token, _ = session
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(auth.get_stream_user(Connection(query_params={"ticket": token})))
+        assert exc.value.detail == "Invalid stream ticket"
+
+    def test_revocation_reaches_ticket(self, session):
+        _, payload = session
+        ticket = auth.decode_token(auth.create_stream_ticket(payload))
+        assert not auth.is_revoked(ticket)
+        auth._tenant_revoked_before["tenant-stream-test"] = ticket["iat"] + 1
+        assert auth.is_revoked(ticket)
+
+
+class TestRevocationPrecision:
+    """Test revocations against tokens issued around them"""
+
+    def test_same_second_tokens(self, session, monkeypatch):
+        async def persist(*args):
+            pass
+
+        monkeypatch.setattr(auth, "_persist_revocation", persist)
+        _, before = session
+        asyncio.run(auth.revoke_user_tokens("user-stream-test"))
+        after = auth.decode_token(auth.create_token("user-stream-test", "tenant_owner", tenant_id="tenant-stream-test"))
+        assert auth.is_revoked(before)
+        assert not auth.is_revoked(after)
@@ -0,0 +1,97 @@
+"""
+Test async Stripe gateway against the fake Stripe server:
+- Checkout session create/retrieve with a per-client API key
+- Retries with backoff on 5xx, reusing the idempotency key
+- Calls do not block the event loop
+"""
+
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("stripe")
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+
+from stripe_gateway import StripeGateway
+
+CHECKOUT_PARAMS = {
+    "mode": "payment",
+    "success_url": "https://example.com/ok",
+    "cancel_url": "https://example.com/cancel",
+    "line_items": [{
+        "price_data": {"currency": "usd", "product_data": {"name": "Pro (monthly)"}, "unit_amount": 2900},
+        "quantity": 1,
+    }],
+    "metadata": {"tenant_id": "tenant-1", "plan": "pro"},
+}
+
+
+class TestStripeGateway:
+    """Test gateway calls"""
+
+    def test_create_and_retrieve_session(self, fake_stripe):
+        base_url, state = fake_stripe
+        gateway = StripeGateway("sk_test_gateway", base_url=base_url, max_retries=0)
+
+        async def run():
+            session = await gateway.create_checkout_session(CHECKOUT_PARAMS, idempotency_key="idem-1")
+            fetched = await gateway.retrieve_checkout_session(session["id"])
+            return session, fetched
+
+        session, fetched = asyncio.run(run())
+        assert session["url"].startswith("https://checkout.stripe.test/")
+        assert session["amount_total"] == 2900
+        assert fetched["metadata"]["tenant_id"] == "tenant-1"
+        assert all(auth == "Bearer sk_test_gateway" for _, _, auth, _ in state.requests)
+
+    def test_separate_keys_per_client(self, fake_stripe):
+        base_url, state = fake_stripe
+        first = StripeGateway("sk_test_one", base_url=base_url, max_retries=0)
+        second = StripeGateway("sk_test_two", base_url=base_url, max_retries=0)
+
+        async def run():
+            await asyncio.gather(
+                first.create_checkout_session(CHECKOUT_PARAMS),
+                second.create_checkout_session(CHECKOUT_PARAMS),
+            )
+
+        asyncio.run(run())
+        assert {auth for _, _, auth, _ in state.requests} == {"Bearer sk_test_one", "Bearer sk_test_two"}
+
+    def test_retries_server_errors(self, fake_stripe):
+        base_url, state = fake_stripe
+        state.fail_next = 2
+        gateway = StripeGateway("sk_test_retry", base_url=base_url, max_retries=2)
+
+        session = asyncio.run(gateway.create_checkout_session(CHECKOUT_PARAMS, idempotency_key="idem-retry"))
+        assert session["id"].startswith("cs_test_")
+        posts = [r for r in state.requests if r[0] == "POST"]
+        assert len(posts) == 3
+        assert {key for *_, key in posts} == {"idem-retry"}
+
+    def test_event_loop_not_blocked(self, fake_stripe):
+        base_url, state = fake_stripe
+        state.delay = 0.3
+        gateway = StripeGateway("sk_test_slow", base_url=base_url, max_retries=0)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            started = time.perf_counter()
+            await gateway.create_checkout_session(CHECKOUT_PARAMS)
+            elapsed = time.perf_counter() - started
+            task.cancel()
+            return ticks, elapsed
+
+        ticks, elapsed = asyncio.run(run())
+        assert elapsed >= 0.3
+        assert ticks >= 10
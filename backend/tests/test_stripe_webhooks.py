@@ -0,0 +1,146 @@
+"""
+Test the Stripe webhook worker's claim order:
+- Events of one tenant are applied one at a time in created order
+- A backlog of lanes waiting on backoff never hides runnable events behind it
+- Events whose worker lost its lease are claimed again
+"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("motor")
+
+import stripe_webhooks
+from timeutils import utcnow
+
+NOW = utcnow()
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$in":
+                    ok = value in operand
+                elif value is None:
+                    ok = False
+                elif op == "$lt":
+                    ok = value < operand
+                else:
+                    ok = value <= operand
+                if not ok:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.closed = False
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield dict(doc)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeCursor([d for d in self.docs if _matches(d, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if _matches(d, query)), None)
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        doc = next((d for d in self.docs if _matches(d, query)), None)
+        if doc is None:
+            return None
+        doc.update(update["$set"])
+        for field, value in update["$inc"].items():
+            doc[field] += value
+        return dict(doc)
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.stripe_events = FakeCollection(docs)
+
+
+def event(event_id, tenant_id, minutes_ago, status="pending", **fields):
+    return {
+        "id": event_id,
+        "tenant_id": tenant_id,
+        "created": NOW - timedelta(minutes=minutes_ago),
+        "received_at": NOW - timedelta(minutes=minutes_ago),
+        "status": status,
+        "attempts": 0,
+        "next_attempt_at": NOW - timedelta(minutes=minutes_ago),
+        **fields,
+    }
+
+
+def claim(monkeypatch, docs):
+    monkeypatch.setattr(stripe_webhooks, "db", FakeDB(docs))
+    return asyncio.run(stripe_webhooks._claim_next())
+
+
+class TestClaimOrder:
+    """Test which event the worker claims next"""
+
+    def test_oldest_event_of_a_tenant_first(self, monkeypatch):
+        claimed = claim(monkeypatch, [event("evt_2", "t1", 1), event("evt_1", "t1", 2)])
+        assert claimed["id"] == "evt_1"
+        assert claimed["status"] == "processing" and claimed["attempts"] == 1
+
+    def test_lane_waits_for_earlier_backoff(self, monkeypatch):
+        docs = [
+            event("evt_1", "t1", 10, next_attempt_at=NOW + timedelta(minutes=5)),
+            event("evt_2", "t1", 5),
+        ]
+        assert claim(monkeypatch, docs) is None
+
+    def test_blocked_backlog_does_not_stall(self, monkeypatch):
+        docs = []
+        for i in range(stripe_webhooks.CLAIM_BATCH_SIZE + 50):
+            tenant = f"backoff-{i}"
+            docs.append(event(f"evt_wait_{i}", tenant, 1000 - i, attempts=3, next_attempt_at=NOW + timedelta(minutes=5)))
+            docs.append(event(f"evt_next_{i}", tenant, 500 - i / 1000))
+        docs.append(event("evt_free", "t-free", 1))
+        assert claim(monkeypatch, docs)["id"] == "evt_free"
+
+    def test_expired_lease_reclaimed(self, monkeypatch):
+        docs = [event("evt_1", "t1", 10, status="processing", attempts=1, lease_until=NOW - timedelta(seconds=1))]
+        claimed = claim(monkeypatch, docs)
+        assert claimed["id"] == "evt_1" and claimed["attempts"] == 2
+
+    def test_live_lease_blocks_lane(self, monkeypatch):
+        docs = [
+            event("evt_1", "t1", 10, status="processing", attempts=1, lease_until=NOW + timedelta(seconds=30)),
+            event("evt_2", "t1", 5),
+        ]
+        assert claim(monkeypatch, docs) is None
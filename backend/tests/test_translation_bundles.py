@@ -0,0 +1,57 @@
+"""
+Test precompiled translation bundles:
+- Full and namespace-scoped bundles
+- gzip negotiation and content-hash ETag / 304 revalidation
+- Unknown languages fall back to English, unknown namespaces are rejected
+"""
+
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from i18n import TRANSLATIONS
+from precompressed import parse_accept_encoding
+from translation_bundles import translations_response, CACHE_CONTROL
+
+
+def make_request(headers=None):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class TestTranslationBundles:
+    """Test bundle responses"""
+
+    def test_full_bundle_identity(self):
+        response = translations_response(make_request(), "fr")
+        assert json.loads(response.body) == TRANSLATIONS["fr"]
+        assert response.headers["Cache-Control"] == CACHE_CONTROL
+        assert "Content-Encoding" not in response.headers
+
+    def test_namespace_bundle_gzip(self):
+        response = translations_response(make_request({"Accept-Encoding": "gzip, deflate"}), "en", "game")
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.body)) == {"game": TRANSLATIONS["en"]["game"]}
+
+    def test_etag_revalidation(self):
+        etag = translations_response(make_request(), "en").headers["ETag"]
+        response = translations_response(make_request({"If-None-Match": etag}), "en")
+        assert response.status_code == 304
+        assert response.body == b""
+
+    def test_unknown_lang_falls_back(self):
+        assert translations_response(make_request(), "xx").body == translations_response(make_request(), "en").body
+
+    def test_unknown_namespace(self):
+        with pytest.raises(HTTPException) as exc:
+            translations_response(make_request(), "en", "nope")
+        assert exc.value.status_code == 400
+
+    def test_accept_encoding_q_zero(self):
+        assert parse_accept_encoding("gzip;q=0, br") == {"br"}
@@ -0,0 +1,72 @@
+"""
+Time helpers for event collections.
+
+Event documents (plays, players, reward_codes, consents, fraud_flags) store
+their timestamps as BSON datetimes in UTC so date filters can use indexed
+range queries instead of string matching on ISO values. Older documents
+still hold ISO strings until ``migrations.convert_string_timestamps`` has
+converted their collection; ``time_clauses`` matches both forms meanwhile.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Tuple, Union
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def parse_datetime(value: Union[str, datetime, None]) -> Optional[datetime]:
+    """Coerce an ISO string or datetime to an aware UTC datetime.
+
+    Naive values are assumed to be UTC. Returns None for empty or
+    unparseable input.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def day_start(moment: Optional[datetime] = None) -> datetime:
+    moment = moment or utcnow()
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def day_bounds(moment: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Return the ``[start, end)`` range of the UTC day containing ``moment``."""
+    start = day_start(moment)
+    return start, start + timedelta(days=1)
+
+
+def month_start(moment: Optional[datetime] = None) -> datetime:
+    return day_start(moment).replace(day=1)
+
+
+# Collections that may still hold ISO-string timestamps
+_string_timestamps_pending = {'plays', 'players', 'reward_codes', 'consents', 'fraud_flags'}
+
+
+def mark_timestamps_converted(collection_name: str):
+    """Every timestamp of ``collection_name`` is a datetime now; stop matching strings."""
+    _string_timestamps_pending.discard(collection_name)
+
+
+def time_clauses(collection_name: str, field: str, **bounds) -> list:
+    """``$or`` alternatives comparing ``field`` with ``bounds`` (``gt=``, ``lte=``, ...).
+
+    Mongo never compares a datetime with a string, so until the collection is
+    converted a second clause compares legacy values as UTC ISO strings,
+    which sort in time order.
+    """
+    clauses = [{field: {f'${op}': value for op, value in bounds.items()}}]
+    if collection_name in _string_timestamps_pending:
+        clauses.append({field: {f'${op}': value.isoformat() for op, value in bounds.items()}})
+    return clauses
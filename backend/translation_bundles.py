@@ -0,0 +1,51 @@
+"""
+Translation bundles for ``/api/translations/{lang}``.
+
+Each language is serialized and compressed once at startup; namespace-scoped
+bundles (e.g. only ``game`` for the player-facing page) are built on first
+use and kept. Responses carry a content-hash ETag so browsers revalidate
+with a cheap 304 after ``TRANSLATIONS_MAX_AGE_SECONDS``.
+"""
+import os
+from functools import lru_cache
+
+from fastapi import HTTPException, Request, Response
+
+from i18n import TRANSLATIONS
+from precompressed import PrecompressedPayload
+
+DEFAULT_LANG = 'en'
+TRANSLATIONS_MAX_AGE_SECONDS = int(os.environ.get('TRANSLATIONS_MAX_AGE_SECONDS', '86400'))
+CACHE_CONTROL = f'public, max-age={TRANSLATIONS_MAX_AGE_SECONDS}, stale-while-revalidate={TRANSLATIONS_MAX_AGE_SECONDS * 7}'
+
+
+def parse_namespaces(ns: str = None) -> tuple:
+    """``"game,common"`` -> ``('common', 'game')``; empty means the full bundle."""
+    if not ns:
+        return ()
+    return tuple(sorted({n.strip() for n in ns.split(',') if n.strip()}))
+
+
+@lru_cache(maxsize=256)
+def get_bundle(lang: str, namespaces: tuple = ()) -> PrecompressedPayload:
+    translations = TRANSLATIONS[lang]
+    if not namespaces:
+        return PrecompressedPayload.from_json(translations)
+    unknown = [n for n in namespaces if n not in translations]
+    if unknown:
+        raise HTTPException(400, f'Unknown translation namespace: {", ".join(unknown)}')
+    return PrecompressedPayload.from_json({n: translations[n] for n in namespaces})
+
+
+def warm_bundles():
+    """Build the full bundle and every single-namespace bundle of each language."""
+    for lang, translations in TRANSLATIONS.items():
+        get_bundle(lang)
+        for namespace in translations:
+            get_bundle(lang, (namespace,))
+
+
+def translations_response(request: Request, lang: str, ns: str = None) -> Response:
+    if lang not in TRANSLATIONS:
+        lang = DEFAULT_LANG
+    return get_bundle(lang, parse_namespaces(ns)).response(request, CACHE_CONTROL)